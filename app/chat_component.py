@@ -1,7 +1,14 @@
 # Chat component for the barebone chat app using Azure OpenAI and Streamlit
-from openai import AzureOpenAI  # Import Azure OpenAI client
+import atexit                # Import atexit to close the shared clients on shutdown
+import json                  # Import json to decode chat API events
 import streamlit as st       # Import Streamlit for UI
+from search.clients import close_async_clients, get_async_openai_client  # Import shared async clients
 from search.search_wrapper import SearchWrapper  # Import search service wrapper
+from search.response_cache import ResponseCache, conversation_key, question_key, replay, sources_fingerprint  # Import semantic answer cache
+from search.context import CONTEXT_FIELDS  # Import default context fields
+from chat_pipeline import BackgroundLoop, build_messages, retrieve_sources, stream_completion  # Import async turn pipeline
+from search.telemetry import correlation, get_correlation_id, telemetry  # Import request correlation and metrics
+from conversation import ConversationMemory  # Import bounded conversation memory
 
 # Extract API configuration from Streamlit secrets
 api_key = st.secrets["AZURE_OPENAI_API_KEY"]
@@ -9,6 +16,21 @@ api_version = st.secrets["AZURE_OPENAI_API_VERSION"]
 api_endpoint = st.secrets["AZURE_OPENAI_ENDPOINT"]
 model = st.secrets["AZURE_OPENAI_MODEL"]
 
+# Retrieval and prompt size settings
+search_top = int(st.secrets.get("SEARCH_TOP", 5))
+context_token_budget = int(st.secrets.get("CONTEXT_TOKEN_BUDGET", 2000))
+context_fields = [f.strip() for f in st.secrets.get("CONTEXT_FIELDS", "").split(",") if f.strip()] or CONTEXT_FIELDS
+query_fan_out = str(st.secrets.get("QUERY_FAN_OUT", "true")).lower() == "true"
+
+# Conversation memory and history rendering settings
+history_token_budget = int(st.secrets.get("HISTORY_TOKEN_BUDGET", 1000))
+summary_token_budget = int(st.secrets.get("SUMMARY_TOKEN_BUDGET", 300))
+history_display_limit = int(st.secrets.get("HISTORY_DISPLAY_LIMIT", 200))
+history_page_size = int(st.secrets.get("HISTORY_PAGE_SIZE", 20))
+
+# Optional chat API service (server.py); when set, turns are answered by the service
+chat_api_url = st.secrets.get("CHAT_API_URL", "").rstrip("/")
+
 # Set up the sidebar with logo and about section
 with st.sidebar:
     st.image("static/logo.png", width=100)  # Display logo
@@ -23,73 +45,123 @@ with st.sidebar:
 # Main app title
 st.title("RoboChat")
 
-# Initialize Azure OpenAI client
-client = AzureOpenAI(
-    azure_endpoint=api_endpoint, 
-    api_key=api_key,
-    api_version=api_version,
-)
-
-# Define the prompt template for grounded responses using sources
-GROUNDED_PROMPT="""
-You are an AI assistant that helps users learn from the information found in the source material.
-Answer the query using only the sources provided below.
-The sources are in JSON format. You can use the information in the sources to answer the query.
-Use bullets if the answer has multiple points.
-If the answer is longer than 3 sentences, provide a summary.
-Answer ONLY with the facts listed in the list of sources below. Cite your source when you answer the question
-If there isn't enough information below, say you don't know.
-Do not generate answers that don't use the sources below.
-Query: {query}
-Sources:\n{sources}
-"""
-
-# Initialize search service
-search_service = SearchWrapper()
-
-# Helper function to format sources for the prompt
-def sources_formatted(sources):
-    return list(sources)
-
-# Initialize session messages if not present
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-
-# Display previous messages in the chat interface
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Initialize search service once per process so its query cache survives reruns
+@st.cache_resource
+def get_search_service():
+    return SearchWrapper()
+
+# Initialize the semantic response cache shared by all sessions
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache(
+        maxsize=int(st.secrets.get("RESPONSE_CACHE_SIZE", 512)),
+        threshold=float(st.secrets.get("RESPONSE_CACHE_THRESHOLD", 0.95)),
+    )
+
+# Initialize one pooled HTTP client for the chat API service
+@st.cache_resource
+def get_chat_api_client():
+    import httpx
+    return httpx.Client(base_url=chat_api_url, timeout=httpx.Timeout(10.0, read=120.0))
+
+# Run the async pipeline on one persistent event loop per process, so its async
+# client and connection pool are reused by every turn and closed on shutdown
+@st.cache_resource
+def get_background_loop():
+    background_loop = BackgroundLoop()
+    atexit.register(lambda: background_loop.close(close_async_clients()))
+    return background_loop
+
+if not chat_api_url:
+    search_service = get_search_service()
+    response_cache = get_response_cache()
+    background_loop = get_background_loop()
+
+# Stream the grounded completion with the async client of the background event loop
+async def answer_stream(messages):
+    client = get_async_openai_client(api_endpoint, api_key, api_version)
+    async for delta in stream_completion(client, model, messages):
+        yield delta
+
+# Stream the answer of the chat API service, decoding its server-sent events
+def remote_answer_stream(question, history):
+    client = get_chat_api_client()
+    payload = {"question": question, "history": history}
+    with client.stream("POST", "/v1/chat", json=payload, headers={"X-Correlation-Id": get_correlation_id()}) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "delta":
+                    yield data
+                elif event == "error":
+                    raise RuntimeError(data["error"])
+
+# Initialize the session's conversation memory if not present
+if "memory" not in st.session_state:
+    st.session_state.memory = ConversationMemory(
+        window_tokens=history_token_budget,
+        summary_tokens=summary_token_budget,
+        max_display=history_display_limit,
+    )
+    st.session_state.history_pages = 1
+memory = st.session_state.memory
+
+# Offer older messages page by page instead of re-rendering the whole history on every rerun
+if memory.page_count(history_page_size) > st.session_state.history_pages:
+    if st.button("Show older messages"):
+        st.session_state.history_pages += 1
+
+# Display the loaded pages of previous messages in the chat interface
+for number in reversed(range(st.session_state.history_pages)):
+    for message in memory.page(number, history_page_size):
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
 
 # Get user input and process the chat message
 if prompt := st.chat_input("What is up?"):
-    # Append user message to session state
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    # Tag every span and metric of this turn with one correlation id
+    with correlation():
+        # Take the history before this turn, then record the user message
+        history = memory.history()
+        memory.append("user", prompt)
     
-    # Search for relevant sources based on user query
-    source = search_service.search(prompt)
+        if chat_api_url:
+            # Display user message and stream the answer of the chat API service
+            with st.chat_message("human"):
+                st.markdown(prompt)
+            with st.chat_message("assistant"):
+                response = st.write_stream(remote_answer_stream(prompt, history))
+        else:
+            # Search for relevant sources based on user query, running the query variants concurrently
+            sources = background_loop.run(retrieve_sources(search_service, prompt, top=search_top, fields=context_fields, fan_out=query_fan_out))
     
-    # Display user message in the chat UI
-    with st.chat_message("human"):
-        st.markdown(prompt)
+            # Display user message in the chat UI
+            with st.chat_message("human"):
+                st.markdown(prompt)
     
-    # Process and display streaming response from the assistant
-    with st.chat_message("assistant"):
-        # Create request with formatted grounded prompt including search sources
-        rag_context = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "user", 
-                    "content": GROUNDED_PROMPT.format(
-                        query=st.session_state.messages[-1], 
-                        sources=sources_formatted(search_service.search(st.session_state.messages[-1]))
-                    )
-                }
-            ],
-            stream=True,
-        )
-        # Stream and display the assistant's response
-        response = st.write_stream(rag_context)
+            # Look up an answer to the same or a near-identical question on the same sources in this conversation
+            response_cache.check_version(search_service.index_version)
+            query_key = question_key(prompt, search_service.embedder)
+            sources_key = sources_fingerprint(sources)
+            conversation = conversation_key(history)
+            cached_response = response_cache.lookup(query_key, sources_key, conversation)
+
+            # Process and display streaming response from the assistant
+            with st.chat_message("assistant"):
+                if cached_response is not None:
+                    telemetry.increment("chat.response_cache.hit")
+                    # Replay the cached answer with the usual streaming experience
+                    response = st.write_stream(replay(cached_response))
+                else:
+                    telemetry.increment("chat.response_cache.miss")
+                    # Start the completion as soon as the merged context is ready and stream the response
+                    messages = build_messages(prompt, sources, token_budget=context_token_budget, fields=context_fields, history=history)
+                    response = st.write_stream(background_loop.iterate(answer_stream(messages)))
+                    response_cache.put(query_key, sources_key, response, conversation)
     
-    # Append assistant response to session state
-    st.session_state.messages.append({"role": "assistant", "content": response})
\ No newline at end of file
+        # Record the assistant response in the conversation memory
+        memory.append("assistant", response)
\ No newline at end of file
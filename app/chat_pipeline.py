@@ -0,0 +1,116 @@
+# Async retrieval-plus-grounded-completion turn shared by the chat front ends
+from search.context import build_context  # Import token-budgeted context builder
+from search.context import estimate_tokens  # Import token estimate for prompt size metrics
+from search.retrieval import retrieve  # Import multi-query retrieval
+from search.scheduler import get_scheduler  # Import upstream rate-limit scheduler
+from search.telemetry import telemetry  # Import tracing and metrics
+import asyncio
+import contextvars
+import threading
+import time
+
+# Define the prompt template for grounded responses using sources
+GROUNDED_PROMPT="""
+You are an AI assistant that helps users learn from the information found in the source material.
+Answer the query using only the sources provided below.
+The sources are in JSON format. You can use the information in the sources to answer the query.
+Use bullets if the answer has multiple points.
+If the answer is longer than 3 sentences, provide a summary.
+Answer ONLY with the facts listed in the list of sources below. Cite your source when you answer the question
+If there isn't enough information below, say you don't know.
+Do not generate answers that don't use the sources below.
+Query: {query}
+Sources:\n{sources}
+"""
+
+
+def build_messages(query, sources, token_budget=2000, fields=None, history=None):
+    """
+    Builds the chat messages for a grounded completion from the retrieved sources,
+    preceded by the conversation history if given.
+    """
+    with telemetry.span("chat.prompt", sources=len(sources)) as span:
+        context = build_context(sources, token_budget=token_budget, fields=fields)
+        content = GROUNDED_PROMPT.format(query=query, sources=context)
+        history = list(history or [])
+        span["prompt_tokens"] = estimate_tokens(content) + sum(estimate_tokens(m["content"]) for m in history)
+    return history + [{"role": "user", "content": content}]
+
+
+async def retrieve_sources(search_service, query, top=5, fields=None, fan_out=True):
+    """
+    Retrieves the sources for a question, running the query variants concurrently.
+    """
+    with telemetry.span("chat.retrieve", top=top, fan_out=fan_out) as span:
+        sources = await retrieve(search_service, query, top=top, select=fields, fan_out=fan_out)
+        span["sources"] = len(sources)
+    return sources
+
+
+async def stream_completion(client, model, messages):
+    """
+    Streams the text deltas of a chat completion from an async OpenAI client,
+    recording time-to-first-token and the streaming duration. The request is
+    admitted by the "openai" scheduler at interactive priority and retried when throttled.
+    """
+    with telemetry.span("chat.completion", model=model) as span:
+        started = time.perf_counter()
+        chunks = 0
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        stream = await get_scheduler("openai").acall(
+            client.chat.completions.create, model=model, messages=messages, stream=True, tokens=prompt_tokens
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not chunks:
+                    telemetry.observe("chat.ttft_ms", (time.perf_counter() - started) * 1000, model=model)
+                chunks += 1
+                yield chunk.choices[0].delta.content
+        span["chunks"] = chunks
+
+
+class BackgroundLoop:
+    """
+    A persistent event loop on a daemon thread, for running the async pipeline from
+    synchronous code such as a Streamlit script. Every call runs on the same loop, so
+    the async clients of that loop (and their connection pools) are created once and
+    reused across turns. Coroutines run in a copy of the caller's context, which keeps
+    the correlation id of the turn.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="chat-event-loop", daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine):
+        """
+        Runs a coroutine on the loop and returns its result.
+        """
+        context = contextvars.copy_context()
+
+        async def in_context():
+            return await asyncio.get_running_loop().create_task(coroutine, context=context)
+
+        return asyncio.run_coroutine_threadsafe(in_context(), self.loop).result()
+
+    def iterate(self, generator):
+        """
+        Yields the items of an async generator, advancing it on the loop.
+        """
+        try:
+            while True:
+                try:
+                    yield self.run(generator.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run(generator.aclose())
+
+    def close(self, cleanup=None):
+        """
+        Awaits the cleanup coroutine (e.g. closing the loop's clients), then stops the loop.
+        """
+        if cleanup is not None:
+            self.run(cleanup)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
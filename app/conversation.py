@@ -0,0 +1,90 @@
+# Bounded per-session conversation memory for the chat front ends
+from collections import deque
+import re
+
+from search.context import estimate_tokens  # Import token estimate shared with the prompt context
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def summarize_message(message, max_chars=200):
+    """
+    Compresses a message to its first sentence, cut to max_chars.
+    """
+    content = " ".join(message["content"].split())
+    sentence = SENTENCE_PATTERN.split(content, maxsplit=1)[0]
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars - 3].rstrip() + "..."
+    return f"{message['role']}: {sentence}"
+
+
+class ConversationMemory:
+    """
+    Keeps the recent turns of a conversation verbatim within window_tokens and
+    folds older turns into a rolling summary capped at summary_tokens. Only the
+    last max_display messages are kept for display, so memory per session is bounded.
+    """
+    def __init__(self, window_tokens=1000, summary_tokens=300, max_display=200, summarizer=summarize_message):
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.window = deque()
+        self.window_size = 0
+        self.summary_lines = deque()
+        self.summary_size = 0
+        self.display = deque(maxlen=max_display)
+        self.total = 0
+
+    def __len__(self):
+        return self.total
+
+    def append(self, role, content):
+        """
+        Adds a message, evicting the oldest window messages into the summary.
+        """
+        message = {"role": role, "content": content}
+        self.display.append(message)
+        self.total += 1
+        self.window.append(message)
+        self.window_size += estimate_tokens(content)
+        # Keep at least the newest message in the window, even if it alone is over budget
+        while self.window_size > self.window_tokens and len(self.window) > 1:
+            evicted = self.window.popleft()
+            self.window_size -= estimate_tokens(evicted["content"])
+            self._summarize(evicted)
+
+    def _summarize(self, message):
+        line = self.summarizer(message)
+        self.summary_lines.append(line)
+        self.summary_size += estimate_tokens(line)
+        while self.summary_size > self.summary_tokens and len(self.summary_lines) > 1:
+            self.summary_size -= estimate_tokens(self.summary_lines.popleft())
+
+    @property
+    def summary(self):
+        return "\n".join(self.summary_lines)
+
+    def history(self):
+        """
+        Returns the chat messages preceding the next turn: the summary of older
+        turns as a system message, followed by the recent turns.
+        """
+        messages = []
+        if self.summary_lines:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        messages.extend(self.window)
+        return messages
+
+    def page(self, number, page_size=20):
+        """
+        Returns the displayed messages of page number, counted back from the newest
+        (page 0 is the latest page_size messages), oldest first.
+        """
+        end = len(self.display) - number * page_size
+        if end <= 0:
+            return []
+        start = max(0, end - page_size)
+        return [self.display[i] for i in range(start, end)]
+
+    def page_count(self, page_size=20):
+        return -(-len(self.display) // page_size)
@@ -1,39 +1,88 @@
-from azure.identity import DefaultAzureCredential
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
+from search.clients import get_blob_service_client, get_credential
+from search.corpus import iter_documents
+from search.scheduler import BULK, get_scheduler
+from search.telemetry import telemetry, traced
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
+import hashlib
+import json
 import os
+import tempfile
+import time
+
+MANIFEST_FILENAME = ".blob-sync-manifest.json"
+
+
+@dataclass
+class SyncReport:
+    """
+    Outcome of a BlobWrapper.sync run. Blob names are paths relative to the source directory.
+    """
+    uploaded: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    pruned: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    bytes_uploaded: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return not self.failed
+
+
+def _file_sha256(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
 class BlobWrapper:
     """
     A wrapper for Azure Blob Storage operations, including listing, uploading, and deleting blobs.
     Initializes the connection using environment variables.
     """
-    def __init__(self, source_directory_path=None):
+    def __init__(self, source_directory_path=None, container_client=None):
         """
         Initialize BlobWrapper with optional source directory path.
         Loads environment variables, sets up credentials, and performs uploads.
+        A ContainerClient-compatible object (e.g. a local emulator stand-in) may be
+        passed as container_client instead of connecting to the storage account.
         """
         load_dotenv()
         self.account_url = os.getenv("AZURE_STORAGE_ACCOUNT_URL")
         self.container = os.getenv("AZURE_STORAGE_CONTAINER_NAME")
         self.source_directory = source_directory_path or os.getenv("AZURE_BLOB_SOURCE_DIRECTORY")
-        self.credential = DefaultAzureCredential()
-        self.blob_service_client = BlobServiceClient(account_url=self.account_url, credential=self.credential)
-        self.container_client = self.blob_service_client.get_container_client(container=self.container)
+        self.manifest_path = os.getenv("AZURE_BLOB_MANIFEST_PATH")
+        self.max_workers = int(os.getenv("AZURE_BLOB_MAX_WORKERS") or 8)
+        self.max_concurrency = int(os.getenv("AZURE_BLOB_MAX_CONCURRENCY") or 4)
+        if container_client is not None:
+            self.credential = None
+            self.blob_service_client = None
+            self.container_client = container_client
+        else:
+            self.credential = get_credential()
+            self.blob_service_client = get_blob_service_client(self.account_url)
+            self.container_client = self.blob_service_client.get_container_client(container=self.container)
+        # Storage calls are bulk work; throttled requests are retried by the scheduler
+        self.scheduler = get_scheduler("storage")
 
+    @traced("blob.list")
     def list(self):
         """
         List all blobs in the container.
         Returns:
-            A list or generator of blob objects.
+            A list of blob objects.
         """
         try:
-            # Get iterable list of blobs
-            list = self.container_client.list_blobs()
-            return list
+            # Page through the whole listing, so that the span times the list requests
+            return self.scheduler.call(lambda: list(self.container_client.list_blobs()), priority=BULK)
         except Exception as e:
             print(e)
 
+    @traced("blob.delete")
     def delete(self, blob_name):
         """
         Delete the specified blob by name.
@@ -41,24 +90,58 @@ class BlobWrapper:
             blob_name (str): The name of the blob to delete.
         """
         try:
-            blob_client = self.blob_service_client.get_blob_client(container=self.container, blob=blob_name)
-            blob_client.delete_blob()
+            self.scheduler.call(self.container_client.delete_blob, blob_name, priority=BULK)
         except Exception as e:
             print(e)
 
+    @traced("blob.upload")
     def upload(self, filename, file_path):
         """
         Upload a file as a blob to the container.
         Parameters:
             filename (str): The path of the file to upload.
         """
-        try:
+        def upload_file():
             with open(file_path, "rb") as data:
-                container_client = self.blob_service_client.get_container_client(self.container)
-                container_client.upload_blob(name=filename, data=data, overwrite=False)
+                self.container_client.upload_blob(name=filename, data=data, overwrite=False)
+        try:
+            self.scheduler.call(upload_file, priority=BULK)
         except Exception as e:
             print(e)
 
+    @traced("blob.download")
+    def download(self, blob_name, file_path):
+        """
+        Download a blob to a local file.
+        Parameters:
+            blob_name (str): The name of the blob to download.
+            file_path (str): The path of the file to write.
+        """
+        def download_file():
+            with open(file_path, "wb") as data:
+                self.container_client.download_blob(blob_name).readinto(data)
+        # The file is rewritten on every attempt, so throttled downloads can be retried
+        self.scheduler.call(download_file, priority=BULK)
+
+    def iter_documents(self, document_root=None):
+        """
+        Yields the documents of the JSON blobs in the container, parsed like the blob
+        indexer parses them (see search.corpus). Each blob is downloaded to a temporary
+        file and streamed from there.
+        """
+        for blob in self.list() or []:
+            extension = os.path.splitext(blob.name)[1]
+            if extension not in (".json", ".jsonl"):
+                continue
+            fd, file_path = tempfile.mkstemp(suffix=extension)
+            os.close(fd)
+            try:
+                self.download(blob.name, file_path)
+                yield from iter_documents(file_path, document_root=document_root)
+            finally:
+                os.remove(file_path)
+
+    @traced("blob.upload_all")
     def upload_all(self, source_directory=None):
         """
         Upload all files from the source directory if it exists.
@@ -75,6 +158,142 @@ class BlobWrapper:
             # Log when no valid source directory is available
             print("No source directory found, skipping upload")
 
+    @property
+    def target(self):
+        """
+        Identifies the container synced to (account URL and container name). The manifest
+        keeps separate entries per target, so switching accounts or containers uploads
+        everything to the new one.
+        """
+        url = getattr(self.container_client, "url", None)
+        return url.rstrip("/") if isinstance(url, str) else f"{(self.account_url or '').rstrip('/')}/{self.container}"
+
+    def _load_manifest(self, manifest_path):
+        """
+        Returns all targets' entries ({target: {blob name: entry}}). Manifests written
+        before entries were kept per target are ignored.
+        """
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f).get("targets", {})
+
+    def _save_manifest(self, manifest_path, targets):
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"targets": targets}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+    def _local_files(self, source_directory, manifest_path):
+        """
+        Maps blob names (relative paths with forward slashes) to local file paths.
+        """
+        files = {}
+        for root, _, filenames in os.walk(source_directory):
+            for filename in filenames:
+                file_path = os.path.join(root, filename)
+                if os.path.abspath(file_path) == os.path.abspath(manifest_path) or file_path.endswith(".tmp"):
+                    continue
+                files[os.path.relpath(file_path, source_directory).replace(os.sep, "/")] = file_path
+        return files
+
+    def _upload_changed(self, blob_name, file_path, entry):
+        """
+        Uploads a file unless its size and mtime, or else its content hash, match the
+        manifest entry. Returns (new manifest entry, bytes uploaded).
+        """
+        stat = os.stat(file_path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry, 0
+        sha256 = _file_sha256(file_path)
+        new_entry = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256}
+        if entry and entry["sha256"] == sha256:
+            return new_entry, 0
+        def upload_file():
+            with open(file_path, "rb") as data:
+                # Files above the client's max_single_put_size are sent as parallel blocks
+                self.container_client.upload_blob(
+                    name=blob_name,
+                    data=data,
+                    length=stat.st_size,
+                    overwrite=True,
+                    metadata={"sha256": sha256},
+                    max_concurrency=self.max_concurrency,
+                )
+        # The file is reopened on every attempt, so throttled uploads can be retried
+        self.scheduler.call(upload_file, priority=BULK)
+        return new_entry, stat.st_size
+
+    @traced("blob.sync")
+    def sync(self, source_directory=None, prune=False, max_workers=None, manifest_path=None):
+        """
+        Incrementally mirrors the source directory (recursively) into the container.
+        Unchanged files are skipped using a local manifest of sizes, mtimes and content
+        hashes, kept per storage account and container; new and changed files are
+        uploaded concurrently. With prune=True, blobs recorded in the manifest whose
+        source file no longer exists are deleted.
+        Parameters:
+            source_directory (str): Directory to sync, defaults to the configured one.
+            prune (bool): Delete blobs whose source file was removed.
+            max_workers (int): Number of files uploaded in parallel.
+            manifest_path (str): Manifest location, defaults to a file in the source directory.
+        Returns:
+            SyncReport: The uploaded, skipped, pruned and failed blob names.
+        """
+        if source_directory:
+            self.source_directory = source_directory
+        report = SyncReport()
+        if not (self.source_directory and os.path.isdir(self.source_directory)):
+            report.failed[self.source_directory or ""] = "No source directory found"
+            return report
+
+        started = time.perf_counter()
+        manifest_path = manifest_path or self.manifest_path or os.path.join(self.source_directory, MANIFEST_FILENAME)
+        targets = self._load_manifest(manifest_path)
+        manifest = targets.get(self.target, {})
+        files = self._local_files(self.source_directory, manifest_path)
+        new_manifest = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            futures = {
+                name: executor.submit(self._upload_changed, name, path, manifest.get(name))
+                for name, path in sorted(files.items())
+            }
+            for name, future in futures.items():
+                try:
+                    entry, uploaded_bytes = future.result()
+                except Exception as e:
+                    report.failed[name] = str(e)
+                    if name in manifest:
+                        new_manifest[name] = manifest[name]
+                    continue
+                new_manifest[name] = entry
+                if uploaded_bytes or entry.get("sha256") != (manifest.get(name) or {}).get("sha256"):
+                    report.uploaded.append(name)
+                    report.bytes_uploaded += uploaded_bytes
+                else:
+                    report.skipped.append(name)
+
+            if prune:
+                removed = sorted(set(manifest) - set(files))
+                prune_futures = {name: executor.submit(self.scheduler.call, self.container_client.delete_blob, name, priority=BULK) for name in removed}
+                for name, future in prune_futures.items():
+                    try:
+                        future.result()
+                        report.pruned.append(name)
+                    except Exception as e:
+                        report.failed[name] = str(e)
+                        new_manifest[name] = manifest[name]
+            else:
+                new_manifest.update({name: entry for name, entry in manifest.items() if name not in files})
+
+        self._save_manifest(manifest_path, {**targets, self.target: new_manifest})
+        telemetry.increment("blob.sync.uploaded", len(report.uploaded))
+        telemetry.increment("blob.sync.skipped", len(report.skipped))
+        telemetry.increment("blob.sync.failed", len(report.failed))
+        report.elapsed = time.perf_counter() - started
+        return report
+
 
 # main
 if __name__ == "__main__":
@@ -0,0 +1,295 @@
+"""
+In-process BM25 search backend.
+
+BM25Index builds an inverted index (term -> posting list of document ids and term
+frequencies) over the searchable fields of the index schema and exposes a `search`
+method with the same calling convention as azure's SearchClient, so it can be used
+as a drop-in backend for SearchWrapper when no network access is wanted.
+"""
+from search.corpus import iter_documents
+from search.odata import compile_filter
+from search.schema import SEARCHABLE_FIELDS, key_field
+from collections import namedtuple
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+import unicodedata
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_FORMAT_VERSION = 1
+
+# Same attributes as azure's IndexingResult, returned by the document upload methods
+IndexingResult = namedtuple("IndexingResult", ["key", "succeeded", "status_code", "error_message"])
+
+
+def tokenize(text):
+    """
+    Lowercases, strips accents and splits text into word tokens.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def field_values(document, path):
+    """
+    Yields all string values found at a dotted field path, descending into lists,
+    e.g. "works.composerName" yields the composer of every work in the document.
+    """
+    values = [document]
+    for part in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, list):
+                value = [v.get(part) for v in value if isinstance(v, dict)]
+                next_values.extend(value)
+            elif isinstance(value, dict):
+                next_values.append(value.get(part))
+        values = next_values
+    for value in values:
+        if isinstance(value, list):
+            yield from (v for v in value if isinstance(v, str))
+        elif isinstance(value, str):
+            yield value
+
+
+class BM25Index:
+    """
+    An inverted index with Okapi BM25 ranking over a list of dotted field paths.
+    Documents are identified by the schema key field; documents without one are
+    keyed by their insertion order.
+    """
+    # Serializes writers; kept on the class so it is not pickled with the index
+    _write_lock = threading.Lock()
+
+    def __init__(self, fields=None, key_field_name=None, k1=1.2, b=0.75):
+        self.fields = list(fields or SEARCHABLE_FIELDS)
+        self.key_field = key_field_name or key_field()
+        self.k1 = k1
+        self.b = b
+        self.documents = []
+        self.keys = []
+        self.doc_lengths = []
+        self.postings = {}
+        self.key_to_id = {}
+        self.deleted = set()
+        self.total_length = 0
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.documents) - len(self.deleted)
+
+    def get_document_count(self):
+        """
+        Returns the number of live documents, like SearchClient.get_document_count.
+        """
+        return len(self)
+
+    def _document_key(self, document):
+        key = document.get(self.key_field)
+        return str(key) if key is not None else str(len(self.documents))
+
+    def add_documents(self, documents):
+        """
+        Adds documents to the index. A document whose key is already indexed replaces
+        the previous version. Returns the keys of the added documents.
+        """
+        self.generation += 1
+        keys = []
+        for document in documents:
+            key = self._document_key(document)
+            keys.append(key)
+            if key in self.key_to_id:
+                self._remove(self.key_to_id[key])
+            doc_id = len(self.documents)
+            frequencies = {}
+            for path in self.fields:
+                for value in field_values(document, path):
+                    for token in tokenize(value):
+                        frequencies[token] = frequencies.get(token, 0) + 1
+            for token, frequency in frequencies.items():
+                self.postings.setdefault(token, []).append((doc_id, frequency))
+            length = sum(frequencies.values())
+            self.documents.append(document)
+            self.keys.append(key)
+            self.doc_lengths.append(length)
+            self.total_length += length
+            self.key_to_id[key] = doc_id
+        return keys
+
+    def upload_documents(self, documents):
+        """
+        Adds or replaces documents, like SearchClient.upload_documents.
+        """
+        with self._write_lock:
+            keys = self.add_documents(documents)
+        return [IndexingResult(key, True, 201, None) for key in keys]
+
+    def merge_or_upload_documents(self, documents):
+        """
+        Merges fields into existing documents or adds new ones, like
+        SearchClient.merge_or_upload_documents.
+        """
+        with self._write_lock:
+            merged = []
+            for document in documents:
+                key = self._document_key(document)
+                existing = self.documents[self.key_to_id[key]] if key in self.key_to_id else {}
+                merged.append({**existing, **document})
+            keys = self.add_documents(merged)
+        return [IndexingResult(key, True, 200, None) for key in keys]
+
+    def _remove(self, doc_id):
+        self.deleted.add(doc_id)
+        self.total_length -= self.doc_lengths[doc_id]
+
+    def get_document(self, key):
+        """
+        Returns the document stored under the given key.
+        """
+        return self.documents[self.key_to_id[str(key)]]
+
+    def items(self):
+        """
+        Yields (key, document) for every live document in insertion order.
+        """
+        for doc_id, document in enumerate(self.documents):
+            if doc_id not in self.deleted:
+                yield self.keys[doc_id], document
+
+    def score(self, query):
+        """
+        Returns a dict of document id -> BM25 score for the query.
+        """
+        count = len(self)
+        if not count:
+            return {}
+        average_length = self.total_length / count
+        scores = {}
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, frequency in posting:
+                if doc_id in self.deleted:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+    def field_paths(self, search_fields):
+        """
+        Maps azure field paths ("works/composerName") to the dotted paths of this index.
+        Raises ValueError for fields that are not indexed, where azure would reject the query.
+        """
+        paths = [field.replace("/", ".") for field in search_fields]
+        unknown = [field for field, path in zip(search_fields, paths) if path not in self.fields]
+        if unknown:
+            raise ValueError(f"Fields {unknown} are not searchable in the local index, expected some of {self.fields}")
+        return paths
+
+    def rank(self, query, top=50, skip=0, filter=None, search_fields=None):
+        """
+        Returns the best (key, score) pairs for the query among the documents
+        matching the OData filter expression, if given. With search_fields only
+        documents with a query term in one of those fields are returned; they are
+        still scored over all indexed fields.
+        """
+        scores = self.score(query or "")
+        if search_fields:
+            paths = self.field_paths(search_fields)
+            tokens = set(tokenize(query or ""))
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if any(tokens.intersection(tokenize(value)) for path in paths for value in field_values(self.documents[doc_id], path))
+            }
+        if filter:
+            matches = compile_filter(filter)
+            scores = {doc_id: score for doc_id, score in scores.items() if matches(self.documents[doc_id])}
+        ranked = heapq.nlargest(skip + top, scores.items(), key=lambda item: item[1])[skip:]
+        return [(self.keys[doc_id], score) for doc_id, score in ranked]
+
+    def search(self, search_text, top=50, skip=0, select=None, filter=None, search_fields=None, **kwargs):
+        """
+        Executes a BM25 query and returns the best results as dicts, mimicking the
+        shape of azure search results (document fields plus "@search.score").
+        filter takes the OData subset supported by search.odata and search_fields
+        azure field paths (see rank).
+        Azure-only keyword arguments (e.g. semantic_configuration_name) are ignored.
+        """
+        results = []
+        for key, score in self.rank(search_text, top=top, skip=skip, filter=filter, search_fields=search_fields):
+            document = self.get_document(key)
+            if select:
+                document = {k: v for k, v in document.items() if k in select}
+                # Like azure, a selected key is always returned
+                if self.key_field in select:
+                    document[self.key_field] = key
+            results.append({**document, "@search.score": score})
+        return results
+
+    def save(self, path):
+        """
+        Persists the index to disk.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((_FORMAT_VERSION, self.__dict__), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index previously written with `save`.
+        """
+        with open(path, "rb") as f:
+            version, state = pickle.load(f)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version {version} in {path}")
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+    @classmethod
+    def from_files(cls, paths, document_root=None, **kwargs):
+        """
+        Builds an index from JSON corpus files, streaming their documents.
+        """
+        index = cls(**kwargs)
+        for path in paths:
+            index.add_documents(iter_documents(path, document_root=document_root))
+        index.build_options = index._build_options(paths, document_root)
+        return index
+
+    def _build_options(self, paths, document_root):
+        # What from_files built the index from; a saved index is reused only for the same options
+        return {
+            "paths": sorted(os.path.abspath(path) for path in paths),
+            "document_root": document_root,
+            "fields": list(self.fields),
+            "key_field": self.key_field,
+            "k1": self.k1,
+            "b": self.b,
+        }
+
+    @classmethod
+    def load_or_build(cls, index_path, data_paths, document_root=None, **kwargs):
+        """
+        Loads the index at index_path if it is newer than all data files and was built
+        from the same files, document root, fields and parameters, otherwise builds it
+        from data_paths and saves it.
+        """
+        if os.path.exists(index_path):
+            index_mtime = os.path.getmtime(index_path)
+            if all(os.path.getmtime(p) <= index_mtime for p in data_paths):
+                index = cls.load(index_path)
+                if getattr(index, "build_options", None) == cls(**kwargs)._build_options(data_paths, document_root):
+                    return index
+        index = cls.from_files(data_paths, document_root=document_root, **kwargs)
+        index.save(index_path)
+        return index
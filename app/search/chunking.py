@@ -0,0 +1,153 @@
+"""
+Local replacement for the SplitSkill of the indexer skillset.
+
+Program documents are split along their structure: one chunk per work and one per
+concert, each carrying the program's metadata and the filterable names of the other
+collection (a work chunk lists the program's venues, a concert chunk its composers
+and conductors), so filters that combine entities still match chunks. Documents
+without works or concerts fall back to sliding windows over their text (2000
+characters with a 500 character overlap, like the SplitSkill pages) stored in
+`chunk`. Every chunk is a projection record shaped like an index document, keyed
+by its own id and linked to its source by `parent_id`.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+
+from search.filters import FILTER_FIELDS
+from search.schema import key_field
+
+CHUNK_SIZE = 2000
+CHUNK_OVERLAP = 500
+
+# Top-level scalar fields copied from the program into each of its chunks
+PARENT_FIELDS = ["orchestra", "season"]
+
+# Sub-fields of the program's works and concerts copied into chunks that do not hold
+# that collection: the ones the filter vocabulary matches (see search.filters)
+PARENT_COLLECTION_FIELDS = {
+    collection: [path.split(".", 1)[1] for path in FILTER_FIELDS if path.startswith(collection + ".")]
+    for collection in ("works", "concerts")
+}
+
+
+def sliding_windows(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Splits text into windows of at most size characters, each starting overlap
+    characters before the end of the previous one. Window ends are moved back to
+    the last whitespace when there is one in the second half of the window.
+    """
+    if overlap >= size:
+        raise ValueError("overlap must be smaller than size")
+    text = text.strip()
+    windows = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            split = text.rfind(" ", start + size // 2, end)
+            if split > start:
+                end = split
+        windows.append(text[start:end].strip())
+        if end == len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [window for window in windows if window]
+
+
+def parent_key(document):
+    """
+    Returns the key of a document, or a hash of its content when it has none.
+    """
+    key = document.get(key_field())
+    if key is not None:
+        return str(key)
+    return hashlib.sha1(json.dumps(document, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _document_text(document):
+    return "\n".join(
+        value for name, value in document.items()
+        if isinstance(value, str) and value and name != key_field() and not name.startswith("@")
+    )
+
+
+def _project(items, fields):
+    """
+    Returns the distinct non-empty projections of collection items onto fields.
+    """
+    projected = []
+    for item in items or []:
+        if isinstance(item, dict):
+            values = {name: item[name] for name in fields if item.get(name) is not None}
+            if values and values not in projected:
+                projected.append(values)
+    return projected
+
+
+def chunk_document(document, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Splits a document into projection records with `parent_id`, the parent's metadata
+    and the filterable fields of its other collection. Returns a list of records.
+    """
+    key = key_field()
+    parent_id = parent_key(document)
+    metadata = {name: document[name] for name in PARENT_FIELDS if document.get(name) is not None}
+    projections = {collection: _project(document.get(collection), fields) for collection, fields in PARENT_COLLECTION_FIELDS.items()}
+    records = []
+    for collection, prefix in (("works", "w"), ("concerts", "c")):
+        others = {name: items for name, items in projections.items() if name != collection and items}
+        for position, item in enumerate(document.get(collection) or []):
+            if not isinstance(item, dict):
+                continue
+            records.append({
+                key: f"{parent_id}-{prefix}{position}",
+                "parent_id": parent_id,
+                **metadata,
+                **others,
+                collection: [item],
+            })
+    if records:
+        return records
+    for position, window in enumerate(sliding_windows(_document_text(document), size, overlap)):
+        records.append({
+            key: f"{parent_id}-p{position}",
+            "parent_id": parent_id,
+            **metadata,
+            **{name: items for name, items in projections.items() if items},
+            "chunk": window,
+        })
+    return records
+
+
+def _chunk_batch(batch, size, overlap):
+    return [record for document in batch for record in chunk_document(document, size, overlap)]
+
+
+def chunk_documents(documents, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, max_workers=None, batch_size=256):
+    """
+    Lazily yields the chunks of documents in input order. Batches of batch_size
+    documents are chunked across a process pool of max_workers processes (defaults to
+    CHUNK_MAX_WORKERS or 1), with at most two batches per worker in flight; with a
+    single worker documents are chunked in the calling process.
+    """
+    max_workers = max_workers or int(os.getenv("CHUNK_MAX_WORKERS") or 1)
+    if max_workers <= 1:
+        for document in documents:
+            yield from chunk_document(document, size, overlap)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = []
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                pending.append(executor.submit(_chunk_batch, batch, size, overlap))
+                batch = []
+                if len(pending) >= 2 * max_workers:
+                    yield from pending.pop(0).result()
+        if batch:
+            pending.append(executor.submit(_chunk_batch, batch, size, overlap))
+        for future in pending:
+            yield from future.result()
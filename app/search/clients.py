@@ -0,0 +1,159 @@
+"""
+Process-wide Azure and OpenAI clients.
+
+Credentials, SDK clients and their HTTP connection pools are created once per
+process and shared, so Streamlit reruns and multiple sessions reuse the same
+keep-alive connections and cached access tokens. The SDKs are imported on first
+use rather than at module import.
+
+Clients whose calls go through the upstream schedulers (search.scheduler) are built
+with their SDK retries turned off: the scheduler is the only layer that retries
+throttled calls, so one failure is not retried by both and the backoff honours the
+shared rate limits.
+"""
+from functools import lru_cache
+import asyncio
+import os
+import weakref
+
+# Maximum number of pooled keep-alive connections per upstream host
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE") or 32)
+
+
+@lru_cache(maxsize=None)
+def get_credential():
+    """
+    Returns the shared DefaultAzureCredential. Tokens it acquires are cached by the
+    credential and refreshed only when they expire.
+    """
+    from azure.identity import DefaultAzureCredential
+    from search.telemetry import TracedCredential
+    return TracedCredential(DefaultAzureCredential())
+
+
+@lru_cache(maxsize=None)
+def get_transport():
+    """
+    Returns a shared azure-core transport backed by one pooled requests session.
+    """
+    from azure.core.pipeline.transport import RequestsTransport
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return RequestsTransport(session=session, session_owner=False)
+
+
+@lru_cache(maxsize=None)
+def get_search_client(endpoint, index_name):
+    """
+    Returns the shared SearchClient for an index, without SDK retries.
+    """
+    from azure.search.documents import SearchClient
+    return SearchClient(endpoint=endpoint, index_name=index_name, credential=get_credential(), transport=get_transport(), retry_total=0)
+
+
+@lru_cache(maxsize=None)
+def get_index_client(endpoint):
+    """
+    Returns the shared SearchIndexClient for a search service.
+    """
+    from azure.search.documents.indexes import SearchIndexClient
+    return SearchIndexClient(endpoint=endpoint, credential=get_credential(), transport=get_transport())
+
+
+@lru_cache(maxsize=None)
+def get_indexer_client(endpoint):
+    """
+    Returns the shared SearchIndexerClient for a search service.
+    """
+    from azure.search.documents.indexes import SearchIndexerClient
+    return SearchIndexerClient(endpoint=endpoint, credential=get_credential(), transport=get_transport())
+
+
+@lru_cache(maxsize=None)
+def get_blob_service_client(account_url):
+    """
+    Returns the shared BlobServiceClient for a storage account, without SDK retries.
+    Uploads larger than AZURE_BLOB_MAX_SINGLE_PUT_SIZE bytes are split into
+    AZURE_BLOB_MAX_BLOCK_SIZE blocks.
+    """
+    from azure.storage.blob import BlobServiceClient
+    return BlobServiceClient(
+        account_url=account_url,
+        credential=get_credential(),
+        transport=get_transport(),
+        retry_total=0,
+        max_single_put_size=int(os.getenv("AZURE_BLOB_MAX_SINGLE_PUT_SIZE") or 8 * 1024 * 1024),
+        max_block_size=int(os.getenv("AZURE_BLOB_MAX_BLOCK_SIZE") or 4 * 1024 * 1024),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_openai_client(endpoint, api_key, api_version):
+    """
+    Returns the shared AzureOpenAI client with a pooled keep-alive HTTP client, without SDK retries.
+    """
+    from openai import AzureOpenAI
+    import httpx
+    http_client = httpx.Client(limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE))
+    return AzureOpenAI(azure_endpoint=endpoint, api_key=api_key, api_version=api_version, http_client=http_client, max_retries=0)
+
+
+# Async clients hold connections bound to an event loop, so they are shared per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _loop_clients():
+    return _async_clients.setdefault(asyncio.get_running_loop(), {})
+
+
+def get_async_openai_client(endpoint, api_key, api_version):
+    """
+    Returns the AsyncAzureOpenAI client shared by all callers on the running event loop,
+    without SDK retries.
+    """
+    from openai import AsyncAzureOpenAI
+    import httpx
+    clients = _loop_clients()
+    key = ("openai", endpoint, api_key, api_version)
+    if key not in clients:
+        http_client = httpx.AsyncClient(limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE))
+        clients[key] = AsyncAzureOpenAI(azure_endpoint=endpoint, api_key=api_key, api_version=api_version, http_client=http_client, max_retries=0)
+    return clients[key]
+
+
+def get_async_credential():
+    """
+    Returns the async DefaultAzureCredential shared by all callers on the running event loop.
+    """
+    from azure.identity.aio import DefaultAzureCredential
+    clients = _loop_clients()
+    if "credential" not in clients:
+        clients["credential"] = DefaultAzureCredential()
+    return clients["credential"]
+
+
+def get_async_search_client(endpoint, index_name, credential=None):
+    """
+    Returns the async SearchClient for an index shared by all callers on the running
+    event loop, authenticated with credential (e.g. an AzureKeyCredential) or the async
+    DefaultAzureCredential, without SDK retries. Its aiohttp session pools the
+    connections of the loop.
+    """
+    from azure.search.documents.aio import SearchClient
+    clients = _loop_clients()
+    key = ("search", endpoint, index_name, id(credential))
+    if key not in clients:
+        clients[key] = SearchClient(endpoint=endpoint, index_name=index_name, credential=credential or get_async_credential(), retry_total=0)
+    return clients[key]
+
+
+async def close_async_clients():
+    """
+    Closes the async clients and credential of the running event loop and their connection pools.
+    """
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
@@ -0,0 +1,114 @@
+"""
+Builds the sources section of the grounded prompt from search results.
+
+Only the fields needed to answer are kept, repeated works and concerts are dropped,
+and each source is serialized as one compact JSON line. Sources are added in rank
+order until the token budget is spent.
+"""
+import json
+import math
+
+# Top-level fields requested from the index with `select`
+CONTEXT_FIELDS = ["programID", "parent_id", "orchestra", "season", "concerts", "works", "chunk"]
+
+# Sub-fields kept from the nested collections
+NESTED_FIELDS = {
+    "concerts": ["eventType", "Location", "Venue", "Date", "Time"],
+    "works": ["composerName", "workTitle", "conductorName", "soloists"],
+}
+
+
+def estimate_tokens(text):
+    """
+    Approximates the token count of text (about four characters per token).
+    """
+    return math.ceil(len(text) / 4)
+
+
+def _is_empty(value):
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _compact_items(items, fields):
+    """
+    Keeps the given fields of each nested item, dropping empty values and duplicate items.
+    """
+    seen = set()
+    compacted = []
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        kept = {k: item[k] for k in (fields or item) if k in item and not _is_empty(item[k])}
+        signature = json.dumps(kept, sort_keys=True)
+        if kept and signature not in seen:
+            seen.add(signature)
+            compacted.append(kept)
+    return compacted
+
+
+def compact_source(result, fields=None):
+    """
+    Reduces a search result to its context fields, without search metadata or empty values.
+    """
+    source = {}
+    for name in fields or [k for k in result if not k.startswith("@")]:
+        value = result.get(name)
+        if name in NESTED_FIELDS or (isinstance(value, list) and value and isinstance(value[0], dict)):
+            value = _compact_items(value, NESTED_FIELDS.get(name))
+        if not _is_empty(value):
+            source[name] = value
+    return source
+
+
+def _serialize(source):
+    return json.dumps(source, separators=(",", ":"), ensure_ascii=False)
+
+
+def _trim_to_budget(source, budget):
+    """
+    Drops trailing nested items from the largest collections until the source fits the budget.
+    Returns the serialized source, or None if it cannot fit.
+    """
+    source = {k: list(v) if isinstance(v, list) else v for k, v in source.items()}
+    text = _serialize(source)
+    while estimate_tokens(text) > budget:
+        collections = [k for k, v in source.items() if isinstance(v, list) and v]
+        if not collections:
+            return None
+        largest = max(collections, key=lambda k: len(source[k]))
+        source[largest].pop()
+        text = _serialize(source)
+    return text
+
+
+def build_context(results, token_budget=2000, fields=None):
+    """
+    Serializes search results for the grounded prompt within a token budget.
+    Parameters:
+        results (iterable): Search results in rank order.
+        token_budget (int): Maximum estimated tokens of the returned text.
+        fields (list): Top-level fields to keep, defaults to all non-metadata fields.
+    Returns:
+        str: One compact JSON source per line.
+    """
+    lines = []
+    seen = set()
+    remaining = token_budget
+    for result in results:
+        source = compact_source(result, fields)
+        text = _serialize(source)
+        if not source or text in seen:
+            continue
+        seen.add(text)
+        cost = estimate_tokens(text) + 1
+        if cost > remaining:
+            if lines:
+                break
+            # Always include a (trimmed) top result rather than no context at all
+            text = _trim_to_budget(source, remaining - 1)
+            if text is None:
+                break
+            cost = estimate_tokens(text) + 1
+        lines.append(text)
+        remaining -= cost
+    return "\n".join(lines)
@@ -0,0 +1,214 @@
+"""
+Streaming reader for JSON corpus files.
+
+Supports three layouts without loading the whole file:
+    - concatenated JSON values, pretty-printed or not (which includes true JSON lines),
+    - a top-level JSON array of documents,
+    - an object holding the document array under a document root such as "/programs"
+      (the layout the blob indexer reads with parsing_mode="jsonArray").
+Each record is located with a byte-level scanner and decoded on its own, so memory
+use is bounded by the size of the largest document. Records carry their byte offsets
+so an interrupted ingestion can resume from the last processed record.
+"""
+from collections import namedtuple
+import json
+import mmap
+import re
+
+CorpusRecord = namedtuple("CorpusRecord", ["document", "offset", "end"])
+
+# Document root of the sample corpus, also used by the blob indexer (create_indexer)
+DEFAULT_DOCUMENT_ROOT = "/programs"
+
+_WHITESPACE = re.compile(rb"[ \t\r\n]*")
+_STRUCTURE = re.compile(rb'[{}\[\]"]')
+_STRING_END = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(rb"[^,\]}\s]+")
+
+
+def _value_end(buffer, start, stop, eof):
+    """
+    Returns the index just past the JSON value starting at buffer[start], or None if
+    the value is not complete within buffer[:stop].
+    """
+    first = buffer[start:start + 1]
+    if first == b'"':
+        match = _STRING_END.match(buffer, start + 1, stop)
+        return match.end() if match else None
+    if first not in (b"{", b"["):
+        match = _SCALAR.match(buffer, start, stop)
+        if not match or (match.end() == stop and not eof):
+            return None
+        return match.end()
+    depth = 0
+    position = start
+    while True:
+        match = _STRUCTURE.search(buffer, position, stop)
+        if not match:
+            return None
+        if match.group() == b'"':
+            string_end = _STRING_END.match(buffer, match.end(), stop)
+            if not string_end:
+                return None
+            position = string_end.end()
+            continue
+        depth += 1 if match.group() in (b"{", b"[") else -1
+        position = match.end()
+        if depth == 0:
+            return position
+
+
+class _Source:
+    """
+    A window over the file bytes: a growing read buffer, or the whole file when memory-mapped.
+    """
+    def __init__(self, path, start, chunk_size, use_mmap):
+        self.chunk_size = chunk_size
+        self.file = open(path, "rb")
+        if use_mmap:
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self._size() else b""
+            self.base = 0
+            self.position = start
+            self.eof = True
+        else:
+            self.file.seek(start)
+            self.buffer = b""
+            self.base = start
+            self.position = 0
+            self.eof = False
+
+    def _size(self):
+        self.file.seek(0, 2)
+        size = self.file.tell()
+        self.file.seek(0)
+        return size
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.file.close()
+
+    def _fill(self):
+        data = self.file.read(max(self.chunk_size, len(self.buffer) - self.position))
+        self.buffer = self.buffer[self.position:] + data
+        self.base += self.position
+        self.position = 0
+        self.eof = not data
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next byte, or b"" at the end of the file.
+        """
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self._fill()
+
+    def expect(self, token):
+        if self.peek() != token:
+            raise ValueError(f"Expected {token!r} at byte {self.base + self.position}")
+        self.position += 1
+
+    def take_value(self):
+        """
+        Returns (offset, end, raw bytes) of the next JSON value.
+        """
+        self.peek()
+        while True:
+            end = _value_end(self.buffer, self.position, len(self.buffer), self.eof)
+            if end is not None:
+                start, self.position = self.position, end
+                return self.base + start, self.base + end, bytes(self.buffer[start:end])
+            if self.eof:
+                raise ValueError(f"Truncated JSON value at byte {self.base + self.position}")
+            self._fill()
+
+
+def _detect_layout(path, document_root):
+    source = _Source(path, 0, 4096, use_mmap=False)
+    try:
+        first = source.peek()
+    finally:
+        source.close()
+    if first == b"[":
+        return "array"
+    if first == b"{" and document_root:
+        # Files of concatenated documents that lack the root key are read as a stream
+        source = _Source(path, 0, 4096, use_mmap=False)
+        try:
+            _enter_document_root(source, document_root)
+            return "root"
+        except ValueError:
+            return "stream"
+        finally:
+            source.close()
+    return "stream"
+
+
+def _enter_document_root(source, document_root):
+    """
+    Walks the object keys along the document root path and stops at the opening
+    bracket of the document array. Values of other keys are skipped.
+    """
+    for segment in [s for s in document_root.split("/") if s]:
+        source.expect(b"{")
+        while True:
+            if source.peek() == b"}":
+                raise ValueError(f"Document root '{document_root}' not found")
+            if source.peek() == b",":
+                source.position += 1
+            _, _, raw_key = source.take_value()
+            source.expect(b":")
+            if json.loads(raw_key) == segment:
+                break
+            source.take_value()
+    source.expect(b"[")
+
+
+def iter_records(path, document_root=None, start_offset=0, chunk_size=1024 * 1024, use_mmap=False):
+    """
+    Yields a CorpusRecord(document, offset, end) for every document in the file.
+    Parameters:
+        path (str): Corpus file.
+        document_root (str): Path of the document array inside a top-level object, e.g. "/programs".
+            Files whose first object has no such path are read as concatenated documents.
+        start_offset (int): Resume after a previous run by passing the `end` of the last processed record.
+        chunk_size (int): Bytes read per refill when not memory-mapped.
+        use_mmap (bool): Scan a memory map of the file instead of reading chunks.
+    """
+    layout = _detect_layout(path, document_root)
+    source = _Source(path, start_offset, chunk_size, use_mmap)
+    try:
+        if layout == "stream":
+            while source.peek():
+                offset, end, raw = source.take_value()
+                yield CorpusRecord(json.loads(raw), offset, end)
+            return
+
+        first = True
+        if not start_offset:
+            if layout == "root":
+                _enter_document_root(source, document_root)
+            else:
+                source.expect(b"[")
+        else:
+            first = False
+        while source.peek() != b"]":
+            if not source.peek():
+                raise ValueError(f"Unterminated document array in {path}")
+            if not first:
+                source.expect(b",")
+            first = False
+            offset, end, raw = source.take_value()
+            yield CorpusRecord(json.loads(raw), offset, end)
+    finally:
+        source.close()
+
+
+def iter_documents(path, **kwargs):
+    """
+    Yields the documents of a corpus file; see iter_records for the options.
+    """
+    for record in iter_records(path, **kwargs):
+        yield record.document
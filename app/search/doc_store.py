@@ -0,0 +1,172 @@
+"""
+Memory-mapped columnar document store used to hydrate search results locally.
+
+Documents are written to an uncompressed Arrow IPC file with one typed column per
+top-level field of the index schema (nested works and concerts as lists of structs).
+Top-level fields outside the schema are kept as JSON in an `_extra` column. The file
+is opened with a memory map, so reads are zero-copy and every process on the host
+shares the same page-cached copy. Rows are looked up by the schema key field, or by
+their position for documents without one (as in the local BM25 index).
+
+pyarrow is imported when a store is opened or written, so importing this module
+(and the search wrapper) stays cheap.
+"""
+from search.schema import INDEX_FIELDS, VECTOR_FIELD, key_field
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+_EXTRA_COLUMN = "_extra"
+
+
+def _arrow_type(spec):
+    import pyarrow as pa
+    if spec["type"] == "string":
+        return pa.string()
+    if spec["type"] == "string_collection":
+        return pa.list_(pa.string())
+    if spec["type"] == "complex_collection":
+        return pa.list_(pa.struct([pa.field(sub["name"], _arrow_type(sub)) for sub in spec["fields"]]))
+    raise ValueError(f"Unsupported field type '{spec['type']}'")
+
+
+def arrow_schema(fields=None):
+    """
+    Returns the Arrow schema of the store: the non-vector top-level index fields plus `_extra`.
+    """
+    import pyarrow as pa
+    columns = [pa.field(spec["name"], _arrow_type(spec)) for spec in (fields or INDEX_FIELDS) if spec["type"] != "vector"]
+    return pa.schema(columns + [pa.field(_EXTRA_COLUMN, pa.string())])
+
+
+class DocumentStoreWriter:
+    """
+    Streams documents into a new store file in record batches of batch_size rows.
+    Documents whose fields do not fit the schema types are skipped and counted in
+    `skipped`; push ingestion rejects them as well. The file replaces path atomically
+    when the writer is closed without error.
+    """
+    def __init__(self, path, batch_size=1024):
+        import pyarrow as pa
+        self.path = path
+        self.batch_size = batch_size
+        self.schema = arrow_schema()
+        self.columns = set(self.schema.names) - {_EXTRA_COLUMN}
+        self.count = 0
+        self.skipped = 0
+        self._rows = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._tmp_path = path + ".tmp"
+        self._sink = pa.OSFile(self._tmp_path, "wb")
+        self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+    def write(self, document):
+        row = {name: value for name, value in document.items() if name in self.columns}
+        extra = {name: value for name, value in document.items() if name not in self.columns and not name.startswith("@")}
+        extra.pop(VECTOR_FIELD, None)
+        row[_EXTRA_COLUMN] = json.dumps(extra, ensure_ascii=False) if extra else None
+        self._rows.append(row)
+        self.count += 1
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def tee(self, documents):
+        """
+        Yields documents unchanged while writing each one to the store.
+        """
+        for document in documents:
+            self.write(document)
+            yield document
+
+    def _flush(self):
+        import pyarrow as pa
+        if not self._rows:
+            return
+        try:
+            batch = pa.RecordBatch.from_pylist(self._rows, schema=self.schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Convert row by row to find the documents that do not fit the schema
+            rows = []
+            for row in self._rows:
+                try:
+                    pa.RecordBatch.from_pylist([row], schema=self.schema)
+                    rows.append(row)
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                    self.skipped += 1
+                    self.count -= 1
+                    logger.warning(f"Document store skips {row.get(key_field())!r}: {e}")
+            batch = pa.RecordBatch.from_pylist(rows, schema=self.schema)
+        self._writer.write_batch(batch)
+        self._rows = []
+
+    def close(self, commit=True):
+        try:
+            if commit:
+                self._flush()
+        finally:
+            self._writer.close()
+            self._sink.close()
+        if commit:
+            os.replace(self._tmp_path, self.path)
+        else:
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close(commit=exc_type is None)
+
+
+class DocumentStore:
+    """
+    Read-only view of a store file, mapped into memory.
+    """
+    def __init__(self, path):
+        import pyarrow as pa
+        self.path = path
+        self.table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        key = key_field()
+        self.row_of = {str(k) if k is not None else str(row): row for row, k in enumerate(self.table.column(key).to_pylist())}
+        self.mtime = os.path.getmtime(path)
+
+    @classmethod
+    def build(cls, path, documents, batch_size=1024):
+        """
+        Writes documents to a new store file at path and returns the opened store.
+        """
+        with DocumentStoreWriter(path, batch_size=batch_size) as writer:
+            for document in documents:
+                writer.write(document)
+        return cls(path)
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __contains__(self, key):
+        return key in self.row_of
+
+    def get_many(self, keys, select=None):
+        """
+        Returns the documents stored under keys, in order, with only the select fields
+        (all fields by default), or None for keys that are not in the store.
+        """
+        rows = [self.row_of.get(str(key)) for key in keys]
+        found = [row for row in rows if row is not None]
+        if not found:
+            return [None] * len(keys)
+        names = [name for name in self.table.column_names if select is None or name in select or name == _EXTRA_COLUMN]
+        documents = iter(self.table.select(names).take(found).to_pylist())
+        results = []
+        for row in rows:
+            if row is None:
+                results.append(None)
+                continue
+            document = next(documents)
+            extra = document.pop(_EXTRA_COLUMN, None)
+            if extra:
+                document.update({k: v for k, v in json.loads(extra).items() if select is None or k in select})
+            results.append({k: v for k, v in document.items() if v is not None})
+        return results
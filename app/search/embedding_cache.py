@@ -0,0 +1,168 @@
+"""
+On-disk embedding cache keyed by content hash and embedding model.
+
+Each model gets its own directory holding an append-only float32 matrix
+(vectors.f32) and the content hashes of its rows (hashes.txt), so re-embedding
+a mostly unchanged corpus only sends new or changed texts to the embedder.
+Writers hold an exclusive lock on the directory's lock file, so several processes
+(e.g. server.py workers and an ingest run) can share a cache.
+"""
+from search.scheduler import BULK
+from contextlib import contextmanager
+import hashlib
+import json
+import numpy as np
+import os
+import re
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock (Windows) a cache directory must only be written by one process
+    fcntl = None
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Append-only store of embeddings for one model, looked up by content hash.
+    """
+    def __init__(self, directory, model, dimensions):
+        self.model = model
+        self.dimensions = dimensions
+        self.directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", f"{model}-{dimensions}"))
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._hashes_path = os.path.join(self.directory, "hashes.txt")
+        self._lock_path = os.path.join(self.directory, "lock")
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._row_count = 0
+        self._vectors = None
+        os.makedirs(self.directory, exist_ok=True)
+        with self._locked():
+            with open(os.path.join(self.directory, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"model": model, "dimensions": dimensions}, f)
+            self._repair()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Holds the cross-process lock of the cache directory; it is released when the
+        lock file is closed.
+        """
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _file_rows(self, path, row_size):
+        return os.path.getsize(path) // row_size if os.path.exists(path) else 0
+
+    def _repair(self):
+        """
+        Loads the hashes and truncates both files to the rows present in both, so a write
+        interrupted between the vector and the hash append cannot misalign later rows.
+        Called with the directory lock held.
+        """
+        hashes = []
+        if os.path.exists(self._hashes_path):
+            with open(self._hashes_path, encoding="utf-8") as f:
+                # Only newline-terminated lines are complete
+                hashes = f.read().split("\n")[:-1]
+        row_size = 4 * self.dimensions
+        vector_rows = self._file_rows(self._vectors_path, row_size)
+        rows = min(len(hashes), vector_rows)
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) != rows * row_size:
+            os.truncate(self._vectors_path, rows * row_size)
+        if os.path.exists(self._hashes_path) and os.path.getsize(self._hashes_path) != 65 * rows:
+            tmp_path = self._hashes_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("".join(f"{h}\n" for h in hashes[:rows]))
+            os.replace(tmp_path, self._hashes_path)
+        self._rows = {h: row for row, h in enumerate(hashes[:rows])}
+        self._row_count = rows
+
+    def _refresh(self):
+        """
+        Reloads the hashes if another process appended rows since the last load (or left
+        a partial write behind). Called with the directory lock held.
+        """
+        if (self._file_rows(self._hashes_path, 65), self._file_rows(self._vectors_path, 4 * self.dimensions)) != (self._row_count, self._row_count):
+            self._repair()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _matrix(self):
+        if self._vectors is None or len(self._vectors) < self._row_count:
+            # Mapped to the known rows only, as another process may be appending
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._row_count, self.dimensions)) if self._row_count else None
+        return self._vectors
+
+    def get_many(self, hashes):
+        """
+        Returns {hash: vector} for the hashes present in the cache.
+        """
+        with self._lock:
+            found = [(h, self._rows[h]) for h in hashes if h in self._rows]
+            if not found:
+                return {}
+            matrix = self._matrix()
+            return {h: np.array(matrix[row]) for h, row in found}
+
+    def put_many(self, hashes, vectors):
+        """
+        Appends the vectors of hashes that are not cached yet, including by other processes.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(hashes), self.dimensions)
+        with self._lock, self._locked():
+            self._refresh()
+            new = [position for position, h in enumerate(hashes) if h not in self._rows]
+            new = list({hashes[p]: p for p in new}.values())
+            if not new:
+                return
+            # The files hold whole, aligned rows after _refresh, so the size gives the next row
+            start = self._file_rows(self._vectors_path, 4 * self.dimensions)
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors[new].tobytes())
+            with open(self._hashes_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{hashes[p]}\n" for p in new))
+            for row, position in enumerate(new, start):
+                self._rows[hashes[position]] = row
+            self._row_count = start + len(new)
+
+
+class CachedEmbedder:
+    """
+    Wraps an embedder so that only texts missing from the cache are embedded,
+    in batches of batch_size at bulk priority.
+    """
+    def __init__(self, embedder, directory, batch_size=256):
+        self.embedder = embedder
+        self.model = getattr(embedder, "model", type(embedder).__name__)
+        self.dimensions = embedder.dimensions
+        self.semantic = getattr(embedder, "semantic", False)
+        self.cache = EmbeddingCache(directory, self.model, self.dimensions)
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, texts, priority=BULK):
+        hashes = [content_hash(text) for text in texts]
+        cached = self.cache.get_many(hashes)
+        missing = list({h: text for h, text in zip(hashes, texts) if h not in cached}.items())
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            vectors = self.embedder([text for _, text in batch], priority=priority)
+            self.cache.put_many([h for h, _ in batch], vectors)
+            cached.update(zip((h for h, _ in batch), np.asarray(vectors, dtype=np.float32)))
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, h in enumerate(hashes):
+            vectors[row] = cached[h]
+        return vectors
@@ -0,0 +1,110 @@
+"""
+Text embedders used by the local vector index.
+
+An embedder is any callable that takes a list of strings (and an optional
+scheduler priority) and returns a float32 NumPy array of shape (len(texts), dimensions).
+"""
+from search.bm25_index import field_values, tokenize
+from search.context import estimate_tokens
+from search.scheduler import INTERACTIVE, get_scheduler
+from search.schema import SEARCHABLE_FIELDS, VECTOR_DIMENSIONS, VECTOR_FIELD, VECTORIZER_MODEL
+import hashlib
+import numpy as np
+import os
+
+
+def document_text(document, fields=None):
+    """
+    Concatenates the values of the given dotted field paths into a single string to embed.
+    """
+    return " ".join(value for path in (fields or SEARCHABLE_FIELDS) for value in field_values(document, path))
+
+
+def embed_documents(documents, embedder, fields=None, batch_size=256):
+    """
+    Lazily yields the documents with their embedding written into the index's vector
+    field, embedding batch_size documents per embedder call.
+    """
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield from _embed_batch(batch, embedder, fields)
+            batch = []
+    if batch:
+        yield from _embed_batch(batch, embedder, fields)
+
+
+def _embed_batch(batch, embedder, fields):
+    vectors = embedder([document_text(document, fields) for document in batch])
+    for document, vector in zip(batch, vectors):
+        yield {**document, VECTOR_FIELD: vector.tolist()}
+
+
+class HashingEmbedder:
+    """
+    Deterministic, network-free embedder based on signed feature hashing of word tokens.
+    It has no semantic knowledge but is stable across processes, which makes it usable
+    for offline runs and tests. Its vectors are never pushed into the azure index.
+    """
+    # Bag-of-words vectors: texts with the same words in any order are identical
+    semantic = False
+
+    def __init__(self, dimensions=VECTOR_DIMENSIONS):
+        self.dimensions = dimensions
+        self.model = f"hashing-{dimensions}"
+
+    def __call__(self, texts, priority=INTERACTIVE):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        return vectors
+
+
+class AzureOpenAIEmbedder:
+    """
+    Embedder backed by an Azure OpenAI embedding deployment. Requests go through the
+    "openai" upstream scheduler; identical concurrent batches share one request.
+    """
+    semantic = True
+
+    def __init__(self, client, model=VECTORIZER_MODEL, dimensions=VECTOR_DIMENSIONS, batch_size=64):
+        self.client = client
+        self.model = model
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+
+    def __call__(self, texts, priority=INTERACTIVE):
+        scheduler = get_scheduler("openai")
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            response = scheduler.call(
+                self.client.embeddings.create,
+                model=self.model,
+                input=batch,
+                dimensions=self.dimensions,
+                priority=priority,
+                tokens=sum(estimate_tokens(text) for text in batch),
+                key=(self.model, self.dimensions, tuple(batch)),
+            )
+            vectors.extend(item.embedding for item in response.data)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dimensions)
+
+
+def create_embedder(name=None):
+    """
+    Creates the embedder selected by name or the EMBEDDER environment variable:
+    "hashing" (default) or "azure".
+    """
+    name = name or os.getenv("EMBEDDER") or "hashing"
+    if name == "hashing":
+        return HashingEmbedder()
+    if name == "azure":
+        from search.clients import get_openai_client
+        client = get_openai_client(os.getenv("AZURE_OPENAI_ENDPOINT"), os.getenv("AZURE_OPENAI_API_KEY"), os.getenv("AZURE_OPENAI_API_VERSION"))
+        return AzureOpenAIEmbedder(client, model=os.getenv("AZURE_OPENAI_EMBEDDING_MODEL") or VECTORIZER_MODEL)
+    raise ValueError(f"Unknown embedder '{name}', expected 'hashing' or 'azure'")
@@ -0,0 +1,191 @@
+"""
+Query-to-filter pushdown.
+
+Known entity values (composers, conductors, venues, ...) are collected from the
+filterable and facetable fields of the index into a facet vocabulary that is cached
+on disk and refreshed periodically. QueryAnalyzer looks for those values in a query
+and turns them into an OData filter that is sent alongside the text query, e.g.
+"Ludwig van Beethoven at Carnegie Hall" ->
+    works/any(w: w/composerName eq 'Beethoven,  Ludwig  van') and concerts/any(c: c/Venue eq 'Carnegie Hall')
+"""
+from search.bm25_index import field_values, tokenize
+from search.odata import quote
+from search.retrieval import STOPWORDS
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Filterable and facetable string fields whose values are matched in queries. Work
+# titles are left out: generic titles ("March", "Overture") match ordinary words.
+FILTER_FIELDS = ["orchestra", "season", "concerts.Location", "concerts.Venue", "works.composerName", "works.conductorName"]
+
+# Fields holding "Last, First" names, which are also matched by "First Last". A surname
+# alone is not matched: it is often shared ("Strauss", "Bach") and would filter out the
+# namesakes, so it is left to the ranking of the text query.
+PERSON_FIELDS = {"works.composerName", "works.conductorName"}
+
+
+def local_facets(index, fields=FILTER_FIELDS):
+    """
+    Collects the distinct values of fields from the documents of a local BM25 index.
+    """
+    vocabulary = {field: set() for field in fields}
+    for _, document in index.items():
+        for field in fields:
+            vocabulary[field].update(field_values(document, field))
+    return {field: sorted(values) for field, values in vocabulary.items()}
+
+
+def azure_facets(search_client, fields=FILTER_FIELDS, count=1000):
+    """
+    Collects up to count values per field from the facets of an Azure AI Search index.
+    """
+    paths = {field.replace(".", "/"): field for field in fields}
+    results = search_client.search(search_text="*", facets=[f"{path},count:{count}" for path in paths], top=0)
+    facets = results.get_facets() or {}
+    return {paths[path]: [facet["value"] for facet in facets.get(path, []) if isinstance(facet.get("value"), str)] for path in paths}
+
+
+class FacetVocabulary:
+    """
+    The facet values of the index, cached on disk at path and fetched again with
+    fetch() once they are older than ttl seconds.
+    """
+    def __init__(self, path, fetch, ttl=3600):
+        self.path = path
+        self.fetch = fetch
+        self.ttl = ttl
+        self.built = 0.0
+        self._fields = None
+        self._generation = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Returns {field: [values]}, refreshing the vocabulary when it is stale. One caller
+        fetches while the others keep getting the previous vocabulary (empty before the
+        first fetch), so queries never wait on a refresh started by another. If the
+        refresh fails the previous vocabulary is kept.
+        """
+        with self._lock:
+            if self._fields is None and os.path.exists(self.path):
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        cached = json.load(f)
+                    self._fields, self.built = cached["fields"], cached["built"]
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Ignoring unreadable facet vocabulary {self.path}: {e}")
+            if self._fields is not None and time.time() - self.built <= self.ttl:
+                return self._fields
+            if self._refreshing:
+                return self._fields or {}
+            self._refreshing = True
+            generation = self._generation
+
+        try:
+            fields = self.fetch()
+        except Exception as e:
+            logger.warning(f"Could not refresh the facet vocabulary: {e}")
+            fields = None
+
+        with self._lock:
+            self._refreshing = False
+            if fields is not None:
+                self._fields = fields
+                # Invalidated while fetching: the fetched values may predate the change
+                self.built = time.time() if generation == self._generation else 0.0
+                self._save()
+            elif self._fields is None:
+                self._fields = {}
+            return self._fields
+
+    def invalidate(self):
+        """
+        Marks the vocabulary as stale so the next get() fetches it again.
+        """
+        with self._lock:
+            self.built = 0.0
+            self._generation += 1
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"built": self.built, "fields": self._fields}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _aliases(field, value):
+    aliases = [value]
+    if field in PERSON_FIELDS and "," in value:
+        last, first = value.split(",", 1)
+        aliases.append(f"{first} {last}")
+    return aliases
+
+
+def _clause(field, values):
+    values = sorted(values)
+    if "." not in field:
+        return f"{field} eq {quote(values[0])}" if len(values) == 1 else f"search.in({field}, {quote('|'.join(values))}, '|')"
+    collection, name = field.split(".", 1)
+    variable = collection[0]
+    path = f"{variable}/{name}"
+    condition = f"{path} eq {quote(values[0])}" if len(values) == 1 else f"search.in({path}, {quote('|'.join(values))}, '|')"
+    return f"{collection}/any({variable}: {condition})"
+
+
+class QueryAnalyzer:
+    """
+    Finds vocabulary values in queries by longest match over word tokens.
+    Single-word matches shorter than min_length characters or that are stopwords are ignored.
+    """
+    def __init__(self, vocabulary, min_length=4, max_tokens=8):
+        self.max_tokens = max_tokens
+        self.phrases = {}
+        for field, values in vocabulary.items():
+            for value in values:
+                if "|" in value:
+                    continue
+                for alias in _aliases(field, value):
+                    tokens = tuple(tokenize(alias))
+                    if not tokens or len(tokens) > max_tokens:
+                        continue
+                    if len(tokens) == 1 and (len(tokens[0]) < min_length or tokens[0] in STOPWORDS):
+                        continue
+                    self.phrases.setdefault(tokens, {}).setdefault(field, set()).add(value)
+
+    def match(self, query):
+        """
+        Returns the matched phrases of the query as a list of {field: {values}} dicts.
+        """
+        tokens = tokenize(query or "")
+        matches = []
+        position = 0
+        while position < len(tokens):
+            for length in range(min(self.max_tokens, len(tokens) - position), 0, -1):
+                fields = self.phrases.get(tuple(tokens[position:position + length]))
+                if fields:
+                    matches.append(fields)
+                    position += length
+                    break
+            else:
+                position += 1
+        return matches
+
+    def filter_for(self, query):
+        """
+        Returns the OData filter for the entities found in the query, or None. A phrase
+        that matches several fields (e.g. a composer who also conducted) requires any of them.
+        """
+        clauses = []
+        for fields in self.match(query):
+            alternatives = [_clause(field, values) for field, values in sorted(fields.items())]
+            clause = alternatives[0] if len(alternatives) == 1 else "(" + " or ".join(alternatives) + ")"
+            if clause not in clauses:
+                clauses.append(clause)
+        return " and ".join(clauses) or None
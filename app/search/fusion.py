@@ -0,0 +1,16 @@
+"""
+Rank fusion helpers for combining several ranked result lists.
+"""
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Merges ranked lists of keys with reciprocal-rank fusion: each key scores
+    sum(1 / (k + rank)) over the lists it appears in (rank starting at 1).
+    Returns a list of (key, score) sorted by descending score.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,151 @@
+"""
+Push-mode ingestion: streams documents into the index through the document upload
+API instead of waiting for a scheduled blob indexer run.
+"""
+from search.scheduler import BULK
+from search.schema import key_field, validate_document
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import json
+import random
+import time
+
+# Limits of a single indexing request in Azure AI Search
+MAX_BATCH_DOCUMENTS = 1000
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+# Per-document status codes worth retrying (version conflicts). Throttled and unavailable
+# requests are retried by the scheduler, the only retry layer for upstream calls.
+RETRYABLE_STATUS_CODES = {409, 422}
+
+
+@dataclass
+class IngestReport:
+    """
+    Outcome of a push ingestion run, keyed by document key.
+    """
+    indexed: int = 0
+    batches: int = 0
+    retries: int = 0
+    invalid: dict = field(default_factory=dict)
+    failed: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return not self.invalid and not self.failed
+
+
+def iter_batches(documents, max_documents=MAX_BATCH_DOCUMENTS, max_bytes=MAX_BATCH_BYTES):
+    """
+    Groups documents into lists bounded by document count and serialized size.
+    """
+    batch, size = [], 0
+    for document in documents:
+        document_size = len(json.dumps(document, separators=(",", ":")).encode("utf-8"))
+        if batch and (len(batch) >= max_documents or size + document_size > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(document)
+        size += document_size
+    if batch:
+        yield batch
+
+
+def _backoff(attempt, base=0.5, cap=30.0):
+    time.sleep(min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+
+def _push_batch(client, batch, merge, max_retries, scheduler=None):
+    """
+    Sends one batch, retrying conflicting documents with backoff. A request rejected as
+    too large (413) is split in two; other failed requests fail their documents. With a
+    scheduler, requests are sent as bulk calls through it, which retries throttled ones.
+    Returns (indexed count, {key: error} of documents that finally failed, retries).
+    """
+    upload = client.merge_or_upload_documents if merge else client.upload_documents
+    key = key_field()
+    pending = batch
+    failed = {}
+    indexed = 0
+    retries = 0
+    for attempt in range(max_retries + 1):
+        try:
+            if scheduler is not None:
+                results = scheduler.call(upload, documents=pending, priority=BULK)
+            else:
+                results = upload(documents=pending)
+        except Exception as e:
+            status_code = getattr(e, "status_code", None)
+            if status_code == 413 and len(pending) > 1:
+                middle = len(pending) // 2
+                for half in (pending[:middle], pending[middle:]):
+                    half_indexed, half_failed, half_retries = _push_batch(client, half, merge, max_retries, scheduler)
+                    indexed += half_indexed
+                    failed.update(half_failed)
+                    retries += half_retries
+                return indexed, failed, retries
+            failed.update({document[key]: str(e) for document in pending})
+            return indexed, failed, retries
+
+        by_key = {document[key]: document for document in pending}
+        pending = []
+        for result in results:
+            if result.succeeded:
+                indexed += 1
+            elif result.status_code in RETRYABLE_STATUS_CODES and attempt < max_retries:
+                pending.append(by_key[result.key])
+            else:
+                failed[result.key] = result.error_message or f"status {result.status_code}"
+        if not pending:
+            break
+        retries += 1
+        _backoff(attempt)
+    return indexed, failed, retries
+
+
+def push_documents(client, documents, merge=False, max_documents=MAX_BATCH_DOCUMENTS, max_bytes=MAX_BATCH_BYTES, max_in_flight=4, max_retries=3, scheduler=None):
+    """
+    Validates documents against the index schema and pushes the valid ones to the index
+    in size-bounded batches, keeping up to max_in_flight batches in flight at once.
+    Parameters:
+        client: A SearchClient (or compatible object) exposing upload_documents and merge_or_upload_documents.
+        documents (iterable): Documents to index, consumed lazily.
+        merge (bool): Use merge_or_upload_documents instead of upload_documents.
+        scheduler (Scheduler): Upstream scheduler to send the batches through at bulk priority,
+            which retries throttled requests. Without one, they fail their documents.
+    Returns:
+        IngestReport: Counts of indexed documents and the invalid and failed keys with their errors.
+    """
+    report = IngestReport()
+    started = time.perf_counter()
+    key = key_field()
+
+    def valid_documents():
+        for position, document in enumerate(documents):
+            errors = validate_document(document)
+            if errors:
+                document_key = document.get(key) if isinstance(document, dict) else None
+                report.invalid[document_key or f"#{position}"] = errors
+            else:
+                yield document
+
+    def collect(done):
+        for future in done:
+            indexed, failed, retries = future.result()
+            report.indexed += indexed
+            report.failed.update(failed)
+            report.retries += retries
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        in_flight = set()
+        for batch in iter_batches(valid_documents(), max_documents=max_documents, max_bytes=max_bytes):
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(executor.submit(_push_batch, client, batch, merge, max_retries, scheduler))
+            report.batches += 1
+        collect(wait(in_flight).done)
+
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -1,6 +1,6 @@
 from blob_wrapper import BlobWrapper
 from search_wrapper import SearchWrapper
-import time
+import os
 
 # Initialize search service
 search_service = SearchWrapper()
@@ -10,15 +10,37 @@ blob_service = BlobWrapper()
 
 # main
 
-if __name__ == "__main__":
-    # Upload all files from the source directory (if any)
-    blob_service.upload_all()
+if __name__ == "__main__" and os.getenv("INGESTION_MODE") == "push":
+    # Create or update the index without the blob indexer, then push the local corpus into it
+    search_service.run_config_pipeline(indexer=False)
+    report = search_service.ingest()
+    print(f"Pushed {report.indexed} documents in {report.batches} batches ({report.retries} retries) in {report.elapsed:.1f}s")
+    for key, errors in {**report.invalid, **report.failed}.items():
+        print(f"  {key}: {errors}")
 
-    # Create or update the search service configuration
+    # Query the search service
+    print(list(search_service.search("puccini")))
+
+elif __name__ == "__main__":
+    # Upload new and changed files from the source directory (if any)
+    report = blob_service.sync()
+    print(f"Blob sync: {len(report.uploaded)} uploaded, {len(report.skipped)} unchanged, {len(report.failed)} failed in {report.elapsed:.1f}s")
+    for name, error in report.failed.items():
+        print(f"  {name}: {error}")
+
+    # Create or update the search service configuration (unchanged resources are skipped)
     search_service.run_config_pipeline()
     
-    # Wait for the indexer to finish
-    time.sleep(30)
+    # Wait for the indexer run to finish
+    progress = search_service.wait_for_indexer(
+        on_progress=lambda p: print(f"Indexer {p.status}: {p.items_processed} processed, {p.items_failed} failed, {p.elapsed:.0f}s")
+    )
+    if progress.error_message:
+        print(f"Indexer error: {progress.error_message}")
+
+    # Keep a local copy of the indexed blobs for hydrating search results
+    if search_service.hydrate:
+        search_service.build_document_store(documents=blob_service.iter_documents(document_root=search_service.document_root))
 
     # Query the search service
     print(list(search_service.search("puccini")))
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Evaluates the subset of OData $filter expressions that SearchWrapper pushes down,
+so the local backend can apply the same filters as Azure AI Search.
+
+Supported: eq and ne against string, number, true/false and null literals,
+search.in(field, 'a|b', '|'), collection any/all lambdas (works/any(w: ...)),
+and / or / not and parentheses. Field paths use OData slashes (works/composerName).
+"""
+from functools import lru_cache
+import re
+
+_TOKEN_PATTERN = re.compile(r"\s*(?:('(?:[^']|'')*')|([(),:])|(-?\d+(?:\.\d+)?)|([A-Za-z_][\w./]*))")
+
+
+def quote(value):
+    """
+    Formats a value as an OData string literal.
+    """
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if not match:
+            raise ValueError(f"Invalid filter near '{expression[position:position + 20]}'")
+        string, punct, number, word = match.groups()
+        if string is not None:
+            tokens.append(("literal", string[1:-1].replace("''", "'")))
+        elif punct is not None:
+            tokens.append(("punct", punct))
+        elif number is not None:
+            tokens.append(("literal", float(number) if "." in number else int(number)))
+        elif word in ("true", "false", "null"):
+            tokens.append(("literal", {"true": True, "false": False, "null": None}[word]))
+        else:
+            tokens.append(("word", word))
+        position = match.end()
+    return tokens
+
+
+def _resolve(path, document, scope):
+    parts = path.split("/")
+    if parts[0] in scope:
+        value = scope[parts[0]]
+        parts = parts[1:]
+    else:
+        value = document
+    for part in parts:
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+class _Parser:
+    def __init__(self, expression):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (value is not None and token[1] != value):
+            raise ValueError(f"Invalid filter: expected {value or kind}, got {token[1]!r}")
+        self.position += 1
+        return token[1]
+
+    def parse(self):
+        predicate = self.parse_or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Invalid filter: unexpected {self.peek()[1]!r}")
+        return predicate
+
+    def parse_or(self):
+        terms = [self.parse_and()]
+        while self.peek() == ("word", "or"):
+            self.take()
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else (lambda d, s: any(t(d, s) for t in terms))
+
+    def parse_and(self):
+        terms = [self.parse_unary()]
+        while self.peek() == ("word", "and"):
+            self.take()
+            terms.append(self.parse_unary())
+        return terms[0] if len(terms) == 1 else (lambda d, s: all(t(d, s) for t in terms))
+
+    def parse_unary(self):
+        if self.peek() == ("word", "not"):
+            self.take()
+            operand = self.parse_unary()
+            return lambda d, s: not operand(d, s)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        if self.peek() == ("punct", "("):
+            self.take()
+            inner = self.parse_or()
+            self.take("punct", ")")
+            return inner
+        word = self.take("word")
+        if word == "search.in":
+            return self.parse_search_in()
+        if word.endswith("/any") or word.endswith("/all"):
+            return self.parse_lambda(word[:-4], any if word.endswith("/any") else all)
+        operator = self.take("word")
+        literal = self.take("literal")
+        if operator == "eq":
+            return lambda d, s: _resolve(word, d, s) == literal
+        if operator == "ne":
+            return lambda d, s: _resolve(word, d, s) != literal
+        raise ValueError(f"Unsupported filter operator '{operator}'")
+
+    def parse_search_in(self):
+        self.take("punct", "(")
+        path = self.take("word")
+        self.take("punct", ",")
+        values = self.take("literal")
+        delimiters = " ,"
+        if self.peek() == ("punct", ","):
+            self.take()
+            delimiters = self.take("literal")
+        self.take("punct", ")")
+        allowed = {v for v in re.split("[" + re.escape(delimiters) + "]", values) if v}
+        return lambda d, s: _resolve(path, d, s) in allowed
+
+    def parse_lambda(self, path, quantifier):
+        self.take("punct", "(")
+        variable = self.take("word")
+        self.take("punct", ":")
+        body = self.parse_or()
+        self.take("punct", ")")
+
+        def predicate(d, s):
+            items = _resolve(path, d, s)
+            if not isinstance(items, list):
+                return quantifier is all
+            return quantifier(body(d, {**s, variable: item}) for item in items)
+        return predicate
+
+
+@lru_cache(maxsize=256)
+def compile_filter(expression):
+    """
+    Compiles a filter expression into a predicate taking a document. Raises
+    ValueError for syntax outside the supported subset.
+    """
+    predicate = _Parser(expression).parse()
+    return lambda document: bool(predicate(document, {}))
@@ -0,0 +1,64 @@
+"""
+Query-result cache for SearchWrapper.
+"""
+from cachetools import TTLCache
+import threading
+
+
+def normalize_query(query):
+    """
+    Casefolds the query and collapses whitespace so trivially different spellings share an entry.
+    """
+    return " ".join((query or "").casefold().split())
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with time-to-live expiry, keyed by normalized query text
+    and search parameters. Keeps hit and miss counters.
+    """
+    def __init__(self, maxsize=256, ttl=300):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query, **params):
+        """
+        Builds a hashable cache key from the query and its search parameters.
+        """
+        return (normalize_query(query), tuple(sorted((k, repr(v)) for k, v in params.items())))
+
+    def get(self, key):
+        """
+        Returns the cached value for key, or None on a miss.
+        """
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """
+        Returns a dict with the current size, hits, misses and hit rate.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,107 @@
+"""
+Local reranking of a wide candidate set, in place of the service-side semantic ranker.
+
+Candidates are scored in one batched NumPy pass: for every candidate and rerank field,
+the share of query terms found in the field (weighted by how rare the term is among
+the candidates), combined with per-field weights, the normalized retrieval score and
+optionally the cosine similarity between query and document embeddings.
+"""
+from search.bm25_index import field_values, tokenize
+from search.embeddings import document_text
+from search.retrieval import STOPWORDS
+from functools import lru_cache
+import numpy as np
+
+# Weight of a full query-term match per field
+RERANK_FIELDS = {
+    "works.composerName": 3.0,
+    "works.workTitle": 2.0,
+    "works.conductorName": 2.0,
+    "concerts.Venue": 1.0,
+}
+
+
+def parse_weights(text):
+    """
+    Parses "field:weight,field:weight" (e.g. RERANK_FIELD_WEIGHTS) into a dict.
+    """
+    weights = {}
+    for item in (text or "").split(","):
+        if item.strip():
+            field, _, weight = item.partition(":")
+            weights[field.strip()] = float(weight or 1.0)
+    return weights
+
+
+@lru_cache(maxsize=65536)
+def _value_tokens(value):
+    # Names, titles and venues repeat across candidates and queries, so tokenize each once
+    return frozenset(tokenize(value))
+
+
+class Reranker:
+    """
+    Reorders search results by field-weighted query-term overlap.
+    Parameters:
+        fields (dict): Dotted field path -> weight, defaults to RERANK_FIELDS.
+        retrieval_weight (float): Weight of the retrieval score, min-max normalized over the candidates.
+        embedding_weight (float): Weight of the query-document cosine similarity; 0 skips embedding.
+        query_embedder, document_embedder: Embedders used when embedding_weight is set.
+    """
+    def __init__(self, fields=None, retrieval_weight=1.0, embedding_weight=0.0, query_embedder=None, document_embedder=None):
+        self.fields = dict(fields or RERANK_FIELDS)
+        self.paths = list(self.fields)
+        self.weights = np.array([self.fields[path] for path in self.paths], dtype=np.float32)
+        self.retrieval_weight = retrieval_weight
+        self.embedding_weight = embedding_weight
+        self.query_embedder = query_embedder
+        self.document_embedder = document_embedder or query_embedder
+
+    @property
+    def top_level_fields(self):
+        """
+        The top-level fields candidates must include to be reranked.
+        """
+        return {path.split(".", 1)[0] for path in self.paths}
+
+    def scores(self, query, documents):
+        """
+        Returns the rerank score of each document as a float32 array.
+        """
+        scores = np.zeros(len(documents), dtype=np.float32)
+        if not documents:
+            return scores
+
+        retrieval = np.array([document.get("@search.score") or 0.0 for document in documents], dtype=np.float32)
+        spread = retrieval.max() - retrieval.min()
+        scores += self.retrieval_weight * ((retrieval - retrieval.min()) / spread if spread > 0 else np.ones_like(retrieval))
+
+        terms = {term: column for column, term in enumerate(dict.fromkeys(t for t in tokenize(query or "") if t not in STOPWORDS))}
+        if terms:
+            # matches[document, field, term] is set when the term occurs in the field
+            matches = np.zeros((len(documents), len(self.paths), len(terms)), dtype=bool)
+            for row, document in enumerate(documents):
+                for field, path in enumerate(self.paths):
+                    for value in field_values(document, path):
+                        for token in terms.keys() & _value_tokens(value):
+                            matches[row, field, terms[token]] = True
+            document_frequency = matches.any(axis=1).sum(axis=0)
+            term_weights = np.log1p(len(documents) / (1.0 + document_frequency)).astype(np.float32)
+            overlap = matches @ term_weights / term_weights.sum()
+            scores += overlap @ self.weights
+
+        if self.embedding_weight and self.query_embedder is not None:
+            query_vector = np.asarray(self.query_embedder([query])[0], dtype=np.float32)
+            vectors = np.asarray(self.document_embedder([document_text(document, self.paths) for document in documents]), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query_vector) or 1.0)
+            scores += self.embedding_weight * (vectors @ query_vector) / np.where(norms > 0, norms, 1.0)
+        return scores
+
+    def rerank(self, query, documents, k):
+        """
+        Returns the best k documents, each with its "@search.reranker_score".
+        Ties keep the retrieval order.
+        """
+        scores = self.scores(query, documents)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [{**documents[position], "@search.reranker_score": float(scores[position])} for position in order]
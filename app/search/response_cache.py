@@ -0,0 +1,141 @@
+"""
+Semantic cache for grounded chat completions.
+"""
+from search.query_cache import normalize_query
+from collections import OrderedDict
+import hashlib
+import json
+import numpy as np
+import re
+import threading
+
+_CHUNK_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+def _content_hash(result):
+    content = {k: v for k, v in result.items() if not k.startswith("@search.")}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def source_ids(results, key_field="programID"):
+    """
+    Returns a tuple identifying the retrieved sources: their key field when present,
+    otherwise a hash of the result content.
+    """
+    return tuple(str(result[key_field]) if result.get(key_field) is not None else _content_hash(result) for result in results)
+
+
+def sources_fingerprint(results, key_field="programID"):
+    """
+    Returns a tuple of (id, content hash) per retrieved source, used to key cached
+    answers: an answer is only reused while its sources are unchanged, even when
+    documents are edited or replaced without changing the index document count.
+    """
+    return tuple(zip(source_ids(results, key_field), (_content_hash(result) for result in results)))
+
+
+def conversation_key(history):
+    """
+    Returns a hash of the conversation history a question is asked in, or None without
+    history. A follow-up question only matches answers given in the same conversation.
+    """
+    if not history:
+        return None
+    return hashlib.sha1(json.dumps(history, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def question_key(question, embedder):
+    """
+    Returns what the cache matches a question by: its embedding when the embedder is a
+    semantic model, otherwise the normalized question text. Bag-of-words embeddings such
+    as HashingEmbedder's are equal for "did X influence Y" and "did Y influence X", so
+    they only allow exact matches.
+    """
+    if getattr(embedder, "semantic", False):
+        return embedder([question])[0]
+    return normalize_query(question)
+
+
+def replay(answer):
+    """
+    Yields a cached answer word by word so it can be rendered with st.write_stream.
+    """
+    yield from _CHUNK_PATTERN.findall(answer)
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of answers keyed by question, retrieved source ids and
+    conversation (see conversation_key). Questions are given as question_key returns
+    them. An embedding matches the most similar cached question grounded on the same
+    sources in the same conversation when its cosine similarity reaches `threshold`;
+    a question text only matches the same text. The cache is emptied whenever
+    `check_version` sees a new index version.
+    """
+    def __init__(self, maxsize=512, threshold=0.95):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(query):
+        if isinstance(query, str):
+            return query
+        embedding = np.asarray(query, dtype=np.float32)
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+    def check_version(self, version):
+        """
+        Clears the cache if the index version differs from the one the entries were built on.
+        """
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def _find(self, query, key):
+        if isinstance(query, str):
+            return next((entry_id for entry_id, entry in self._entries.items() if entry[1] == key and isinstance(entry[0], str) and entry[0] == query), None)
+        candidates = [(entry_id, entry) for entry_id, entry in self._entries.items() if entry[1] == key and not isinstance(entry[0], str)]
+        if not candidates:
+            return None
+        similarities = np.stack([entry[0] for _, entry in candidates]) @ query
+        best = int(np.argmax(similarities))
+        return candidates[best][0] if similarities[best] >= self.threshold else None
+
+    def lookup(self, query, sources, conversation=None):
+        """
+        Returns the cached answer for the nearest (embedding) or same (text) question with
+        the same sources and conversation, or None.
+        """
+        query = self._normalize(query)
+        with self._lock:
+            entry_id = self._find(query, (tuple(sources), conversation))
+            if entry_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id][2]
+
+    def put(self, query, sources, answer, conversation=None):
+        """
+        Stores an answer, evicting the least recently used entries beyond maxsize.
+        """
+        with self._lock:
+            self._entries[self._next_id] = (self._normalize(query), (tuple(sources), conversation), answer)
+            self._next_id += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,74 @@
+"""
+Multi-query retrieval: runs several variants of a question concurrently and merges
+their results with reciprocal-rank fusion.
+"""
+from search.bm25_index import tokenize
+from search.fusion import reciprocal_rank_fusion
+from search.response_cache import source_ids
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no retrieval signal in conversational questions
+STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "at", "by", "can", "could", "did", "do", "does",
+    "for", "from", "had", "has", "have", "how", "i", "in", "is", "it", "me", "many", "much",
+    "of", "on", "or", "please", "show", "tell", "that", "the", "there", "was", "were", "what",
+    "when", "where", "which", "who", "whom", "why", "with", "you",
+}
+
+# Fields searched by the field-targeted variant
+TARGET_FIELDS = ["works/composerName", "works/workTitle"]
+
+
+def rewrite_query(question):
+    """
+    Reduces a conversational question to its keywords, e.g.
+    "Who conducted Tosca in 1950?" -> "conducted tosca 1950".
+    """
+    return " ".join(token for token in tokenize(question) if token not in STOPWORDS)
+
+
+def query_variants(question):
+    """
+    Returns the distinct query variants to run for a question, as keyword arguments
+    for SearchWrapper.search: the raw question, its keyword rewrite, and the rewrite
+    restricted to the composer and work title fields.
+    """
+    rewritten = rewrite_query(question)
+    variants = [{"query": question}]
+    if rewritten and rewritten != question.strip().lower():
+        variants.append({"query": rewritten})
+    if rewritten:
+        variants.append({"query": rewritten, "search_fields": TARGET_FIELDS})
+    return variants
+
+
+async def retrieve(search_service, question, top=5, select=None, fan_out=True, **kwargs):
+    """
+    Runs all query variants concurrently and returns the top results of their fusion.
+    With fan_out=False only the raw question is searched. The field-targeted variant is
+    skipped when the backend does not index TARGET_FIELDS (e.g. a local index of another
+    corpus).
+    """
+    variants = query_variants(question) if fan_out else [{"query": question}]
+    for variant in [variant for variant in variants if "search_fields" in variant]:
+        if not search_service.covers_fields(variant["search_fields"]):
+            logger.info(f"Skipping the query variant on {variant['search_fields']}, which the search backend does not index")
+            variants.remove(variant)
+    result_lists = await asyncio.gather(*(
+        search_service.asearch(variant.pop("query"), top=top, select=select, **variant, **kwargs)
+        for variant in variants
+    ))
+    if len(result_lists) == 1:
+        return result_lists[0]
+
+    by_id = {}
+    rankings = []
+    for results in result_lists:
+        ids = source_ids(results)
+        for source_id, result in zip(ids, results):
+            by_id.setdefault(source_id, result)
+        rankings.append(ids)
+    return [{**by_id[source_id], "@search.score": score} for source_id, score in reciprocal_rank_fusion(rankings)[:top]]
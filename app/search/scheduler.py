@@ -0,0 +1,289 @@
+"""
+Rate-limit-aware scheduling of upstream calls (Azure OpenAI, Azure AI Search, Blob Storage).
+
+Each upstream gets one Scheduler per process that
+  - admits calls within token-bucket limits for requests and tokens per minute,
+  - lets waiting interactive calls go before waiting bulk calls,
+  - retries throttled calls (429/503) with jittered backoff, honoring the
+    Retry-After / retry-after-ms headers and pausing all callers for that long,
+  - coalesces identical concurrent calls that pass the same key into one upstream call.
+
+Limits are read per upstream from UPSTREAM_<NAME>_RPM and UPSTREAM_<NAME>_TPM
+(0 or unset = unlimited), e.g. UPSTREAM_OPENAI_TPM=240000.
+"""
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from search.telemetry import telemetry
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+INTERACTIVE = 0
+BULK = 1
+
+# Upstream status codes that mean "slow down and try again"
+THROTTLED_STATUS_CODES = {429, 503}
+
+# Interval at which callers that are not first in line re-check their turn
+_POLL_INTERVAL = 0.01
+
+
+class TokenBucket:
+    """
+    Refills at rate_per_minute up to capacity (one minute's worth by default).
+    A rate of 0 disables the limit. Not thread-safe on its own; Scheduler holds the lock.
+    """
+    def __init__(self, rate_per_minute=0, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """
+        Seconds until amount can be taken (0 if available now).
+        """
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        # A request larger than the bucket waits for a full bucket rather than forever
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount):
+        if self.rate:
+            self.level -= min(amount, self.capacity)
+
+
+def retry_after(error):
+    """
+    Returns the delay in seconds requested by a throttled response, or None.
+    Understands retry-after-ms, x-ms-retry-after-ms and Retry-After (seconds or HTTP date).
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def status_code(error):
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code
+
+
+class Scheduler:
+    """
+    Admission control, prioritization, throttling retries and request coalescing for
+    one upstream service. Use `call` from threads and `acall` from coroutines.
+    """
+    def __init__(self, name, requests_per_minute=0, tokens_per_minute=0, max_retries=4, base_delay=0.5, max_delay=30.0):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._turn = threading.Condition(self._lock)
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        self._inflight = {}
+        self._async_inflight = {}
+
+    def _try_admit(self, ticket, tokens):
+        """
+        Admits ticket if it is first in line and the buckets allow it. Returns 0 when
+        admitted, else the seconds to wait before trying again.
+        """
+        with self._lock:
+            if self._waiting[0] is not ticket:
+                return _POLL_INTERVAL
+            now = time.monotonic()
+            wait = max(self._paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            heapq.heappop(self._waiting)
+            self._turn.notify_all()
+            return 0.0
+
+    def _enqueue(self, priority):
+        ticket = [priority, next(self._sequence)]
+        with self._lock:
+            heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _abandon(self, ticket):
+        """
+        Removes the ticket of a caller that stopped waiting (e.g. a cancelled task).
+        """
+        with self._lock:
+            if any(waiting is ticket for waiting in self._waiting):
+                self._waiting = [waiting for waiting in self._waiting if waiting is not ticket]
+                heapq.heapify(self._waiting)
+                self._turn.notify_all()
+
+    def acquire(self, priority=INTERACTIVE, tokens=0):
+        """
+        Blocks until a call with the given priority and token cost may be sent.
+        """
+        started = time.monotonic()
+        ticket = self._enqueue(priority)
+        try:
+            while (wait := self._try_admit(ticket, tokens)) > 0:
+                with self._turn:
+                    self._turn.wait(wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        telemetry.observe(f"upstream.{self.name}.queue_ms", (time.monotonic() - started) * 1000)
+
+    async def aacquire(self, priority=INTERACTIVE, tokens=0):
+        """
+        Awaits until a call with the given priority and token cost may be sent.
+        """
+        started = time.monotonic()
+        ticket = self._enqueue(priority)
+        try:
+            while (wait := self._try_admit(ticket, tokens)) > 0:
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        telemetry.observe(f"upstream.{self.name}.queue_ms", (time.monotonic() - started) * 1000)
+
+    def _retry_delay(self, error, attempt):
+        """
+        Returns the delay before retrying error, or None if it should not be retried.
+        A server-requested delay also pauses every other caller of this upstream.
+        """
+        if status_code(error) not in THROTTLED_STATUS_CODES or attempt >= self.max_retries:
+            return None
+        telemetry.increment(f"upstream.{self.name}.throttled")
+        backoff = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        requested = retry_after(error)
+        if requested is not None:
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + requested)
+            return requested * random.uniform(1.0, 1.2)
+        return backoff
+
+    def call(self, function, *args, priority=INTERACTIVE, tokens=0, key=None, **kwargs):
+        """
+        Calls function(*args, **kwargs) once admitted, retrying throttled calls. Concurrent
+        calls with the same (hashable) key share the result of the first one.
+        """
+        if key is None:
+            return self._call(function, args, kwargs, priority, tokens)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            telemetry.increment(f"upstream.{self.name}.coalesced")
+            return future.result()
+        try:
+            result = self._call(function, args, kwargs, priority, tokens)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _call(self, function, args, kwargs, priority, tokens):
+        for attempt in itertools.count():
+            self.acquire(priority, tokens)
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    async def acall(self, function, *args, priority=INTERACTIVE, tokens=0, key=None, **kwargs):
+        """
+        Awaitable version of `call` for coroutine functions.
+        """
+        if key is None:
+            return await self._acall(function, args, kwargs, priority, tokens)
+        key = (id(asyncio.get_running_loop()), key)
+        future = self._async_inflight.get(key)
+        if future is not None:
+            telemetry.increment(f"upstream.{self.name}.coalesced")
+            return await asyncio.shield(future)
+        future = self._async_inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self._acall(function, args, kwargs, priority, tokens)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no other caller was waiting for it
+            future.exception()
+            raise
+        finally:
+            del self._async_inflight[key]
+
+    async def _acall(self, function, args, kwargs, priority, tokens):
+        for attempt in itertools.count():
+            await self.aacquire(priority, tokens)
+            try:
+                return await function(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+
+@lru_cache(maxsize=None)
+def get_scheduler(name):
+    """
+    Returns the process-wide scheduler of an upstream ("openai", "search" or "storage").
+    The configured limits are shared by UPSTREAM_PROCESSES processes (set by server.py
+    for its workers), so each process gets an equal part of them.
+    """
+    prefix = f"UPSTREAM_{name.upper()}_"
+    processes = max(1, int(os.getenv("UPSTREAM_PROCESSES") or 1))
+    return Scheduler(
+        name,
+        requests_per_minute=float(os.getenv(prefix + "RPM") or 0) / processes,
+        tokens_per_minute=float(os.getenv(prefix + "TPM") or 0) / processes,
+        max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES") or 4),
+    )
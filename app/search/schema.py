@@ -0,0 +1,125 @@
+"""
+Plain description of the search index schema.
+
+The field list is kept free of any Azure SDK types so that local components
+(the BM25 index, document validation, context building) can share it with
+`create_search_index` without importing the SDK.
+"""
+
+# Each entry mirrors the attributes of an azure SearchField. Complex collections
+# list their sub-fields under "fields".
+INDEX_FIELDS = [
+    {"name": "programID", "type": "string", "key": True, "searchable": True, "filterable": True, "facetable": True, "sortable": True},
+    {"name": "orchestra", "type": "string", "searchable": True, "filterable": True, "facetable": True, "sortable": True},
+    {"name": "season", "type": "string", "searchable": True, "filterable": True, "facetable": True, "sortable": True},
+    {
+        "name": "concerts",
+        "type": "complex_collection",
+        "fields": [
+            {"name": "eventType", "type": "string", "searchable": True, "filterable": False, "sortable": False, "facetable": False},
+            {"name": "Location", "type": "string", "searchable": True, "filterable": True, "sortable": False, "facetable": True},
+            {"name": "Venue", "type": "string", "searchable": True, "filterable": True, "sortable": False, "facetable": True},
+            {"name": "Date", "type": "string", "searchable": False, "filterable": True, "sortable": False, "facetable": True},
+            {"name": "Time", "type": "string", "searchable": False, "filterable": True, "sortable": False, "facetable": True},
+        ],
+    },
+    {
+        "name": "works",
+        "type": "complex_collection",
+        "fields": [
+            {"name": "ID", "type": "string", "searchable": True, "filterable": False, "sortable": False, "facetable": False},
+            {"name": "composerName", "type": "string", "searchable": True, "filterable": True, "sortable": False, "facetable": True},
+            {"name": "workTitle", "type": "string", "searchable": True, "filterable": True, "sortable": False, "facetable": True},
+            {"name": "conductorName", "type": "string", "searchable": True, "filterable": True, "sortable": False, "facetable": True},
+            {"name": "soloists", "type": "string_collection", "searchable": True, "filterable": True, "sortable": False, "facetable": True},
+        ],
+    },
+    {"name": "parent_id", "type": "string", "searchable": False, "filterable": True, "facetable": False, "sortable": False},
+    {"name": "chunk", "type": "string", "searchable": True, "filterable": False, "facetable": False, "sortable": False},
+    {"name": "text_vector", "type": "vector", "searchable": True, "hidden": True, "vector_search_dimensions": 1024, "vector_search_profile_name": "myHnswProfile"},
+]
+
+# Name and dimensionality of the embedding field used for vector queries
+VECTOR_FIELD = "text_vector"
+VECTOR_DIMENSIONS = 1024
+
+# Embedding model of the index vectorizer, which embeds vector queries on azure.
+# Document vectors pushed into VECTOR_FIELD must come from the same model.
+VECTORIZER_MODEL = "text-embedding-3-large"
+
+
+def _flatten(fields, prefix=""):
+    for field in fields:
+        path = prefix + field["name"]
+        if "fields" in field:
+            yield from _flatten(field["fields"], prefix=path + ".")
+        else:
+            yield path, field
+
+
+def field_paths(attribute):
+    """
+    Return the dotted paths of all non-vector leaf fields that have the given attribute
+    set, e.g. field_paths("searchable") -> ["programID", ..., "works.soloists"].
+    """
+    return [path for path, field in _flatten(INDEX_FIELDS) if field.get(attribute) and field["type"] != "vector"]
+
+
+def key_field():
+    """
+    Return the name of the index key field.
+    """
+    return next(path for path, field in _flatten(INDEX_FIELDS) if field.get("key"))
+
+
+SEARCHABLE_FIELDS = field_paths("searchable")
+
+
+def _validate_value(spec, value, path, errors):
+    field_type = spec["type"]
+    if value is None:
+        return
+    if field_type == "string":
+        if not isinstance(value, str):
+            errors.append(f"{path}: expected a string")
+    elif field_type == "string_collection":
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            errors.append(f"{path}: expected a list of strings")
+    elif field_type == "vector":
+        if not isinstance(value, list) or not all(isinstance(v, (int, float)) for v in value):
+            errors.append(f"{path}: expected a list of numbers")
+        elif len(value) != spec["vector_search_dimensions"]:
+            errors.append(f"{path}: expected {spec['vector_search_dimensions']} dimensions, got {len(value)}")
+    elif field_type == "complex_collection":
+        if not isinstance(value, list) or not all(isinstance(v, dict) for v in value):
+            errors.append(f"{path}: expected a list of objects")
+            return
+        for position, item in enumerate(value):
+            _validate_object(spec["fields"], item, f"{path}[{position}]", errors)
+
+
+def _validate_object(fields, document, prefix, errors):
+    specs = {field["name"]: field for field in fields}
+    for name, value in document.items():
+        path = f"{prefix}.{name}" if prefix else name
+        if name.startswith("@"):
+            continue
+        if name not in specs:
+            errors.append(f"{path}: not defined in the index schema")
+            continue
+        _validate_value(specs[name], value, path, errors)
+
+
+def validate_document(document, fields=None):
+    """
+    Checks a document against the index schema before it is pushed to the index.
+    Returns a list of error messages, empty when the document is valid.
+    """
+    if not isinstance(document, dict):
+        return ["document: expected an object"]
+    errors = []
+    key = key_field()
+    if not isinstance(document.get(key), str) or not document.get(key):
+        errors.append(f"{key}: key field is missing or not a non-empty string")
+    _validate_object(fields or INDEX_FIELDS, document, "", errors)
+    return errors
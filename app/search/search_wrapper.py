@@ -3,12 +3,34 @@ Module for defining the Pipeline class that orchestrates the creation of the sea
 data source, skillset, and indexer using Azure Search services. This enables both vector 
 and semantic search functionalities.
 """
-from azure.search.documents import SearchClient
-from azure.search.documents.models import VectorizableTextQuery
-from azure.identity import DefaultAzureCredential
-from search.utils import create_data_source, create_search_index, create_skillset, create_indexer
+from search.bm25_index import BM25Index
+from search.chunking import chunk_documents
+from search.doc_store import DocumentStore, DocumentStoreWriter
+from search.embedding_cache import CachedEmbedder
+from search.embeddings import AzureOpenAIEmbedder, create_embedder, document_text, embed_documents
+from search.filters import FacetVocabulary, QueryAnalyzer, azure_facets, local_facets
+from search.corpus import DEFAULT_DOCUMENT_ROOT, iter_documents
+from search.clients import get_async_search_client, get_credential, get_index_client, get_indexer_client, get_search_client
+from search.fusion import reciprocal_rank_fusion
+from search.ingestion import push_documents
+from search.odata import compile_filter
+from search.query_cache import QueryCache
+from search.rerank import Reranker, parse_weights
+from search.scheduler import INTERACTIVE, get_scheduler
+from search.schema import VECTOR_DIMENSIONS, VECTOR_FIELD, VECTORIZER_MODEL, key_field
+from search.telemetry import telemetry, traced
+from search.vector_index import VectorIndex
 from dotenv import load_dotenv
+import asyncio
+import glob
+import logging
 import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Default location of the sample corpus and of locally built index files
+DATA_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
 
 
 class SearchWrapper:
@@ -18,11 +40,39 @@ class SearchWrapper:
         skillset_name="default-ss",
         indexer_name="default-idxr",
         container_name="default-container",
-        data_source_name="default-ds"
+        data_source_name="default-ds",
+        backend=None,
+        search_client=None,
+        async_search_client=None,
+        vector_index=None,
+        embedder=None,
+        cache=None
     ):
         """
         Initializes the Pipeline with environment variables and configuration settings.
         Loads variables from the .env file.
+
+        The search backend is chosen by `backend` (or SEARCH_BACKEND):
+        "azure" queries Azure AI Search, "local" queries an in-process BM25 index
+        built from the JSON files in LOCAL_DATA_DIRECTORY. Any object exposing a
+        SearchClient-compatible `search` method may also be passed as `search_client`,
+        with `async_search_client` returning its azure.search.documents.aio counterpart
+        for the running event loop.
+
+        Vector and hybrid queries run server-side with the azure backend. With the
+        local backend they use the memory-mapped VectorIndex at LOCAL_VECTOR_INDEX_PATH
+        (or `vector_index`) and the embedder selected by EMBEDDER (or `embedder`).
+
+        Document embeddings are cached on disk under EMBEDDING_CACHE_DIRECTORY, keyed
+        by content hash and model, so re-indexing only embeds new or changed documents.
+
+        Entity values found in a query (composers, conductors, venues, ...) are pushed
+        down as an OData filter, matched against a facet vocabulary cached at
+        FACET_VOCABULARY_PATH and refreshed every FACET_VOCABULARY_TTL seconds. Set
+        SEARCH_FILTER_PUSHDOWN=false to disable this.
+
+        Results are memoized in a QueryCache (or `cache`) sized by SEARCH_CACHE_SIZE
+        with a SEARCH_CACHE_TTL expiry in seconds; a size of 0 disables caching.
         """
         load_dotenv()
         self.AZURE_OPENAI_ENDPOINT=os.getenv("AZURE_OPENAI_ENDPOINT")
@@ -36,41 +86,526 @@ class SearchWrapper:
         self.data_source_name=os.getenv("AZURE_SEARCH_DATA_SOURCE") or data_source_name
         self.skillset_name=os.getenv("AZURE_SEARCH_SKILLSET_NAME") or skillset_name
         self.container_name=os.getenv("AZURE_STORAGE_CONTAINER_NAME") or container_name
-        self.credential=DefaultAzureCredential()
-        self.search_client=SearchClient(endpoint=self.AZURE_SEARCH_SERVICE, index_name=self.index_name, credential=self.credential)
+        self.backend=backend or os.getenv("SEARCH_BACKEND") or "azure"
+        self.local_data_directory=os.getenv("LOCAL_DATA_DIRECTORY") or DATA_DIRECTORY
+        self.local_index_path=os.getenv("LOCAL_INDEX_PATH") or os.path.join(self.local_data_directory, ".index", "bm25.pkl")
+        self.document_root=os.getenv("CORPUS_DOCUMENT_ROOT") or DEFAULT_DOCUMENT_ROOT
+        self.local_search_fields=[f.strip() for f in os.getenv("LOCAL_SEARCH_FIELDS", "").split(",") if f.strip()] or None
+        self.local_vector_index_path=os.getenv("LOCAL_VECTOR_INDEX_PATH") or os.path.join(self.local_data_directory, ".index", "vectors")
+        self.vector_quantization=os.getenv("LOCAL_VECTOR_QUANTIZATION") or "int8"
+        self.search_mode=os.getenv("SEARCH_MODE") or "text"
+        self.hybrid_candidates=int(os.getenv("HYBRID_CANDIDATES") or 50)
+        self.vector_index=vector_index
+        self._embedder=embedder
+        self._document_embedder=None
+        self._index_embedder=None
+        self.embedding_cache_directory=os.getenv("EMBEDDING_CACHE_DIRECTORY") or os.path.join(self.local_data_directory, ".index", "embeddings")
+        cache_size=int(os.getenv("SEARCH_CACHE_SIZE") or 256)
+        self.cache=cache if cache is not None else (QueryCache(maxsize=cache_size, ttl=float(os.getenv("SEARCH_CACHE_TTL") or 300)) if cache_size else None)
+        self.config_state_path=os.getenv("SEARCH_CONFIG_STATE_PATH") or os.path.join(self.local_data_directory, ".index", "config-state.json")
+        self.indexer_timeout=float(os.getenv("AZURE_SEARCH_INDEXER_TIMEOUT") or 600)
+        self._indexer_run_pending=False
+        self._indexer_previous_start=None
+        self.index_version_ttl=float(os.getenv("INDEX_VERSION_TTL") or 60)
+        self._index_version=None
+        self._index_version_checked=0.0
+        self.filter_pushdown=(os.getenv("SEARCH_FILTER_PUSHDOWN") or "true").lower() == "true"
+        self.facet_vocabulary=FacetVocabulary(
+            os.getenv("FACET_VOCABULARY_PATH") or os.path.join(self.local_data_directory, ".index", "facets.json"),
+            self._fetch_facets,
+            ttl=float(os.getenv("FACET_VOCABULARY_TTL") or 3600),
+        )
+        self._query_analyzer=None
+        self.document_store_path=os.getenv("DOCUMENT_STORE_PATH") or os.path.join(self.local_data_directory, ".index", "documents.arrow")
+        self.hydrate=(os.getenv("SEARCH_HYDRATE") or "true").lower() == "true"
+        self._document_store=None
+        self.rerank_candidates=int(os.getenv("RERANK_CANDIDATES") or 50)
+        self.reranker=Reranker(
+            fields=parse_weights(os.getenv("RERANK_FIELD_WEIGHTS")) or None,
+            retrieval_weight=float(os.getenv("RERANK_RETRIEVAL_WEIGHT") or 1.0),
+            embedding_weight=float(os.getenv("RERANK_EMBEDDING_WEIGHT") or 0.0),
+            query_embedder=lambda texts: self.embedder(texts, priority=INTERACTIVE),
+            document_embedder=lambda texts: self.document_embedder(texts, priority=INTERACTIVE),
+        ) if (os.getenv("SEARCH_RERANK") or "true").lower() == "true" else None
+        self.credential=None
+        self.async_search_client=async_search_client
+        if search_client is not None:
+            self.search_client=search_client
+        elif self.backend == "local":
+            self.search_client=BM25Index.load_or_build(self.local_index_path, self.local_data_files(), document_root=self.document_root, fields=self.local_search_fields)
+            if self.vector_index is None and os.path.isdir(self.local_vector_index_path):
+                self.vector_index=VectorIndex.open(self.local_vector_index_path)
+        elif self.backend == "azure":
+            self.credential=get_credential()
+            self.search_client=get_search_client(self.AZURE_SEARCH_SERVICE, self.index_name)
+            if self.async_search_client is None:
+                self.async_search_client=lambda: get_async_search_client(self.AZURE_SEARCH_SERVICE, self.index_name)
+        else:
+            raise ValueError(f"Unknown search backend '{self.backend}', expected 'azure' or 'local'")
+
+    def local_data_files(self):
+        """
+        Returns the sorted list of JSON corpus files used by the local backend.
+        """
+        return sorted(glob.glob(os.path.join(self.local_data_directory, "*.jsonl")) + glob.glob(os.path.join(self.local_data_directory, "*.json")))
+
+    @property
+    def embedder(self):
+        """
+        The embedder used for local vector queries, created on first use.
+        """
+        if self._embedder is None:
+            self._embedder=create_embedder()
+        return self._embedder
+
+    @property
+    def document_embedder(self):
+        """
+        The embedder used for documents at indexing time, backed by the on-disk embedding cache.
+        """
+        if self._document_embedder is None:
+            self._document_embedder=CachedEmbedder(self.embedder, self.embedding_cache_directory)
+        return self._document_embedder
+
+    @property
+    def index_embedder(self):
+        """
+        The embedder for document vectors pushed into the azure index. The index vectorizer
+        embeds the queries with VECTORIZER_MODEL, so this is always the Azure OpenAI embedder
+        with that model, whatever EMBEDDER selects for local vectors.
+        """
+        if self._index_embedder is None:
+            embedder=self.embedder if isinstance(self.embedder, AzureOpenAIEmbedder) else create_embedder("azure")
+            if (embedder.model, embedder.dimensions) != (VECTORIZER_MODEL, VECTOR_DIMENSIONS):
+                raise ValueError(
+                    f"Index vectors must come from the vectorizer model {VECTORIZER_MODEL} with {VECTOR_DIMENSIONS} dimensions, "
+                    f"not {embedder.model} with {embedder.dimensions}; check AZURE_OPENAI_EMBEDDING_MODEL or set INGEST_EMBEDDINGS=false"
+                )
+            # Share the document embedder's cache when EMBEDDER already selects azure
+            self._index_embedder=self.document_embedder if embedder is self.embedder else CachedEmbedder(embedder, self.embedding_cache_directory)
+        return self._index_embedder
+
+    @property
+    def index_version(self):
+        """
+        A coarse signal that the index changed: the document count, plus the local index
+        generation. Refreshed at most every INDEX_VERSION_TTL seconds. Edits that keep the
+        count do not change it; cached answers are keyed by the content of their sources
+        (see search.response_cache.sources_fingerprint) so that those are not served stale.
+        """
+        now=time.monotonic()
+        if self._index_version is None or now - self._index_version_checked > self.index_version_ttl:
+            count=self.search_client.get_document_count() if self.backend == "local" else get_scheduler("search").call(self.search_client.get_document_count)
+            self._index_version=(getattr(self.search_client, "generation", None), count)
+            self._index_version_checked=now
+        return self._index_version
+
+    @property
+    def document_store(self):
+        """
+        The local document store used to hydrate azure results, or None if hydration is
+        off or no store has been built. Reopened when the file is rebuilt.
+        """
+        if not self.hydrate or self.backend == "local" or not os.path.exists(self.document_store_path):
+            return None
+        if self._document_store is None or self._document_store.mtime != os.path.getmtime(self.document_store_path):
+            self._document_store=DocumentStore(self.document_store_path)
+        return self._document_store
+
+    def covers_fields(self, search_fields):
+        """
+        Returns whether text queries can be restricted to search_fields. The local index
+        covers only the fields it was built with (see LOCAL_SEARCH_FIELDS).
+        """
+        if isinstance(self.search_client, BM25Index):
+            try:
+                self.search_client.field_paths(search_fields)
+            except ValueError:
+                return False
+        return True
+
+    def _fetch_facets(self):
+        if isinstance(self.search_client, BM25Index):
+            return local_facets(self.search_client)
+        return get_scheduler("search").call(azure_facets, self.search_client)
+
+    def query_filter(self, query):
+        """
+        Returns the OData filter for the entity values found in the query, or None.
+        """
+        vocabulary=self.facet_vocabulary.get()
+        if self._query_analyzer is None or self._query_analyzer[0] is not vocabulary:
+            self._query_analyzer=(vocabulary, QueryAnalyzer(vocabulary))
+        return self._query_analyzer[1].filter_for(query)
+
+    def search(self, query: str, mode=None, top=1, select=None, search_fields=None, filter=None):
+        """
+        Executes the provided query and returns the top results as a list.
+        mode is "text" (default, or SEARCH_MODE), "vector" or "hybrid"; hybrid
+        merges lexical and vector hits with reciprocal-rank fusion.
+        select limits the returned top-level fields and search_fields the fields
+        matched by the text query (azure paths such as "works/composerName").
+        filter is an OData filter expression; without one, the filter derived from the
+        query's entity values is used, and dropped again if it matches nothing.
+        Results are reranked locally (see search.rerank) unless SEARCH_RERANK is false.
+        Repeated queries with the same parameters are answered from the cache.
+        """
+        mode, select, search_fields = self._options(mode, select, search_fields)
+        pushed_down = filter is None and self.filter_pushdown
+        if pushed_down:
+            filter = self.query_filter(query)
+        with telemetry.span("search.search", backend=self.backend, mode=mode, top=top, filtered=filter is not None) as span:
+            results = self._cached_search(query, mode, top, select, search_fields, filter, span)
+            if not results and filter is not None and pushed_down:
+                span["filtered"] = False
+                results = self._cached_search(query, mode, top, select, search_fields, None, span)
+            span["results"] = len(results)
+            return list(results)
+
+    def _options(self, mode, select, search_fields):
+        mode = mode or self.search_mode
+        if mode not in ("text", "vector", "hybrid"):
+            raise ValueError(f"Unknown search mode '{mode}', expected 'text', 'vector' or 'hybrid'")
+        return mode, list(select) if select else None, list(search_fields) if search_fields else None
+
+    def _cached_search(self, query, mode, top, select, search_fields, filter, span):
+        if self.cache is None:
+            span["cache"] = "off"
+            return self._search(query, mode, top, select, search_fields, filter)
+        key = QueryCache.make_key(query, mode=mode, top=top, select=select, search_fields=search_fields, filter=filter)
+        results = self.cache.get(key)
+        span["cache"] = "miss" if results is None else "hit"
+        telemetry.increment(f"search.cache.{span['cache']}")
+        if results is None:
+            results = self._search(query, mode, top, select, search_fields, filter)
+            self.cache.put(key, results)
+        return results
+
+    async def asearch(self, query: str, mode=None, top=1, select=None, search_fields=None, filter=None):
+        """
+        Awaitable version of `search`. With the azure backend the query is sent with the
+        async SearchClient of the running event loop, so concurrent queries share its
+        connections without holding a thread each. The local backend searches in-process
+        and CPU-bound, and an injected search_client without an async counterpart is
+        synchronous, so those queries run on a worker thread instead.
+        """
+        if self.async_search_client is None:
+            return await asyncio.to_thread(self.search, query, mode=mode, top=top, select=select, search_fields=search_fields, filter=filter)
+
+        mode, select, search_fields = self._options(mode, select, search_fields)
+        pushed_down = filter is None and self.filter_pushdown
+        if pushed_down:
+            # The first call may load the facet vocabulary from the index
+            filter = await asyncio.to_thread(self.query_filter, query)
+        with telemetry.span("search.search", backend=self.backend, mode=mode, top=top, filtered=filter is not None) as span:
+            results = await self._acached_search(query, mode, top, select, search_fields, filter, span)
+            if not results and filter is not None and pushed_down:
+                span["filtered"] = False
+                results = await self._acached_search(query, mode, top, select, search_fields, None, span)
+            span["results"] = len(results)
+            return list(results)
+
+    async def _acached_search(self, query, mode, top, select, search_fields, filter, span):
+        if self.cache is None:
+            span["cache"] = "off"
+            return await self._asearch(query, mode, top, select, search_fields, filter)
+        key = QueryCache.make_key(query, mode=mode, top=top, select=select, search_fields=search_fields, filter=filter)
+        results = self.cache.get(key)
+        span["cache"] = "miss" if results is None else "hit"
+        telemetry.increment(f"search.cache.{span['cache']}")
+        if results is None:
+            results = await self._asearch(query, mode, top, select, search_fields, filter)
+            self.cache.put(key, results)
+        return results
+
+    def _search(self, query, mode, top, select=None, search_fields=None, filter=None):
+        """
+        Executes a query without caching. With the reranker, RERANK_CANDIDATES results are
+        retrieved (including the fields the reranker reads) and the best top are kept.
+        """
+        if self.reranker is None:
+            return self._retrieve(query, mode, top, select, search_fields, filter)
+        candidates = self._retrieve(query, mode, max(top, self.rerank_candidates), self._rerank_select(select), search_fields, filter)
+        return self._rerank(query, candidates, top, select)
+
+    async def _asearch(self, query, mode, top, select=None, search_fields=None, filter=None):
+        if self.reranker is None:
+            return await self._aretrieve(query, mode, top, select, search_fields, filter)
+        candidates = await self._aretrieve(query, mode, max(top, self.rerank_candidates), self._rerank_select(select), search_fields, filter)
+        if self.reranker.embedding_weight:
+            # Embedding the candidates calls the embedder synchronously
+            return await asyncio.to_thread(self._rerank, query, candidates, top, select)
+        return self._rerank(query, candidates, top, select)
+
+    def _rerank_select(self, select):
+        return sorted(set(select) | self.reranker.top_level_fields) if select else None
+
+    def _rerank(self, query, candidates, top, select):
+        results = self.reranker.rerank(query, candidates, top)
+        if select:
+            results = [{k: v for k, v in result.items() if k in select or k.startswith("@search.")} for result in results]
+        return results
 
-    def search(self, query: str):
+    def _retrieve(self, query, mode, top, select=None, search_fields=None, filter=None):
         """
-        Connects to the Azure AI search service using default environment variables,
-        executes the provided query, and returns the top 5 results.
+        Executes a query against the configured backend. Vector and hybrid queries on
+        the local backend without a vector index fall back to text search.
         """
+        if mode != "text" and self.vector_index is not None:
+            return self._search_local_vectors(query, mode, top, select, search_fields, filter)
+        if mode != "text" and self.backend == "local":
+            logger.warning(f"No local vector index at {self.local_vector_index_path}, running the {mode} query as a text query; build it with run_config_pipeline")
+            mode = "text"
 
-        results = self.search_client.search(
-            search_text=query,
-            semantic_configuration_name='my-semantic-config',
-            top=1,
+        # With a local document store only keys and scores are fetched and the fields are
+        # read from the store
+        store = self.document_store
+        request, key = self._query_request(query, mode, top, select, search_fields, filter, store)
+
+        # Results are fetched lazily, so the request is sent inside the scheduled call.
+        # Identical concurrent queries share one request. The local index is in-process,
+        # with nothing to rate-limit or retry.
+        def run():
+            return list(self.search_client.search(**request))
+
+        results = run() if self.backend == "local" else get_scheduler("search").call(run, key=key)
+        if store is not None:
+            documents, missing = self._stored_documents(store, results, select)
+            for position in missing:
+                documents[position] = dict(get_scheduler("search").call(self.search_client.get_document, results[position][key_field()], selected_fields=select))
+            results = self._with_scores(documents, results)
+        return results
+
+    async def _aretrieve(self, query, mode, top, select=None, search_fields=None, filter=None):
+        """
+        Awaitable version of `_retrieve` using the async search client.
+        """
+        if mode != "text" and self.vector_index is not None:
+            return await asyncio.to_thread(self._search_local_vectors, query, mode, top, select, search_fields, filter)
+
+        store = self.document_store
+        request, key = self._query_request(query, mode, top, select, search_fields, filter, store)
+        client = self.async_search_client()
+
+        async def run():
+            return [result async for result in await client.search(**request)]
+
+        results = await get_scheduler("search").acall(run, key=key)
+        if store is not None:
+            documents, missing = self._stored_documents(store, results, select)
+            for position in missing:
+                documents[position] = dict(await get_scheduler("search").acall(client.get_document, results[position][key_field()], selected_fields=select))
+            results = self._with_scores(documents, results)
+        return results
+
+    def _query_request(self, query, mode, top, select, search_fields, filter, store):
+        """
+        Returns the SearchClient.search keyword arguments for a query and the key that
+        coalesces identical concurrent requests.
+        """
+        vector_queries = None
+        if mode != "text":
+            from azure.search.documents.models import VectorizableTextQuery
+            vector_queries = [VectorizableTextQuery(text=query, k_nearest_neighbors=max(top, self.hybrid_candidates), fields=VECTOR_FIELD)]
+        request = dict(
+            search_text=None if mode == "vector" else query,
+            vector_queries=vector_queries,
+            select=[key_field()] if store is not None else select,
+            search_fields=search_fields,
+            filter=filter,
+            top=top,
         )
+        return request, QueryCache.make_key(query, mode=mode, top=top, select=select, search_fields=search_fields, filter=filter, hydrate=store is not None)
 
+    def _stored_documents(self, store, results, select=None):
+        """
+        Reads the select fields of key-only results from the document store. Returns the
+        documents and the positions of those missing from the store (e.g. added after it
+        was built), which the caller fetches from the index.
+        """
+        keys = [result[key_field()] for result in results]
+        documents = store.get_many(keys, select)
+        missing = [position for position, document in enumerate(documents) if document is None]
+        telemetry.increment("search.hydrate.hit", len(keys) - len(missing))
+        if missing:
+            telemetry.increment("search.hydrate.miss", len(missing))
+        return documents, missing
+
+    def _with_scores(self, documents, results):
+        return [
+            {**document, **{k: v for k, v in result.items() if k.startswith("@search.")}}
+            for document, result in zip(documents, results)
+        ]
+
+    def _search_local_vectors(self, query, mode, top, select=None, search_fields=None, filter=None):
+        """
+        Runs a vector or hybrid query against the local vector index and BM25 index.
+        With a filter, vector hits are post-filtered from the candidates; search_fields
+        restrict the lexical side of hybrid queries.
+        """
+        candidates = max(top, self.hybrid_candidates)
+        vector_hits = self.vector_index.search(self.embedder([query])[0], k=candidates)
+        if filter:
+            matches = compile_filter(filter)
+            vector_hits = [(key, score) for key, score in vector_hits if matches(self.search_client.get_document(key))]
+        rankings = [[key for key, _ in vector_hits]]
+        if mode == "hybrid":
+            rankings.insert(0, [key for key, _ in self.search_client.rank(query, top=candidates, filter=filter, search_fields=search_fields)])
+            hits = reciprocal_rank_fusion(rankings)[:top]
+        else:
+            hits = vector_hits[:top]
+        results = []
+        for key, score in hits:
+            document = self.search_client.get_document(key)
+            if select:
+                document = {k: v for k, v in document.items() if k in select}
+            results.append({**document, "@search.score": score})
         return results
 
-    def run_config_pipeline(self):
+    @traced("search.build_local_vector_index")
+    def build_local_vector_index(self):
+        """
+        Embeds every document of the local BM25 index and writes the vector index.
+        Documents whose text is already in the embedding cache are not embedded again.
+        """
+        keys, texts = [], []
+        for key, document in self.search_client.items():
+            keys.append(key)
+            texts.append(document_text(document, self.search_client.fields))
+        embedder = self.document_embedder
+        hits, misses = embedder.hits, embedder.misses
+        vectors = embedder(texts) if texts else []
+        self.vector_index=VectorIndex.build(self.local_vector_index_path, keys, vectors, quantization=self.vector_quantization)
+        print(f"Local vector index with {len(self.vector_index)} vectors saved to {self.local_vector_index_path} ({embedder.misses - misses} embedded, {embedder.hits - hits} cached)")
+
+    @traced("search.build_document_store")
+    def build_document_store(self, paths=None, documents=None):
+        """
+        Writes documents to the document store used to hydrate search results. The store
+        must hold what the index was fed from: after a blob indexer run, pass the
+        container's documents (BlobWrapper.iter_documents). Otherwise the documents of
+        paths, by default the local JSON corpus files, are written.
+        """
+        if documents is None:
+            paths = paths or self.local_data_files()
+            documents = (document for path in paths for document in iter_documents(path, document_root=self.document_root))
+        self._document_store = DocumentStore.build(self.document_store_path, documents)
+        print(f"Document store with {len(self._document_store)} documents saved to {self.document_store_path}")
+
+    @traced("search.ingest")
+    def ingest(self, paths=None, merge=False, max_in_flight=None, embed=None, chunk=None, **kwargs):
+        """
+        Pushes the documents of local JSON corpus files straight into the index,
+        bypassing the blob indexer. Documents are streamed, validated against the
+        index schema and uploaded in size-bounded, concurrent batches; documents
+        that fail with a transient status are retried.
+        Parameters:
+            paths (list): Corpus files, defaults to the files in LOCAL_DATA_DIRECTORY.
+            merge (bool): Merge into existing documents instead of replacing them.
+            max_in_flight (int): Concurrent batches, defaults to INGEST_MAX_IN_FLIGHT or 4.
+            embed (bool): Write embeddings into the vector field, defaults to INGEST_EMBEDDINGS
+                or true for the azure backend. Azure vectors always come from the vectorizer's
+                model (see index_embedder). The local backend rebuilds its vector index instead.
+            chunk (bool): Index one chunk per work and concert (see search.chunking) instead of
+                whole programs, defaults to INGEST_CHUNKING or false.
+        Unless merging, the pushed documents are also written to the local document store
+        used to hydrate search results (azure backend with SEARCH_HYDRATE). Merging removes
+        the store, so results are returned in full by the index until it is rebuilt.
+        Returns:
+            IngestReport: Indexed count plus invalid and failed document keys.
+        """
+        paths = paths or self.local_data_files()
+        if embed is None:
+            embed = (os.getenv("INGEST_EMBEDDINGS") or str(self.backend == "azure")).lower() == "true"
+        if chunk is None:
+            chunk = (os.getenv("INGEST_CHUNKING") or "false").lower() == "true"
+        documents = (document for path in paths for document in iter_documents(path, document_root=self.document_root))
+        if chunk:
+            documents = chunk_documents(documents)
+        store_writer = DocumentStoreWriter(self.document_store_path) if self.hydrate and not merge and self.backend != "local" else None
+        if store_writer is not None:
+            documents = store_writer.tee(documents)
+        if embed and self.backend != "local":
+            documents = embed_documents(documents, self.index_embedder)
+        try:
+            report = push_documents(
+                self.search_client,
+                documents,
+                merge=merge,
+                max_in_flight=max_in_flight or int(os.getenv("INGEST_MAX_IN_FLIGHT") or 4),
+                scheduler=None if self.backend == "local" else get_scheduler("search"),
+                **kwargs
+            )
+        except BaseException:
+            if store_writer is not None:
+                store_writer.close(commit=False)
+            raise
+        if store_writer is not None:
+            store_writer.close()
+        elif merge and os.path.exists(self.document_store_path):
+            # Merged documents are only partly known here, so the store would serve stale
+            # fields; drop it until the next full ingest or build_document_store
+            os.remove(self.document_store_path)
+            self._document_store=None
+        if self.backend == "local":
+            self.search_client.save(self.local_index_path)
+            if embed and self.vector_index is not None:
+                self.build_local_vector_index()
+        if self.cache is not None:
+            self.cache.clear()
+        self.facet_vocabulary.invalidate()
+        self._index_version=None
+        return report
+
+    @traced("search.config_pipeline")
+    def run_config_pipeline(self, indexer=True, force=False):
         """
         Executes the pipeline to set up the entire Azure Search environment.
-        Sequentially creates the data source, search index, skillset, and indexer.
+        Sequentially creates the data source, search index, skillset, and indexer,
+        reusing one index client and one indexer client. Definitions whose fingerprint
+        matches the last push recorded in SEARCH_CONFIG_STATE_PATH are skipped unless
+        force is set. With indexer=False only the index is created, for push-mode ingestion.
+        With the local backend, rebuilds and saves the BM25 index instead.
         """
+        if self.backend == "local":
+            self.search_client=BM25Index.from_files(self.local_data_files(), document_root=self.document_root, fields=self.local_search_fields)
+            self.search_client.save(self.local_index_path)
+            print(f"Local index with {len(self.search_client)} documents saved to {self.local_index_path}")
+            self.build_local_vector_index()
+            if self.cache is not None:
+                self.cache.clear()
+            self.facet_vocabulary.invalidate()
+            self._index_version=None
+            return
+
+        from search.utils import ConfigState, create_data_source, create_search_index, create_skillset, create_indexer, last_run_start
+
+        index_client = get_index_client(self.AZURE_SEARCH_SERVICE)
+        indexer_client = get_indexer_client(self.AZURE_SEARCH_SERVICE)
+        state = ConfigState(self.config_state_path, self.AZURE_SEARCH_SERVICE)
+        if force:
+            state.fingerprints = {}
+
         # Orchestrate pipeline steps:
-        data_source = create_data_source(
+        create_search_index(
             self.AZURE_SEARCH_SERVICE,
             self.credential,
-            self.container_name,
-            self.data_source_name,
-            self.AZURE_STORAGE_CONNECTION
+            self.index_name,
+            self.AZURE_OPENAI_ENDPOINT,
+            index_client=index_client,
+            state=state
         )
-        create_search_index(
+        if not indexer:
+            return
+
+        data_source = create_data_source(
             self.AZURE_SEARCH_SERVICE,
             self.credential,
-            self.index_name,
-            self.AZURE_OPENAI_ENDPOINT
+            self.container_name,
+            self.data_source_name,
+            self.AZURE_STORAGE_CONNECTION,
+            indexer_client=indexer_client,
+            state=state
         )
         create_skillset(
             azure_search_service=self.AZURE_SEARCH_SERVICE,
@@ -80,11 +615,59 @@ class SearchWrapper:
             azure_openai_endpoint=self.AZURE_OPENAI_ENDPOINT,
             azure_ai_cognitive_services_key=self.AZURE_AI_COGNITIVE_SERVICES_KEY
         )
+        previous_start = last_run_start(indexer_client, self.indexer_name)
         create_indexer(
             azure_search_service=self.AZURE_SEARCH_SERVICE,
             credential=self.credential,
             indexer_name=self.indexer_name,
             skillset_name=self.skillset_name,
             index_name=self.index_name,
-            data_source=data_source
-        )
\ No newline at end of file
+            data_source=data_source,
+            indexer_client=indexer_client,
+            state=state
+        )
+        # Creating or updating an indexer starts a run; an unchanged one is left idle
+        self._indexer_run_pending = "indexer" in state.pushed
+        self._indexer_previous_start = previous_start
+
+    @traced("search.run_indexer")
+    def run_indexer(self):
+        """
+        Starts an on-demand indexer run.
+        """
+        from search.utils import last_run_start
+
+        indexer_client = get_indexer_client(self.AZURE_SEARCH_SERVICE)
+        self._indexer_previous_start = last_run_start(indexer_client, self.indexer_name)
+        self._indexer_run_pending = True
+        indexer_client.run_indexer(self.indexer_name)
+
+    @traced("search.wait_for_indexer")
+    def wait_for_indexer(self, timeout=None, on_progress=None):
+        """
+        Waits until the indexer run started by run_config_pipeline (or a new run, if the
+        pipeline left the indexer unchanged) finishes, polling its status with backoff.
+        Parameters:
+            timeout (float): Seconds to wait, defaults to AZURE_SEARCH_INDEXER_TIMEOUT or 600.
+            on_progress (callable): Called with an IndexerProgress after every poll.
+        Returns:
+            IndexerProgress: Final status, items processed and failed, and elapsed seconds.
+        """
+        if self.backend == "local":
+            return None
+        from search.utils import wait_for_indexer
+
+        if not self._indexer_run_pending:
+            self.run_indexer()
+        progress = wait_for_indexer(
+            get_indexer_client(self.AZURE_SEARCH_SERVICE),
+            self.indexer_name,
+            previous_start=self._indexer_previous_start,
+            timeout=timeout or self.indexer_timeout,
+            on_progress=on_progress
+        )
+        if self.cache is not None:
+            self.cache.clear()
+        self.facet_vocabulary.invalidate()
+        self._index_version=None
+        return progress
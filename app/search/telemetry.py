@@ -0,0 +1,244 @@
+"""
+Lightweight tracing and metrics.
+
+Timed spans, counters and measurements are tagged with the correlation id of the
+current request (a context variable, so it follows asyncio tasks and to_thread
+calls) and handed to the configured exporter:
+    TELEMETRY_EXPORTER=none  only the in-process aggregates returned by snapshot() (default)
+    TELEMETRY_EXPORTER=log   one JSON line per event on the "telemetry" logger
+    TELEMETRY_EXPORTER=http  batched JSON POSTs to TELEMETRY_ENDPOINT
+"""
+from contextlib import contextmanager
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+import uuid
+
+logger = logging.getLogger("telemetry")
+
+_correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+
+def get_correlation_id():
+    return _correlation_id.get()
+
+
+@contextmanager
+def correlation(correlation_id=None):
+    """
+    Tags all events recorded inside the block with a correlation id (a new one by default).
+    """
+    token = _correlation_id.set(correlation_id or uuid.uuid4().hex)
+    try:
+        yield _correlation_id.get()
+    finally:
+        _correlation_id.reset(token)
+
+
+class LogExporter:
+    """
+    Writes each event as a JSON line on the telemetry logger. Unless the application
+    configured that logger, the lines go to stderr at TELEMETRY_LOG_LEVEL (INFO).
+    """
+    def __init__(self):
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            # The events are written by this handler only, not again by the root logger's
+            logger.propagate = False
+        if logger.level == logging.NOTSET:
+            logger.setLevel(os.getenv("TELEMETRY_LOG_LEVEL") or logging.INFO)
+
+    def export(self, event):
+        logger.info(json.dumps(event, default=str))
+
+
+class HttpExporter:
+    """
+    Posts events in JSON batches to a metrics endpoint from a background thread,
+    dropping events rather than blocking callers when the queue is full.
+    The thread is started with the first event. A forked child (e.g. a server.py
+    worker) gets a new queue and starts its own thread, as threads do not survive a fork.
+    """
+    def __init__(self, url, batch_size=100, flush_interval=2.0, max_queue=10000):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.queue = queue.Queue(maxsize=self.max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(self.queue,), name="telemetry-exporter", daemon=True)
+                self._thread.start()
+
+    def export(self, event):
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self, events):
+        while True:
+            batch = [events.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and time.monotonic() < deadline:
+                try:
+                    batch.append(events.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                request = urllib.request.Request(
+                    self.url,
+                    data=json.dumps(batch, default=str).encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+            except Exception as e:
+                logger.warning(f"Dropping {len(batch)} telemetry events: {e}")
+
+
+class Telemetry:
+    """
+    Records events, forwards them to an exporter and keeps per-name aggregates.
+    With exporter_factory, the exporter is created with the first event, i.e. after
+    settings are loaded and worker processes are forked.
+    """
+    def __init__(self, exporter=None, exporter_factory=None):
+        self._exporter = exporter
+        self._exporter_factory = exporter_factory
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timings = {}
+
+    @property
+    def exporter(self):
+        if self._exporter_factory is not None:
+            with self._lock:
+                if self._exporter_factory is not None:
+                    self._exporter = self._exporter_factory()
+                    self._exporter_factory = None
+        return self._exporter
+
+    def _emit(self, event):
+        event["correlation_id"] = get_correlation_id()
+        event["timestamp"] = time.time()
+        if self.exporter is not None:
+            self.exporter.export(event)
+
+    def increment(self, name, value=1, **attributes):
+        """
+        Adds value to a counter.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        self._emit({"type": "counter", "name": name, "value": value, "attributes": attributes})
+
+    def observe(self, name, duration_ms, **attributes):
+        """
+        Records a measured duration, e.g. time-to-first-token.
+        """
+        with self._lock:
+            count, total, maximum = self._timings.get(name, (0, 0.0, 0.0))
+            self._timings[name] = (count + 1, total + duration_ms, max(maximum, duration_ms))
+        self._emit({"type": "timing", "name": name, "duration_ms": duration_ms, "attributes": attributes})
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Times the enclosed block. The yielded dict can be used to add attributes.
+        """
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield attributes
+        except BaseException as e:
+            status = "error"
+            attributes["error"] = repr(e)
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                count, total, maximum = self._timings.get(name, (0, 0.0, 0.0))
+                self._timings[name] = (count + 1, total + duration_ms, max(maximum, duration_ms))
+            self._emit({"type": "span", "name": name, "duration_ms": duration_ms, "status": status, "attributes": attributes})
+
+    def snapshot(self):
+        """
+        Returns the counters and, per span or timing name, count, mean and max duration in ms.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timings": {
+                    name: {"count": count, "mean_ms": total / count, "max_ms": maximum}
+                    for name, (count, total, maximum) in self._timings.items()
+                },
+            }
+
+
+def _default_exporter():
+    kind = os.getenv("TELEMETRY_EXPORTER") or "none"
+    if kind == "log":
+        return LogExporter()
+    if kind == "http":
+        return HttpExporter(os.getenv("TELEMETRY_ENDPOINT") or "http://127.0.0.1:4318/telemetry")
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown telemetry exporter '{kind}', expected 'log', 'http' or 'none'")
+
+
+telemetry = Telemetry(exporter_factory=_default_exporter)
+
+
+def traced(name):
+    """
+    Decorator recording a span around each call of the function.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with telemetry.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracedCredential:
+    """
+    Wraps an azure credential to record a span for every token request.
+    """
+    def __init__(self, credential):
+        self._credential = credential
+        if hasattr(credential, "get_token_info"):
+            self.get_token_info = self._get_token_info
+
+    def get_token(self, *scopes, **kwargs):
+        with telemetry.span("auth.get_token"):
+            return self._credential.get_token(*scopes, **kwargs)
+
+    def _get_token_info(self, *scopes, **kwargs):
+        with telemetry.span("auth.get_token"):
+            return self._credential.get_token_info(*scopes, **kwargs)
+
+    def close(self):
+        self._credential.close()
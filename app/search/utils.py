@@ -1,3 +1,4 @@
+from azure.core.exceptions import ResourceNotFoundError
 from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes import SearchIndexerClient
 from azure.search.documents.indexes.models import (
@@ -31,43 +32,94 @@ from azure.search.documents.indexes.models import (
     IndexingParametersConfiguration,
     IndexingSchedule
 )
+from search.corpus import DEFAULT_DOCUMENT_ROOT
+from search.schema import INDEX_FIELDS, VECTORIZER_MODEL
+from collections import namedtuple
+import hashlib
+import json
+import os
+import time
 
-def create_search_index(azure_search_service, credential, index_name, azure_openai_endpoint):
+_FIELD_TYPES = {
+    "string": SearchFieldDataType.String,
+    "string_collection": SearchFieldDataType.Collection(SearchFieldDataType.String),
+    "complex_collection": SearchFieldDataType.Collection(SearchFieldDataType.ComplexType),
+    "vector": SearchFieldDataType.Collection(SearchFieldDataType.Single),
+}
+
+def _search_field(spec):
+    """
+    Builds a SearchField from a plain field description in search.schema.
+    """
+    attributes = {k: v for k, v in spec.items() if k not in ("name", "type", "fields")}
+    if "fields" in spec:
+        attributes["fields"] = [_search_field(sub) for sub in spec["fields"]]
+    return SearchField(name=spec["name"], type=_FIELD_TYPES[spec["type"]], **attributes)
+
+class ConfigState:
+    """
+    Local record of the definitions last pushed to the search service (their
+    fingerprints and the ETags the service returned), used to skip create_or_update
+    calls for unchanged resources.
+    """
+    def __init__(self, path, azure_search_service):
+        self.path = path
+        self.service = azure_search_service
+        self.fingerprints = {}
+        self.pushed = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.fingerprints = json.load(f)
+
+    @staticmethod
+    def fingerprint(definition):
+        """
+        Returns a stable hash of a resource definition.
+        """
+        return hashlib.sha256(json.dumps(definition.as_dict(), sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _key(self, kind, definition):
+        return f"{self.service}|{kind}|{definition.name}"
+
+    def unchanged(self, kind, definition, fetch):
+        """
+        Returns True if the definition matches the last push and the service still holds
+        the resource as pushed. fetch(name) returns the resource from the service; a
+        resource that was deleted, or edited since (another ETag), is pushed again.
+        """
+        entry = self.fingerprints.get(self._key(kind, definition))
+        if not isinstance(entry, dict) or entry.get("fingerprint") != self.fingerprint(definition):
+            return False
+        try:
+            remote = fetch(definition.name)
+        except ResourceNotFoundError:
+            return False
+        return entry.get("etag") is not None and remote.e_tag == entry["etag"]
+
+    def record(self, kind, definition, result):
+        """
+        Records a pushed definition and the ETag of the resulting resource.
+        """
+        self.pushed.append(kind)
+        self.fingerprints[self._key(kind, definition)] = {"fingerprint": self.fingerprint(definition), "etag": result.e_tag}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.fingerprints, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+def create_search_index(azure_search_service, credential, index_name, azure_openai_endpoint, index_client=None, state=None):
     """
     Creates a search index with specified fields, vector search, and semantic search configurations.
+    If a ConfigState is given and the definition and the remote resource are unchanged since the
+    last push, the call is skipped.
     Returns:
-        SearchIndex: The created search index.
+        SearchIndex: The created search index (or its definition when skipped).
     """
     # Set up SearchIndexClient and define index fields
-    index_client = SearchIndexClient(endpoint=azure_search_service, credential=credential)  
+    index_client = index_client or SearchIndexClient(endpoint=azure_search_service, credential=credential)  
     
-    fields = [
-        SearchField(name="programID", type=SearchFieldDataType.String, key=True, searchable=True, filterable=True, facetable=True, sortable=True),
-        SearchField(name="orchestra", type=SearchFieldDataType.String, searchable=True, filterable=True, facetable=True, sortable=True),
-        SearchField(name="season", type=SearchFieldDataType.String, searchable=True, filterable=True, facetable=True, sortable=True),
-        SearchField(
-            name="concerts",
-            type=SearchFieldDataType.Collection(SearchFieldDataType.ComplexType),
-            fields=[
-                SearchField(name="eventType", type=SearchFieldDataType.String, searchable=True, filterable=False, sortable=False, facetable=False),
-                SearchField(name="Location", type=SearchFieldDataType.String, searchable=True, filterable=True, sortable=False, facetable=True),
-                SearchField(name="Venue", type=SearchFieldDataType.String, searchable=True, filterable=True, sortable=False, facetable=True),
-                SearchField(name="Date", type=SearchFieldDataType.String, searchable=False, filterable=True, sortable=False, facetable=True),
-                SearchField(name="Time", type=SearchFieldDataType.String, searchable=False, filterable=True, sortable=False, facetable=True),
-            ]
-        ),
-        SearchField(
-            name="works",
-            type=SearchFieldDataType.Collection(SearchFieldDataType.ComplexType),
-            fields=[
-                SearchField(name="ID", type=SearchFieldDataType.String, searchable=True, filterable=False, sortable=False, facetable=False),
-                SearchField(name="composerName", type=SearchFieldDataType.String, searchable=True, filterable=True, sortable=False, facetable=True),
-                SearchField(name="workTitle", type=SearchFieldDataType.String, searchable=True, filterable=True, sortable=False, facetable=True),
-                SearchField(name="conductorName", type=SearchFieldDataType.String, searchable=True, filterable=True, sortable=False, facetable=True),
-                SearchField(name="soloists", type=SearchFieldDataType.Collection(SearchFieldDataType.String), searchable=True, filterable=True, sortable=False, facetable=True),
-            ]
-        )
-    ]
+    fields = [_search_field(field) for field in INDEX_FIELDS]
     
     # Define semantic configuration for enhanced search ranking
     semantic_config = SemanticConfiguration(  
@@ -96,8 +148,8 @@ def create_search_index(azure_search_service, credential, index_name, azure_open
                 kind="azureOpenAI",  
                 parameters=AzureOpenAIVectorizerParameters(  
                     resource_url=azure_openai_endpoint,  
-                    deployment_name="text-embedding-3-large",
-                    model_name="text-embedding-3-large"
+                    deployment_name=VECTORIZER_MODEL,
+                    model_name=VECTORIZER_MODEL
                 ),
             ),  
         ], 
@@ -105,18 +157,25 @@ def create_search_index(azure_search_service, credential, index_name, azure_open
     
     # Create the search index with both vector and semantic configurations
     index = SearchIndex(name=index_name, fields=fields, vector_search=vector_search, semantic_search=semantic_search)    
+    if state is not None and state.unchanged("index", index, index_client.get_index):
+        print(f"{index.name} unchanged, skipping")
+        return index
     result = index_client.create_or_update_index(index)  
     print(f"{result.name} created")  
+    if state is not None:
+        state.record("index", index, result)
     return result
 
-def create_data_source(azure_search_service, credential, container_name, data_source_name, azure_storage_connection):
+def create_data_source(azure_search_service, credential, container_name, data_source_name, azure_storage_connection, indexer_client=None, state=None):
     """
     Creates or updates a data source connection for the search indexer.
+    If a ConfigState is given and the definition and the remote resource are unchanged since the
+    last push, the call is skipped.
     Returns:
         SearchIndexerDataSourceConnection: The created or updated data source connection.
     """
     # Initialize SearchIndexerClient and define the data container
-    indexer_client = SearchIndexerClient(endpoint=azure_search_service, credential=credential)
+    indexer_client = indexer_client or SearchIndexerClient(endpoint=azure_search_service, credential=credential)
     container = SearchIndexerDataContainer(name=container_name)
     data_source_connection = SearchIndexerDataSourceConnection(
         name=data_source_name,
@@ -124,8 +183,13 @@ def create_data_source(azure_search_service, credential, container_name, data_so
         connection_string=azure_storage_connection,
         container=container
     )
+    if state is not None and state.unchanged("data_source", data_source_connection, indexer_client.get_data_source_connection):
+        print(f"Data source '{data_source_connection.name}' unchanged, skipping")
+        return data_source_connection
     data_source = indexer_client.create_or_update_data_source_connection(data_source_connection)
     print(f"Data source '{data_source.name}' created or updated")
+    if state is not None:
+        state.record("data_source", data_source_connection, data_source)
     return data_source
 
 def create_skillset(azure_search_service, credential, index_name, skillset_name, azure_openai_endpoint, azure_ai_cognitive_services_key):
@@ -217,19 +281,21 @@ def create_skillset(azure_search_service, credential, index_name, skillset_name,
     #return skillset
     pass
 
-def create_indexer(azure_search_service, credential, indexer_name, skillset_name, index_name, data_source):
+def create_indexer(azure_search_service, credential, indexer_name, skillset_name, index_name, data_source, indexer_client=None, state=None):
     """
     Creates and runs an indexer to index documents and generate embeddings.
+    If a ConfigState is given and the definition and the remote indexer are unchanged since the
+    last push, the call is skipped and the existing indexer is not started; use run_indexer to trigger a run.
     Args:
         data_source (SearchIndexerDataSourceConnection): The data source connection to be used by the indexer.
     Returns:
-        SearchIndexer: The created and running indexer.
+        SearchIndexer: The created and running indexer (or its definition when skipped).
     """
     # Define an indexer with the specified skillset and target index.
     indexer_parameters = IndexingParameters(
         configuration=IndexingParametersConfiguration(
             parsing_mode="jsonArray",
-            document_root="/programs",
+            document_root=DEFAULT_DOCUMENT_ROOT,
             query_timeout=None
         )
     )
@@ -243,8 +309,66 @@ def create_indexer(azure_search_service, credential, indexer_name, skillset_name
         schedule=IndexingSchedule(interval="PT2H")
 
     )  
+    indexer_client = indexer_client or SearchIndexerClient(endpoint=azure_search_service, credential=credential)
+    if state is not None and state.unchanged("indexer", indexer, indexer_client.get_indexer):
+        print(f"{indexer_name} unchanged, skipping")
+        return indexer
     # Apply and run the indexer
-    indexer_client = SearchIndexerClient(endpoint=azure_search_service, credential=credential)  
     indexer_result = indexer_client.create_or_update_indexer(indexer)  
     print(f' {indexer_name} is created and running. Give the indexer a few minutes before running a query.')  
-    return indexer_result
\ No newline at end of file
+    if state is not None:
+        state.record("indexer", indexer, indexer_result)
+    return indexer_result
+
+IndexerProgress = namedtuple("IndexerProgress", ["status", "items_processed", "items_failed", "elapsed", "error_message"])
+
+def last_run_start(indexer_client, indexer_name):
+    """
+    Returns the service-side start time of the indexer's last run, or None if the
+    indexer does not exist or has not run yet. Read it before triggering a run and pass
+    it to wait_for_indexer.
+    """
+    try:
+        last_result = indexer_client.get_indexer_status(indexer_name).last_result
+    except ResourceNotFoundError:
+        return None
+    return last_result.start_time if last_result is not None else None
+
+def wait_for_indexer(indexer_client, indexer_name, previous_start=None, timeout=600, initial_interval=2.0, max_interval=30.0, on_progress=None):
+    """
+    Polls the indexer status with exponential backoff until a run newer than the one
+    that started at `previous_start` (see last_run_start; None if the indexer had not
+    run) finishes, or the timeout expires. Runs are told apart by the start times the
+    service reports, so the client clock does not matter.
+    Args:
+        on_progress (callable): Called with an IndexerProgress after every poll.
+    Returns:
+        IndexerProgress: The final status ("success", "transientFailure" or "error").
+    Raises:
+        TimeoutError: If the run has not finished within timeout seconds.
+    """
+    started = time.monotonic()
+    interval = initial_interval
+    while True:
+        status = indexer_client.get_indexer_status(indexer_name)
+        last_result = status.last_result
+        elapsed = time.monotonic() - started
+        if last_result is None or last_result.start_time is None or last_result.start_time == previous_start:
+            # The run we are waiting for has not been picked up yet
+            progress = IndexerProgress("pending", 0, 0, elapsed, None)
+        else:
+            progress = IndexerProgress(
+                status.status if status.status == "error" else last_result.status,
+                last_result.item_count or 0,
+                last_result.failed_item_count or 0,
+                elapsed,
+                last_result.error_message,
+            )
+        if on_progress:
+            on_progress(progress)
+        if progress.status in ("success", "transientFailure", "error"):
+            return progress
+        if elapsed + interval > timeout:
+            raise TimeoutError(f"Indexer '{indexer_name}' did not finish within {timeout}s (last status: {progress.status})")
+        time.sleep(interval)
+        interval = min(max_interval, interval * 2)
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Local quantized vector index backed by memory-mapped NumPy files.
+
+Vectors are L2-normalized and stored twice on disk: as quantized codes (int8 or
+packed binary) used for a coarse scan, and as float32 used to rescore the coarse
+candidates exactly. Both files are opened with np.memmap, so only the pages touched
+by a query are read into memory.
+"""
+import json
+import numpy as np
+import os
+
+_META_FILE = "meta.json"
+_VECTORS_FILE = "vectors.f32"
+_CODES_FILE = "codes.bin"
+QUANTIZATIONS = ("int8", "binary")
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores, k):
+    """
+    Returns the column indices of the k highest scores of each row, best first.
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class VectorIndex:
+    """
+    Exhaustive cosine-similarity index over quantized vectors with full-precision rescoring.
+    Use `VectorIndex.build` to write an index directory and `VectorIndex.open` to map it.
+    """
+    def __init__(self, directory, keys, vectors, codes, quantization, scale):
+        self.directory = directory
+        self.keys = keys
+        self.vectors = vectors
+        self.codes = codes
+        self.quantization = quantization
+        self.scale = scale
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def dimensions(self):
+        return self.vectors.shape[1]
+
+    @classmethod
+    def build(cls, directory, keys, vectors, quantization="int8"):
+        """
+        Normalizes and quantizes the vectors, writes the index files to directory
+        and returns the opened index.
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+        vectors = _normalize(vectors)
+        if len(keys) != len(vectors):
+            raise ValueError(f"Got {len(keys)} keys for {len(vectors)} vectors")
+        os.makedirs(directory, exist_ok=True)
+        scale = 1.0
+        if quantization == "int8":
+            max_abs = float(np.abs(vectors).max()) if vectors.size else 1.0
+            scale = 127.0 / max(max_abs, 1e-12)
+            codes = np.clip(np.rint(vectors * scale), -127, 127).astype(np.int8)
+        else:
+            codes = np.packbits(vectors > 0, axis=1)
+        vectors.tofile(os.path.join(directory, _VECTORS_FILE))
+        codes.tofile(os.path.join(directory, _CODES_FILE))
+        meta = {
+            "count": len(keys),
+            "dimensions": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            "quantization": quantization,
+            "scale": scale,
+            "keys": [str(key) for key in keys],
+        }
+        with open(os.path.join(directory, _META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return cls.open(directory)
+
+    @classmethod
+    def open(cls, directory):
+        """
+        Memory-maps an index directory written by `build`.
+        """
+        with open(os.path.join(directory, _META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        count, dimensions = meta["count"], meta["dimensions"]
+        code_width = dimensions if meta["quantization"] == "int8" else (dimensions + 7) // 8
+        code_type = np.int8 if meta["quantization"] == "int8" else np.uint8
+        if count:
+            vectors = np.memmap(os.path.join(directory, _VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dimensions))
+            codes = np.memmap(os.path.join(directory, _CODES_FILE), dtype=code_type, mode="r", shape=(count, code_width))
+        else:
+            vectors = np.empty((0, dimensions), dtype=np.float32)
+            codes = np.empty((0, code_width), dtype=code_type)
+        return cls(directory, meta["keys"], vectors, codes, meta["quantization"], meta["scale"])
+
+    def _coarse_scores(self, queries, start, stop):
+        block = self.codes[start:stop]
+        if self.quantization == "int8":
+            query_codes = np.rint(queries * self.scale).astype(np.int32)
+            return query_codes @ block.astype(np.int32).T
+        query_bits = np.packbits(queries > 0, axis=1)
+        # Negated hamming distance so that higher is better, like a dot product
+        distances = np.bitwise_count(query_bits[:, None, :] ^ block[None, :, :]).sum(axis=2, dtype=np.int32)
+        return -distances
+
+    def search_batch(self, queries, k=10, rescore_factor=4, block_size=65536):
+        """
+        Finds the k nearest vectors for each query row.
+        The quantized codes are scanned block by block to keep k * rescore_factor
+        candidates per query, which are then rescored against the float32 vectors.
+        Returns one list of (key, cosine similarity) per query, best first.
+        """
+        queries = _normalize(np.atleast_2d(queries))
+        if not len(self) or k <= 0:
+            return [[] for _ in range(len(queries))]
+        candidate_count = min(len(self), k * max(rescore_factor, 1))
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self), block_size):
+            stop = min(start + block_size, len(self))
+            scores = np.concatenate([best_scores, self._coarse_scores(queries, start, stop)], axis=1)
+            ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, stop), (len(queries), stop - start))], axis=1)
+            keep = _top_k(scores, candidate_count)
+            best_ids = np.take_along_axis(ids, keep, axis=1)
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+
+        results = []
+        for query, candidates in zip(queries, best_ids):
+            exact = self.vectors[np.sort(candidates)] @ query
+            order = np.argsort(-exact)[:k]
+            rows = np.sort(candidates)[order]
+            results.append([(self.keys[row], float(exact[i])) for i, row in zip(order, rows)])
+        return results
+
+    def search(self, vector, k=10, **kwargs):
+        """
+        Finds the k nearest vectors for a single query vector.
+        """
+        return self.search_batch(np.asarray(vector)[None, :], k=k, **kwargs)[0]
@@ -0,0 +1,238 @@
+"""
+Stateless async HTTP chat API serving the same retrieval-plus-grounded-completion
+turn as chat_component.py, so the chat backend can be scaled across cores and
+nodes independently of the Streamlit UI.
+
+Endpoints:
+    POST /v1/chat        {"question": str, "history": [{"role", "content"}, ...]}
+                         streams server-sent events: one "sources" event with the
+                         ids of the retrieved sources, "delta" events with the answer
+                         text, then "done" (or "error")
+    POST /v1/chat/batch  {"requests": [{"question", "history"}, ...]}
+                         answers all requests concurrently and returns
+                         {"responses": [{"answer", "sources"} or {"error"}, ...]}
+    GET  /healthz
+
+The conversation is passed in by the client with every request, so any worker can
+answer any request. An X-Correlation-Id request header tags the request's telemetry.
+
+Usage:
+    python app/server.py --port 8000 --workers 0   # one worker process per CPU
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from dotenv import load_dotenv
+import tornado.httpserver
+import tornado.netutil
+import tornado.process
+import tornado.web
+from tornado.iostream import StreamClosedError
+
+from chat_pipeline import build_messages, retrieve_sources, stream_completion
+from search.clients import close_async_clients, get_async_openai_client
+from search.context import CONTEXT_FIELDS
+from search.response_cache import ResponseCache, conversation_key, question_key, replay, source_ids, sources_fingerprint
+from search.search_wrapper import SearchWrapper
+from search.telemetry import correlation, telemetry
+
+MAX_BATCH_SIZE = 64
+
+
+class ChatService:
+    """
+    Runs chat turns for the HTTP handlers. One instance is shared by all requests of a worker.
+    """
+    def __init__(self, search_service=None, response_cache=None):
+        self.endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+        self.api_key = os.getenv("AZURE_OPENAI_API_KEY")
+        self.api_version = os.getenv("AZURE_OPENAI_API_VERSION")
+        self.model = os.getenv("AZURE_OPENAI_MODEL")
+        self.top = int(os.getenv("SEARCH_TOP") or 5)
+        self.token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET") or 2000)
+        self.fields = [f.strip() for f in os.getenv("CONTEXT_FIELDS", "").split(",") if f.strip()] or CONTEXT_FIELDS
+        self.fan_out = (os.getenv("QUERY_FAN_OUT") or "true").lower() == "true"
+        self.batch_concurrency = int(os.getenv("CHAT_API_BATCH_CONCURRENCY") or 8)
+        self.search_service = search_service or SearchWrapper()
+        cache_size = int(os.getenv("RESPONSE_CACHE_SIZE") or 512)
+        self.response_cache = response_cache if response_cache is not None else (
+            ResponseCache(maxsize=cache_size, threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD") or 0.95)) if cache_size else None
+        )
+
+    async def stream(self, question, history=None):
+        """
+        Yields ("sources", ids) and then ("delta", text) events for one turn.
+        """
+        sources = await retrieve_sources(self.search_service, question, top=self.top, fields=self.fields, fan_out=self.fan_out)
+        yield "sources", list(source_ids(sources))
+        sources_key = sources_fingerprint(sources)
+
+        cached_response = None
+        if self.response_cache is not None:
+            version = await asyncio.to_thread(lambda: self.search_service.index_version)
+            self.response_cache.check_version(version)
+            query_key = await asyncio.to_thread(question_key, question, self.search_service.embedder)
+            cached_response = self.response_cache.lookup(query_key, sources_key, conversation_key(history))
+        if cached_response is not None:
+            telemetry.increment("chat.response_cache.hit")
+            for delta in replay(cached_response):
+                yield "delta", delta
+            return
+
+        messages = build_messages(question, sources, token_budget=self.token_budget, fields=self.fields, history=history)
+        client = get_async_openai_client(self.endpoint, self.api_key, self.api_version)
+        deltas = []
+        async for delta in stream_completion(client, self.model, messages):
+            deltas.append(delta)
+            yield "delta", delta
+        if self.response_cache is not None:
+            telemetry.increment("chat.response_cache.miss")
+            self.response_cache.put(query_key, sources_key, "".join(deltas), conversation_key(history))
+
+    async def answer(self, question, history=None):
+        """
+        Runs one turn to completion. Returns {"answer": str, "sources": [ids]}.
+        """
+        sources, deltas = [], []
+        async for event, data in self.stream(question, history):
+            if event == "sources":
+                sources = data
+            else:
+                deltas.append(data)
+        return {"answer": "".join(deltas), "sources": sources}
+
+
+def parse_turn(payload):
+    """
+    Validates a {"question", "history"} request object. Returns (question, history).
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("expected a JSON object")
+    question = payload.get("question")
+    if not isinstance(question, str) or not question.strip():
+        raise ValueError("'question' must be a non-empty string")
+    history = payload.get("history") or []
+    if not isinstance(history, list) or not all(
+        isinstance(m, dict) and m.get("role") in ("system", "user", "assistant") and isinstance(m.get("content"), str)
+        for m in history
+    ):
+        raise ValueError("'history' must be a list of {\"role\", \"content\"} messages")
+    return question, [{"role": m["role"], "content": m["content"]} for m in history]
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def json_body(self):
+        try:
+            return json.loads(self.request.body or b"null")
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Request body is not valid JSON")
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header("Content-Type", "application/json")
+        self.finish({"error": self._reason})
+
+
+class ChatHandler(BaseHandler):
+    async def post(self):
+        try:
+            question, history = parse_turn(self.json_body())
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason=str(e))
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("X-Accel-Buffering", "no")
+        with correlation(self.request.headers.get("X-Correlation-Id")) as correlation_id:
+            self.set_header("X-Correlation-Id", correlation_id)
+            with telemetry.span("api.chat") as span:
+                try:
+                    async for event, data in self.service.stream(question, history):
+                        self.write(f"event: {event}\ndata: {json.dumps(data)}\n\n")
+                        await self.flush()
+                    self.write("event: done\ndata: {}\n\n")
+                except StreamClosedError:
+                    # The client went away; stop generating
+                    span["disconnected"] = True
+                    return
+                except Exception as e:
+                    self.write(f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n")
+                    span["error"] = repr(e)
+        self.finish()
+
+
+class BatchHandler(BaseHandler):
+    async def post(self):
+        payload = self.json_body()
+        requests = payload.get("requests") if isinstance(payload, dict) else None
+        if not isinstance(requests, list) or not requests:
+            raise tornado.web.HTTPError(400, reason="'requests' must be a non-empty list")
+        if len(requests) > MAX_BATCH_SIZE:
+            raise tornado.web.HTTPError(400, reason=f"At most {MAX_BATCH_SIZE} requests per batch")
+        semaphore = asyncio.Semaphore(self.service.batch_concurrency)
+
+        async def run(request):
+            try:
+                question, history = parse_turn(request)
+            except ValueError as e:
+                return {"error": str(e)}
+            async with semaphore:
+                try:
+                    return await self.service.answer(question, history)
+                except Exception as e:
+                    return {"error": str(e)}
+
+        with correlation(self.request.headers.get("X-Correlation-Id")) as correlation_id:
+            self.set_header("X-Correlation-Id", correlation_id)
+            with telemetry.span("api.batch", size=len(requests)):
+                responses = await asyncio.gather(*(run(request) for request in requests))
+        self.finish({"responses": responses})
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.finish({"status": "ok"})
+
+
+def make_app(service):
+    return tornado.web.Application([
+        (r"/v1/chat", ChatHandler, {"service": service}),
+        (r"/v1/chat/batch", BatchHandler, {"service": service}),
+        (r"/healthz", HealthHandler),
+    ])
+
+
+async def serve(sockets):
+    server = tornado.httpserver.HTTPServer(make_app(ChatService()), idle_connection_timeout=60)
+    server.add_sockets(sockets)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+        await close_async_clients()
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default=os.getenv("CHAT_API_HOST") or "0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("CHAT_API_PORT") or 8000))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CHAT_API_WORKERS") or 1),
+                        help="Worker processes sharing the listening socket; 0 starts one per CPU")
+    args = parser.parse_args(argv)
+
+    # Bind before forking so all workers accept on the same socket, and create the
+    # search service and clients only in the workers
+    sockets = tornado.netutil.bind_sockets(args.port, address=args.host)
+    if args.workers != 1:
+        # The workers split the upstream rate limits between them (see get_scheduler)
+        os.environ["UPSTREAM_PROCESSES"] = str(args.workers or tornado.process.cpu_count())
+        tornado.process.fork_processes(args.workers)
+    asyncio.run(serve(sockets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Local stand-in for the Azure OpenAI streaming chat completions API. Emits a fixed
+answer as server-sent events at a configurable token rate, with a configurable
+time-to-first-token and jitter.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+
+DEFAULT_ANSWER = (
+    "Based on the sources, the program lists the requested works together with the orchestra, "
+    "season, venue and conductor. See the cited program for the full details."
+)
+
+
+def make_handler(tokens_per_second=50.0, first_token_ms=200.0, jitter_ms=20.0, answer=DEFAULT_ANSWER):
+    tokens = [word + " " for word in answer.split()]
+
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def _event(self, payload):
+            self._write_chunk(b"data: " + payload.encode("utf-8") + b"\n\n")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.split("?")[0].endswith("/chat/completions"):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            model = request.get("model", "fake")
+            time.sleep((first_token_ms + random.uniform(0, jitter_ms)) / 1000)
+            for position, token in enumerate(tokens):
+                if position:
+                    time.sleep(1 / tokens_per_second + random.uniform(0, jitter_ms) / 1000)
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}],
+                }
+                self._event(json.dumps(chunk))
+            done = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            self._event(json.dumps(done))
+            self._event("[DONE]")
+            self._write_chunk(b"")
+
+    return FakeOpenAIHandler
+
+
+def start_fake_openai(host="127.0.0.1", port=0, **kwargs):
+    """
+    Serves the fake completions API on a background thread. Returns (server, endpoint URL).
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(**kwargs))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
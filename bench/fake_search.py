@@ -0,0 +1,72 @@
+"""
+Local stand-in for the Azure AI Search query API, backed by the in-process BM25
+index over a directory of JSON corpus files. Implements the document search and
+count endpoints used by SearchClient.search and SearchClient.get_document_count.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+
+
+def make_handler(index, latency_ms=0.0, jitter_ms=0.0):
+    class FakeSearchHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _delay(self):
+            delay = latency_ms + random.uniform(0, jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; odata.metadata=none")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._delay()
+            if "/docs/$count" in self.path:
+                body = str(len(index)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json({"error": {"message": "Not found"}}, status=404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            self._delay()
+            if "docs/search.post.search" not in self.path:
+                self._send_json({"error": {"message": "Not found"}}, status=404)
+                return
+            select = request.get("select")
+            results = index.search(
+                request.get("search") or "",
+                top=request.get("top") or 50,
+                skip=request.get("skip") or 0,
+                select=select.split(",") if select else None,
+                filter=request.get("filter"),
+            )
+            self._send_json({"value": results})
+
+    return FakeSearchHandler
+
+
+def start_fake_search(index, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0):
+    """
+    Serves the index on a background thread. Returns (server, endpoint URL).
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(index, latency_ms, jitter_ms))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,217 @@
+"""
+End-to-end latency and throughput benchmark for the chat turn.
+
+Starts a fake Azure AI Search endpoint backed by the local corpus and a fake
+streaming Azure OpenAI endpoint, then replays a question set through the same
+retrieval and completion pipeline as chat_component.py with N concurrent sessions.
+Reports p50/p95/p99 search latency, time-to-first-token and turn latency plus
+turns per second, and compares them with a saved baseline.
+
+Usage:
+    python bench/run.py --sessions 8 --turns 20
+    python bench/run.py --save-baseline
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+APP_DIRECTORY = os.path.join(BENCH_DIRECTORY, "..", "app")
+sys.path.insert(0, APP_DIRECTORY)
+sys.path.insert(0, BENCH_DIRECTORY)
+
+from fake_openai import start_fake_openai  # noqa: E402
+from fake_search import start_fake_search  # noqa: E402
+
+DEFAULT_QUESTIONS = os.path.join(BENCH_DIRECTORY, "questions.jsonl")
+DEFAULT_BASELINE = os.path.join(BENCH_DIRECTORY, "baseline.json")
+DEFAULT_DATA = os.path.join(BENCH_DIRECTORY, "..", "data")
+METRICS = ("search_ms", "ttft_ms", "turn_ms")
+
+
+def load_questions(path):
+    """
+    Reads questions from a JSON lines file; each line holds a "question", "title" or "body".
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                questions.append(record.get("question") or record.get("title") or record.get("body"))
+    return [q for q in questions if q]
+
+
+def percentile(values, q):
+    """
+    Returns the q-th percentile (0-100) of values using linear interpolation.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples, elapsed):
+    report = {"turns": len(samples["turn_ms"]), "turns_per_sec": len(samples["turn_ms"]) / elapsed if elapsed else 0.0}
+    for metric in METRICS:
+        report[metric] = {f"p{q}": round(percentile(samples[metric], q), 2) for q in (50, 95, 99)}
+    return report
+
+
+async def run_session(search_service, client, questions, turns, offset, args, samples):
+    from chat_pipeline import build_messages, retrieve_sources, stream_completion
+
+    for turn in range(turns):
+        question = questions[(offset + turn) % len(questions)]
+        started = time.perf_counter()
+        sources = await retrieve_sources(search_service, question, top=args.top, fields=args.context_fields, fan_out=not args.no_fan_out)
+        searched = time.perf_counter()
+        messages = build_messages(question, sources, token_budget=args.token_budget, fields=args.context_fields)
+        first_token = None
+        async for _ in stream_completion(client, "fake-model", messages):
+            if first_token is None:
+                first_token = time.perf_counter()
+        finished = time.perf_counter()
+        samples["search_ms"].append((searched - started) * 1000)
+        samples["ttft_ms"].append(((first_token or finished) - started) * 1000)
+        samples["turn_ms"].append((finished - started) * 1000)
+
+
+async def run_benchmark(search_service, openai_endpoint, questions, args):
+    from search.clients import close_async_clients, get_async_openai_client
+
+    client = get_async_openai_client(openai_endpoint, "fake-key", "2024-06-01")
+    samples = {metric: [] for metric in METRICS}
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            run_session(search_service, client, questions, args.turns, session * args.turns, args, samples)
+            for session in range(args.sessions)
+        ))
+    finally:
+        await close_async_clients()
+    return summarize(samples, time.perf_counter() - started)
+
+
+def compare(report, baseline, tolerance):
+    """
+    Prints the change of every p95 against the baseline. Returns False if any p95
+    latency or the throughput regressed by more than tolerance percent.
+    """
+    ok = True
+    for metric in METRICS:
+        before, after = baseline[metric]["p95"], report[metric]["p95"]
+        change = (after - before) / before * 100 if before else 0.0
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"  {metric} p95: {before:.1f} -> {after:.1f} ms ({change:+.1f}%){'  REGRESSION' if regressed else ''}")
+    before, after = baseline["turns_per_sec"], report["turns_per_sec"]
+    change = (after - before) / before * 100 if before else 0.0
+    regressed = -change > tolerance
+    ok = ok and not regressed
+    print(f"  turns/sec: {before:.2f} -> {after:.2f} ({change:+.1f}%){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="JSON lines file of questions")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="Directory of JSON corpus files served by the fake search endpoint")
+    parser.add_argument("--fields", help="Comma-separated fields to index (default: all top-level fields of the corpus)")
+    parser.add_argument("--context-fields", help="Comma-separated fields to put in the prompt (default: all)")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=10, help="Turns per session")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--token-budget", type=int, default=2000)
+    parser.add_argument("--no-fan-out", action="store_true", help="Search the raw question only")
+    parser.add_argument("--cache", action="store_true", help="Keep the search query cache enabled")
+    parser.add_argument("--hydrate", action="store_true", help="Fetch keys only and hydrate results from a local document store")
+    parser.add_argument("--search-latency-ms", type=float, default=20.0)
+    parser.add_argument("--search-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--token-jitter-ms", type=float, default=2.0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="Allowed p95 regression in percent")
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    args.context_fields = args.context_fields.split(",") if args.context_fields else None
+
+    if not args.cache:
+        os.environ["SEARCH_CACHE_SIZE"] = "0"
+    os.environ["SEARCH_HYDRATE"] = str(args.hydrate).lower()
+    from azure.core.credentials import AzureKeyCredential
+    from azure.search.documents import SearchClient
+    from search.clients import get_async_search_client
+    from search.bm25_index import BM25Index
+    from search.corpus import iter_documents
+    from search.doc_store import DocumentStore
+    from search.search_wrapper import SearchWrapper
+
+    paths = sorted(glob.glob(os.path.join(args.data, "*.json*")))
+    if args.fields:
+        fields = args.fields.split(",")
+    else:
+        fields = sorted({key for path in paths for document in iter_documents(path) for key in document})
+    index = BM25Index.from_files(paths, fields=fields)
+    if args.hydrate:
+        store_directory = tempfile.mkdtemp(prefix="bench-store-")
+        os.environ["DOCUMENT_STORE_PATH"] = os.path.join(store_directory, "documents.arrow")
+        DocumentStore.build(os.environ["DOCUMENT_STORE_PATH"], (document for path in paths for document in iter_documents(path)))
+    search_server, search_endpoint = start_fake_search(index, latency_ms=args.search_latency_ms, jitter_ms=args.search_jitter_ms)
+    openai_server, openai_endpoint = start_fake_openai(
+        tokens_per_second=args.tokens_per_second,
+        first_token_ms=args.first_token_ms,
+        jitter_ms=args.token_jitter_ms,
+    )
+    credential = AzureKeyCredential("fake-key")
+    search_client = SearchClient(endpoint=search_endpoint, index_name="bench-idx", credential=credential)
+    search_service = SearchWrapper(
+        search_client=search_client,
+        async_search_client=lambda: get_async_search_client(search_endpoint, "bench-idx", credential),
+    )
+
+    questions = load_questions(args.questions)
+    print(f"{len(index)} documents, {len(questions)} questions, {args.sessions} sessions x {args.turns} turns")
+    try:
+        report = asyncio.run(run_benchmark(search_service, openai_endpoint, questions, args))
+    finally:
+        search_server.shutdown()
+        openai_server.shutdown()
+        if args.hydrate:
+            shutil.rmtree(store_directory, ignore_errors=True)
+
+    for metric in METRICS:
+        values = report[metric]
+        print(f"{metric:>10}: p50 {values['p50']:8.1f}  p95 {values['p95']:8.1f}  p99 {values['p99']:8.1f}")
+    print(f"turns/sec: {report['turns_per_sec']:.2f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("Compared with baseline:")
+        return 0 if compare(report, baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+The application modules are imported as `search.*` from the app directory, like
+the Streamlit app and server.py do.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+PROGRAMS = [
+    {"programID": "1", "orchestra": "New York Philharmonic", "season": "1842-43",
+     "concerts": [{"eventType": "Subscription Season", "Location": "Manhattan, NY", "Venue": "Apollo Rooms"}],
+     "works": [{"ID": "1", "composerName": "Beethoven,  Ludwig  van", "workTitle": "SYMPHONY NO. 5", "conductorName": "Hill, Ureli Corelli"}]},
+    {"programID": "2", "orchestra": "New York Philharmonic", "season": "1843-44",
+     "concerts": [{"eventType": "Subscription Season", "Location": "Manhattan, NY", "Venue": "Broadway Tabernacle"}],
+     "works": [{"ID": "2", "composerName": "Weber,  Carl  Maria Von", "workTitle": "OBERON", "conductorName": "Timm, Henry C."}]},
+    {"programID": "3", "orchestra": "Musicians from Ukraine", "season": "2022-23",
+     "concerts": [{"eventType": "Special", "Location": "Manhattan, NY", "Venue": "Carnegie Hall"}],
+     "works": [{"ID": "3", "composerName": "Beethoven,  Ludwig  van", "workTitle": "EGMONT OVERTURE", "conductorName": "Zelensky, Olena"}]},
+]
+
+
+@pytest.fixture
+def local_search(tmp_path, monkeypatch):
+    """
+    Returns a factory of SearchWrapper instances on the local backend over PROGRAMS,
+    with their index files under tmp_path.
+    """
+    from search.search_wrapper import SearchWrapper
+
+    with open(tmp_path / "programs.json", "w") as f:
+        json.dump({"programs": PROGRAMS}, f)
+    monkeypatch.setenv("LOCAL_DATA_DIRECTORY", str(tmp_path))
+    monkeypatch.setenv("SEARCH_BACKEND", "local")
+    monkeypatch.setenv("EMBEDDER", "hashing")
+    for name in ("SEARCH_MODE", "SEARCH_RERANK", "SEARCH_FILTER_PUSHDOWN", "SEARCH_CACHE_SIZE"):
+        monkeypatch.delenv(name, raising=False)
+
+    def factory(**kwargs):
+        return SearchWrapper(**kwargs)
+    return factory
@@ -0,0 +1,87 @@
+import os
+
+from search.blob_wrapper import MANIFEST_FILENAME, BlobWrapper
+
+
+class FakeContainer:
+    """
+    Records the uploads and deletions of a ContainerClient.
+    """
+    def __init__(self, url):
+        self.url = url
+        self.blobs = {}
+        self.uploads = []
+
+    def upload_blob(self, name, data, overwrite=False, **kwargs):
+        self.blobs[name] = data.read()
+        self.uploads.append(name)
+
+    def delete_blob(self, name):
+        del self.blobs[name]
+
+
+def make_source(tmp_path):
+    source = tmp_path / "source"
+    (source / "nested").mkdir(parents=True)
+    (source / "a.json").write_text('{"a": 1}')
+    (source / "nested" / "b.json").write_text('{"b": 2}')
+    return str(source)
+
+
+def test_sync_uploads_only_new_and_changed_files(tmp_path):
+    source = make_source(tmp_path)
+    container = FakeContainer("https://account.blob.core.windows.net/programs")
+    wrapper = BlobWrapper(source, container_client=container)
+    report = wrapper.sync()
+    assert sorted(report.uploaded) == ["a.json", "nested/b.json"]
+    assert report.ok and os.path.exists(os.path.join(source, MANIFEST_FILENAME))
+    assert MANIFEST_FILENAME not in container.blobs
+
+    report = wrapper.sync()
+    assert report.uploaded == [] and sorted(report.skipped) == ["a.json", "nested/b.json"]
+
+    with open(os.path.join(source, "a.json"), "w") as f:
+        f.write('{"a": 3}')
+    # A touched but unchanged file is recognized by its content hash
+    os.utime(os.path.join(source, "nested", "b.json"), (0, 0))
+    report = wrapper.sync()
+    assert report.uploaded == ["a.json"]
+    assert container.blobs["a.json"] == b'{"a": 3}'
+
+
+def test_sync_prunes_removed_files(tmp_path):
+    source = make_source(tmp_path)
+    container = FakeContainer("https://account.blob.core.windows.net/programs")
+    wrapper = BlobWrapper(source, container_client=container)
+    wrapper.sync()
+    os.remove(os.path.join(source, "a.json"))
+    assert wrapper.sync().pruned == []
+    assert wrapper.sync(prune=True).pruned == ["a.json"]
+    assert list(container.blobs) == ["nested/b.json"]
+
+
+def test_manifest_is_kept_per_container(tmp_path):
+    source = make_source(tmp_path)
+    first = FakeContainer("https://account.blob.core.windows.net/programs")
+    BlobWrapper(source, container_client=first).sync()
+    second = FakeContainer("https://other.blob.core.windows.net/programs")
+    report = BlobWrapper(source, container_client=second).sync()
+    assert sorted(report.uploaded) == ["a.json", "nested/b.json"]
+    assert BlobWrapper(source, container_client=first).sync().uploaded == []
+
+
+def test_failed_uploads_are_reported_and_retried(tmp_path):
+    source = make_source(tmp_path)
+    container = FakeContainer("https://account.blob.core.windows.net/programs")
+    upload = container.upload_blob
+
+    def failing_upload(name, data, **kwargs):
+        if name == "a.json":
+            raise OSError("connection reset")
+        upload(name, data, **kwargs)
+    container.upload_blob = failing_upload
+    wrapper = BlobWrapper(source, container_client=container)
+    report = wrapper.sync()
+    assert list(report.failed) == ["a.json"] and report.uploaded == ["nested/b.json"]
+    container.upload_blob = upload
+    assert wrapper.sync().uploaded == ["a.json"]
@@ -0,0 +1,93 @@
+import json
+import os
+
+from search.bm25_index import BM25Index, field_values, tokenize
+
+DOCUMENTS = [
+    {"programID": "1", "orchestra": "New York Philharmonic", "season": "1842-43",
+     "works": [{"composerName": "Beethoven,  Ludwig  van", "workTitle": "SYMPHONY NO. 5"}]},
+    {"programID": "2", "orchestra": "New York Philharmonic", "season": "1843-44",
+     "works": [{"composerName": "Dvořák,  Antonín", "workTitle": "SYMPHONY NO. 9"}]},
+    {"programID": "3", "orchestra": "Musicians from Ukraine", "season": "2022-23",
+     "works": [{"composerName": "Beethoven,  Ludwig  van", "workTitle": "EGMONT OVERTURE"}]},
+]
+
+
+def write_corpus(path, documents):
+    with open(path, "w") as f:
+        json.dump({"programs": documents}, f)
+
+
+def test_tokenize_strips_accents_and_case():
+    assert tokenize("Dvořák, ANTONÍN") == ["dvorak", "antonin"]
+
+
+def test_field_values_descends_into_collections():
+    assert list(field_values(DOCUMENTS[0], "works.composerName")) == ["Beethoven,  Ludwig  van"]
+    assert list(field_values(DOCUMENTS[0], "concerts.Venue")) == []
+
+
+def test_search_ranks_matching_documents():
+    index = BM25Index()
+    index.add_documents(DOCUMENTS)
+    results = index.search("beethoven egmont")
+    assert [r["programID"] for r in results] == ["3", "1"]
+    assert results[0]["@search.score"] > results[1]["@search.score"]
+    assert index.search("dvorak")[0]["programID"] == "2"
+
+
+def test_search_applies_top_skip_and_select():
+    index = BM25Index()
+    index.add_documents(DOCUMENTS)
+    results = index.search("symphony", select=["programID", "season"])
+    assert [set(r) for r in results] == [{"programID", "season", "@search.score"}] * 2
+    assert len(index.search("new york", top=1)) == 1
+    assert index.search("new york", skip=1) == index.search("new york")[1:]
+
+
+def test_search_applies_filter():
+    index = BM25Index()
+    index.add_documents(DOCUMENTS)
+    results = index.search("symphony", filter="season eq '1843-44'", select=["programID", "season"])
+    assert results == [{"programID": "2", "season": "1843-44", "@search.score": results[0]["@search.score"]}]
+    assert index.search("beethoven", filter="works/any(w: w/workTitle eq 'EGMONT OVERTURE')")[0]["programID"] == "3"
+
+
+def test_documents_without_key_are_keyed_by_position():
+    index = BM25Index()
+    index.add_documents([{"orchestra": "Rock Band"}])
+    assert index.search("rock", select=["programID"]) == [{"programID": "0", "@search.score": index.search("rock")[0]["@search.score"]}]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = BM25Index()
+    index.add_documents(DOCUMENTS)
+    path = str(tmp_path / "index.pkl")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("beethoven") == index.search("beethoven")
+
+
+def test_load_or_build_rebuilds_when_options_change(tmp_path):
+    data = str(tmp_path / "corpus.json")
+    write_corpus(data, DOCUMENTS)
+    index_path = str(tmp_path / "index.pkl")
+    built = BM25Index.load_or_build(index_path, [data], document_root="/programs")
+    assert len(built) == 3
+    # Same options: the saved index is reused
+    assert BM25Index.load_or_build(index_path, [data], document_root="/programs").build_options == built.build_options
+    # Other fields: the index is rebuilt with them
+    rebuilt = BM25Index.load_or_build(index_path, [data], document_root="/programs", fields=["orchestra"])
+    assert rebuilt.fields == ["orchestra"]
+    assert rebuilt.search("beethoven") == []
+
+
+def test_load_or_build_rebuilds_when_data_changes(tmp_path):
+    data = str(tmp_path / "corpus.json")
+    write_corpus(data, DOCUMENTS)
+    index_path = str(tmp_path / "index.pkl")
+    BM25Index.load_or_build(index_path, [data], document_root="/programs")
+    write_corpus(data, DOCUMENTS[:1])
+    mtime = os.path.getmtime(index_path) + 10
+    os.utime(data, (mtime, mtime))
+    assert len(BM25Index.load_or_build(index_path, [data], document_root="/programs")) == 1
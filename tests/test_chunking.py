@@ -0,0 +1,55 @@
+from search.chunking import chunk_document, chunk_documents, parent_key, sliding_windows
+from search.odata import compile_filter
+from search.schema import validate_document
+
+PROGRAM = {
+    "programID": "7",
+    "orchestra": "New York Philharmonic",
+    "season": "1842-43",
+    "concerts": [{"eventType": "Subscription Season", "Venue": "Apollo Rooms", "Location": "Manhattan, NY"}],
+    "works": [
+        {"ID": "1", "composerName": "Beethoven,  Ludwig  van", "workTitle": "SYMPHONY NO. 5", "conductorName": "Hill, Ureli Corelli"},
+        {"ID": "2", "composerName": "Weber,  Carl  Maria Von", "workTitle": "OBERON"},
+    ],
+}
+
+
+def test_programs_are_split_per_work_and_concert():
+    chunks = chunk_document(PROGRAM)
+    assert [c["programID"] for c in chunks] == ["7-w0", "7-w1", "7-c0"]
+    assert all(c["parent_id"] == "7" and c["season"] == "1842-43" for c in chunks)
+    assert chunks[1]["works"] == [PROGRAM["works"][1]]
+    assert chunks[2]["concerts"] == PROGRAM["concerts"]
+    assert all(validate_document(c) == [] for c in chunks)
+
+
+def test_chunks_match_filters_combining_works_and_concerts():
+    matches = compile_filter(
+        "works/any(w: w/composerName eq 'Beethoven,  Ludwig  van') and concerts/any(c: c/Venue eq 'Apollo Rooms')"
+    )
+    assert [c["programID"] for c in chunk_document(PROGRAM) if matches(c)] == ["7-w0", "7-c0"]
+
+
+def test_documents_without_structure_fall_back_to_sliding_windows():
+    document = {"orchestra": "Rock Band", "season": " ".join(["word"] * 100)}
+    chunks = chunk_document(document, size=100, overlap=20)
+    assert len(chunks) > 1
+    assert all(c["parent_id"] == parent_key(document) and len(c["chunk"]) <= 100 for c in chunks)
+    assert [c["programID"] for c in chunks][:2] == [f"{parent_key(document)}-p0", f"{parent_key(document)}-p1"]
+
+
+def test_sliding_windows_overlap_and_split_on_whitespace():
+    text = " ".join(f"w{i:02d}" for i in range(40))
+    windows = sliding_windows(text, size=40, overlap=10)
+    assert all(len(w) <= 40 for w in windows)
+    assert all(not w.startswith(" ") and not w.endswith(" ") for w in windows)
+    assert windows[0].split()[-1] in windows[1]
+    assert windows[-1].endswith("w39")
+
+
+def test_chunk_documents_keeps_input_order_across_processes():
+    documents = [{**PROGRAM, "programID": str(n)} for n in range(20)]
+    serial = list(chunk_documents(documents, max_workers=1))
+    parallel = list(chunk_documents(documents, max_workers=2, batch_size=3))
+    assert parallel == serial
+    assert len(serial) == 60
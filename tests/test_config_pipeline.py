@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+from azure.core.exceptions import ResourceNotFoundError
+import pytest
+
+from search.utils import ConfigState, last_run_start, wait_for_indexer
+
+
+class Definition:
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def as_dict(self):
+        return {"name": self.name, **self.attributes}
+
+
+class Service:
+    """
+    Holds remote resources by name, each with an ETag that changes on every update.
+    """
+    def __init__(self):
+        self.resources = {}
+        self.updates = 0
+
+    def push(self, definition):
+        self.updates += 1
+        self.resources[definition.name] = SimpleNamespace(name=definition.name, e_tag=f"etag-{self.updates}")
+        return self.resources[definition.name]
+
+    def get(self, name):
+        if name not in self.resources:
+            raise ResourceNotFoundError(f"{name} not found")
+        return self.resources[name]
+
+
+def test_unchanged_definitions_are_skipped_until_the_remote_resource_changes(tmp_path):
+    path = str(tmp_path / "state.json")
+    service = Service()
+    definition = Definition("programs-idx", fields=["programID"])
+    state = ConfigState(path, "https://search")
+    assert not state.unchanged("index", definition, service.get)
+    state.record("index", definition, service.push(definition))
+
+    # Another run reads the recorded state
+    state = ConfigState(path, "https://search")
+    assert state.unchanged("index", definition, service.get)
+    assert not state.unchanged("index", Definition("programs-idx", fields=["season"]), service.get)
+    assert not ConfigState(path, "https://other-search").unchanged("index", definition, service.get)
+
+    # Edited outside this pipeline
+    service.push(definition)
+    assert not state.unchanged("index", definition, service.get)
+
+    # Deleted outside this pipeline
+    state.record("index", definition, service.resources["programs-idx"])
+    del service.resources["programs-idx"]
+    assert not state.unchanged("index", definition, service.get)
+
+
+class IndexerClient:
+    def __init__(self, statuses):
+        self.statuses = iter(statuses)
+
+    def get_indexer_status(self, name):
+        status = next(self.statuses)
+        if isinstance(status, Exception):
+            raise status
+        return status
+
+
+def status(start_time, result="success", items=0):
+    last_result = SimpleNamespace(start_time=start_time, status=result, item_count=items, failed_item_count=0, error_message=None)
+    return SimpleNamespace(status="running", last_result=last_result)
+
+
+def test_last_run_start():
+    assert last_run_start(IndexerClient([status(5)]), "idxr") == 5
+    assert last_run_start(IndexerClient([SimpleNamespace(status="running", last_result=None)]), "idxr") is None
+    assert last_run_start(IndexerClient([ResourceNotFoundError("missing")]), "idxr") is None
+
+
+def test_wait_for_indexer_waits_for_a_run_with_another_start_time():
+    # The service clock may be anywhere relative to the local one: only a different
+    # start time than the one seen before the run counts
+    client = IndexerClient([status(100), status(50, "inProgress", 3), status(50, "success", 9)])
+    progress = []
+    final = wait_for_indexer(client, "idxr", previous_start=100, initial_interval=0.001, on_progress=progress.append)
+    assert [p.status for p in progress] == ["pending", "inProgress", "success"]
+    assert final.items_processed == 9
+
+
+def test_wait_for_indexer_times_out():
+    client = IndexerClient([status(100)] * 10)
+    with pytest.raises(TimeoutError):
+        wait_for_indexer(client, "idxr", previous_start=100, timeout=0.01, initial_interval=0.004)
@@ -0,0 +1,48 @@
+import json
+
+from search.context import build_context, compact_source, estimate_tokens
+
+RESULT = {
+    "programID": "1",
+    "orchestra": "New York Philharmonic",
+    "season": "",
+    "@search.score": 3.2,
+    "concerts": [{"eventType": "Subscription Season", "Venue": "Apollo Rooms", "Date": None}] * 2,
+    "works": [{"ID": "1", "composerName": "Beethoven,  Ludwig  van", "workTitle": "SYMPHONY NO. 5", "soloists": []}],
+}
+
+
+def test_sources_keep_context_fields_without_metadata_empty_values_or_duplicates():
+    assert compact_source(RESULT) == {
+        "programID": "1",
+        "orchestra": "New York Philharmonic",
+        "concerts": [{"eventType": "Subscription Season", "Venue": "Apollo Rooms"}],
+        "works": [{"composerName": "Beethoven,  Ludwig  van", "workTitle": "SYMPHONY NO. 5"}],
+    }
+    assert compact_source(RESULT, fields=["programID", "works"]) == {
+        "programID": "1",
+        "works": [{"composerName": "Beethoven,  Ludwig  van", "workTitle": "SYMPHONY NO. 5"}],
+    }
+
+
+def test_context_is_one_json_line_per_distinct_source_in_rank_order():
+    results = [RESULT, {**RESULT, "@search.score": 1.0}, {"programID": "2", "orchestra": "Musicians from Ukraine"}]
+    lines = build_context(results).split("\n")
+    assert [json.loads(line)["programID"] for line in lines] == ["1", "2"]
+    assert lines[0] == json.dumps(compact_source(RESULT), separators=(",", ":"), ensure_ascii=False)
+
+
+def test_context_stops_at_the_token_budget():
+    results = [{"programID": str(n), "orchestra": "x" * 40} for n in range(10)]
+    context = build_context(results, token_budget=40)
+    assert estimate_tokens(context) <= 40
+    assert len(context.split("\n")) == 2
+
+
+def test_oversized_top_result_is_trimmed_rather_than_dropped():
+    works = [{"composerName": f"Composer {n}", "workTitle": f"Work {n}"} for n in range(50)]
+    context = build_context([{"programID": "1", "works": works}], token_budget=60)
+    source = json.loads(context)
+    assert source["programID"] == "1" and 0 < len(source["works"]) < 50
+    assert estimate_tokens(context) < 60
+    assert build_context([{"programID": "x" * 400}], token_budget=10) == ""
@@ -0,0 +1,55 @@
+from conversation import ConversationMemory, summarize_message
+from search.response_cache import ResponseCache, conversation_key
+
+
+def test_summarize_message_keeps_the_first_sentence():
+    assert summarize_message({"role": "user", "content": "Who conducted?  In 1842, please."}) == "user: Who conducted?"
+    summary = summarize_message({"role": "assistant", "content": "x" * 300}, max_chars=20)
+    assert summary == "assistant: " + "x" * 17 + "..."
+
+
+def test_old_turns_move_into_the_summary():
+    memory = ConversationMemory(window_tokens=10, summary_tokens=100)
+    memory.append("user", "First question about Beethoven.")
+    memory.append("assistant", "First answer.")
+    memory.append("user", "Second question.")
+    history = memory.history()
+    assert history[0]["role"] == "system"
+    assert "user: First question about Beethoven." in history[0]["content"]
+    assert [m["content"] for m in history[1:]] == ["First answer.", "Second question."]
+    assert len(memory) == 3
+
+
+def test_newest_message_stays_in_the_window_even_over_budget():
+    memory = ConversationMemory(window_tokens=2)
+    memory.append("user", "A question far longer than the window budget.")
+    assert memory.history() == [{"role": "user", "content": "A question far longer than the window budget."}]
+
+
+def test_summary_is_capped():
+    memory = ConversationMemory(window_tokens=1, summary_tokens=10)
+    for n in range(20):
+        memory.append("user", f"Question number {n}.")
+    assert memory.summary_size <= 10
+    assert memory.summary_lines[-1] == "user: Question number 18."
+
+
+def test_display_is_bounded_and_paginated():
+    memory = ConversationMemory(max_display=45)
+    for n in range(50):
+        memory.append("user", str(n))
+    assert len(memory) == 50
+    assert memory.page_count() == 3
+    assert [m["content"] for m in memory.page(0)] == [str(n) for n in range(30, 50)]
+    assert [m["content"] for m in memory.page(2)] == [str(n) for n in range(5, 10)]
+    assert memory.page(3) == []
+
+
+def test_cached_answers_are_keyed_by_conversation():
+    cache = ResponseCache()
+    history = [{"role": "user", "content": "Who conducted?"}, {"role": "assistant", "content": "Hill."}]
+    assert conversation_key([]) is None
+    cache.put("and the venue", ("1",), "follow-up answer", conversation=conversation_key(history))
+    assert cache.lookup("and the venue", ("1",)) is None
+    assert cache.lookup("and the venue", ("1",), conversation=conversation_key(history[:1])) is None
+    assert cache.lookup("and the venue", ("1",), conversation=conversation_key(history)) == "follow-up answer"
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from search.corpus import iter_documents, iter_records
+
+DOCUMENTS = [
+    {"programID": "1", "works": [{"workTitle": "A \"quoted\" {title}"}]},
+    {"programID": "2", "works": []},
+    {"programID": "3", "season": "1842-43"},
+]
+
+
+def write(tmp_path, text):
+    path = tmp_path / "corpus.json"
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_concatenated_pretty_printed_documents(tmp_path, use_mmap):
+    path = write(tmp_path, "\n".join(json.dumps(d, indent=4) for d in DOCUMENTS))
+    assert list(iter_documents(path, use_mmap=use_mmap)) == DOCUMENTS
+
+
+def test_json_lines(tmp_path):
+    path = write(tmp_path, "\n".join(json.dumps(d) for d in DOCUMENTS) + "\n")
+    assert list(iter_documents(path)) == DOCUMENTS
+
+
+def test_top_level_array(tmp_path):
+    path = write(tmp_path, json.dumps(DOCUMENTS, indent=2))
+    assert list(iter_documents(path, chunk_size=7)) == DOCUMENTS
+
+
+def test_document_root(tmp_path):
+    path = write(tmp_path, json.dumps({"meta": {"programs": "skip"}, "programs": DOCUMENTS}))
+    assert list(iter_documents(path, document_root="/programs")) == DOCUMENTS
+
+
+def test_concatenated_documents_without_document_root(tmp_path):
+    path = write(tmp_path, "".join(json.dumps(d) for d in DOCUMENTS))
+    assert list(iter_documents(path, document_root="/programs")) == DOCUMENTS
+
+
+def test_resume_from_record_end(tmp_path):
+    path = write(tmp_path, json.dumps({"programs": DOCUMENTS}))
+    records = list(iter_records(path, document_root="/programs"))
+    resumed = iter_records(path, document_root="/programs", start_offset=records[0].end)
+    assert [r.document for r in resumed] == DOCUMENTS[1:]
+
+
+def test_unterminated_array(tmp_path):
+    path = write(tmp_path, json.dumps(DOCUMENTS)[:-1])
+    with pytest.raises(ValueError):
+        list(iter_documents(path))
@@ -0,0 +1,82 @@
+import io
+import json
+from types import SimpleNamespace
+
+from search.blob_wrapper import BlobWrapper
+from search.doc_store import DocumentStore, DocumentStoreWriter
+
+WORK = {"ID": "52446", "composerName": "Beethoven,  Ludwig  van", "workTitle": "SYMPHONY NO. 5", "conductorName": "Hill, Ureli Corelli", "soloists": []}
+CONCERT = {"eventType": "Subscription Season", "Location": "Manhattan, NY", "Venue": "Apollo Rooms", "Date": "1842-12-07T05:00:00Z", "Time": "8:00PM"}
+
+DOCUMENTS = [
+    {"programID": "1", "season": "1842-43", "works": [WORK]},
+    {"programID": "2", "orchestra": "New York Philharmonic", "concerts": [CONCERT], "extra": {"note": "kept"}},
+]
+
+
+def test_round_trip(tmp_path):
+    store = DocumentStore.build(str(tmp_path / "documents.arrow"), DOCUMENTS, batch_size=1)
+    assert len(store) == 2
+    assert "1" in store and "3" not in store
+    assert store.get_many(["2", "3", "1"]) == [DOCUMENTS[1], None, DOCUMENTS[0]]
+
+
+def test_missing_sub_fields_are_returned_as_null(tmp_path):
+    # Like the fields of complex collections returned by azure
+    store = DocumentStore.build(str(tmp_path / "documents.arrow"), [{"programID": "1", "works": [{"workTitle": "OBERON"}]}])
+    assert store.get_many(["1"])[0]["works"] == [{**{name: None for name in WORK}, "workTitle": "OBERON"}]
+
+
+def test_select_returns_only_the_requested_fields(tmp_path):
+    store = DocumentStore.build(str(tmp_path / "documents.arrow"), DOCUMENTS)
+    assert store.get_many(["1", "2"], select=["programID", "extra"]) == [
+        {"programID": "1"},
+        {"programID": "2", "extra": {"note": "kept"}},
+    ]
+
+
+def test_documents_that_do_not_fit_the_schema_are_skipped(tmp_path):
+    path = str(tmp_path / "documents.arrow")
+    with DocumentStoreWriter(path) as writer:
+        for document in [DOCUMENTS[0], {"programID": "bad", "works": "not a list"}, DOCUMENTS[1]]:
+            writer.write(document)
+    assert (writer.count, writer.skipped) == (2, 1)
+    assert DocumentStore(path).get_many(["1", "bad", "2"]) == [DOCUMENTS[0], None, DOCUMENTS[1]]
+
+
+def test_failed_write_keeps_the_previous_store(tmp_path):
+    path = str(tmp_path / "documents.arrow")
+    DocumentStore.build(path, DOCUMENTS[:1])
+    try:
+        with DocumentStoreWriter(path) as writer:
+            writer.write(DOCUMENTS[1])
+            raise RuntimeError("ingestion failed")
+    except RuntimeError:
+        pass
+    assert DocumentStore(path).get_many(["1", "2"]) == [DOCUMENTS[0], None]
+    assert not (tmp_path / "documents.arrow.tmp").exists()
+
+
+class BlobContainer:
+    """
+    Serves blobs like a ContainerClient.
+    """
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+    def list_blobs(self):
+        return [SimpleNamespace(name=name) for name in self.blobs]
+
+    def download_blob(self, name):
+        return SimpleNamespace(readinto=lambda stream: stream.write(self.blobs[name]))
+
+
+def test_store_is_built_from_the_indexed_blobs(local_search):
+    container = BlobContainer({
+        "programs.json": json.dumps({"programs": DOCUMENTS}).encode("utf-8"),
+        "notes.txt": b"not a corpus file",
+    })
+    search = local_search()
+    search.build_document_store(documents=BlobWrapper(container_client=container).iter_documents(document_root=search.document_root))
+    store = DocumentStore(search.document_store_path)
+    assert store.get_many(["1", "2"]) == DOCUMENTS
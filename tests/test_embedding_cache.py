@@ -0,0 +1,97 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from search.embedding_cache import CachedEmbedder, EmbeddingCache, content_hash
+
+DIMENSIONS = 8
+
+
+def vector_for(text):
+    return np.random.default_rng(int(content_hash(text)[:8], 16)).standard_normal(DIMENSIONS).astype(np.float32)
+
+
+class CountingEmbedder:
+    model = "test-model"
+    dimensions = DIMENSIONS
+
+    def __init__(self):
+        self.embedded = []
+
+    def __call__(self, texts, priority=None):
+        self.embedded.extend(texts)
+        return np.array([vector_for(text) for text in texts])
+
+
+def put_texts(directory, texts):
+    cache = EmbeddingCache(directory, "test-model", DIMENSIONS)
+    for start in range(0, len(texts), 5):
+        batch = texts[start:start + 5]
+        cache.put_many([content_hash(t) for t in batch], [vector_for(t) for t in batch])
+
+
+def test_round_trip_and_reload(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "test-model", DIMENSIONS)
+    hashes = [content_hash(t) for t in ("a", "b")]
+    cache.put_many(hashes + hashes[:1], [vector_for("a"), vector_for("b"), vector_for("a")])
+    assert len(cache) == 2
+    reloaded = EmbeddingCache(str(tmp_path), "test-model", DIMENSIONS)
+    found = reloaded.get_many(hashes + [content_hash("c")])
+    assert set(found) == set(hashes)
+    np.testing.assert_array_equal(found[hashes[1]], vector_for("b"))
+
+
+def test_interrupted_write_is_truncated(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "test-model", DIMENSIONS)
+    cache.put_many([content_hash("a")], [vector_for("a")])
+    # A vector appended without its hash line, as after a crash between the two writes
+    with open(cache._vectors_path, "ab") as f:
+        f.write(vector_for("b").tobytes()[:10])
+    reloaded = EmbeddingCache(str(tmp_path), "test-model", DIMENSIONS)
+    assert len(reloaded) == 1
+    reloaded.put_many([content_hash("c")], [vector_for("c")])
+    np.testing.assert_array_equal(reloaded.get_many([content_hash("c")])[content_hash("c")], vector_for("c"))
+
+
+def test_caches_sharing_a_directory_do_not_overwrite_rows(tmp_path):
+    first = EmbeddingCache(str(tmp_path), "test-model", DIMENSIONS)
+    second = EmbeddingCache(str(tmp_path), "test-model", DIMENSIONS)
+    first.put_many([content_hash("a")], [vector_for("a")])
+    second.put_many([content_hash("b"), content_hash("a")], [vector_for("b"), vector_for("a")])
+    first.put_many([content_hash("c")], [vector_for("c")])
+    reloaded = EmbeddingCache(str(tmp_path), "test-model", DIMENSIONS)
+    assert len(reloaded) == 3
+    found = reloaded.get_many([content_hash(t) for t in "abc"])
+    for text in "abc":
+        np.testing.assert_array_equal(found[content_hash(text)], vector_for(text))
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_processes_keep_rows_aligned(tmp_path):
+    context = multiprocessing.get_context("fork")
+    texts = [[f"{worker}-{n}" for n in range(40)] for worker in range(4)]
+    processes = [context.Process(target=put_texts, args=(str(tmp_path), worker_texts)) for worker_texts in texts]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    cache = EmbeddingCache(str(tmp_path), "test-model", DIMENSIONS)
+    all_texts = [text for worker_texts in texts for text in worker_texts]
+    found = cache.get_many([content_hash(t) for t in all_texts])
+    assert len(cache) == len(found) == len(all_texts)
+    for text in all_texts:
+        np.testing.assert_array_equal(found[content_hash(text)], vector_for(text))
+
+
+def test_cached_embedder_embeds_only_missing_texts(tmp_path):
+    embedder = CountingEmbedder()
+    cached = CachedEmbedder(embedder, str(tmp_path), batch_size=2)
+    first = cached(["a", "b", "a"])
+    second = cached(["b", "c"])
+    assert embedder.embedded == ["a", "b", "c"]
+    assert (cached.hits, cached.misses) == (2, 3)
+    np.testing.assert_array_equal(first[2], vector_for("a"))
+    np.testing.assert_array_equal(second[0], vector_for("b"))
+    assert CachedEmbedder(CountingEmbedder(), str(tmp_path)).cache.get_many([content_hash("c")])
@@ -0,0 +1,101 @@
+import threading
+
+from search.filters import FacetVocabulary, QueryAnalyzer, local_facets
+
+VOCABULARY = {
+    "works.composerName": ["Beethoven,  Ludwig  van", "Strauss, Johann", "Strauss, Richard"],
+    "works.conductorName": ["Bernstein, Leonard"],
+    "concerts.Venue": ["Carnegie Hall"],
+    "season": ["1842-43"],
+}
+
+
+def test_full_names_are_filtered():
+    analyzer = QueryAnalyzer(VOCABULARY)
+    assert analyzer.filter_for("Ludwig van Beethoven at Carnegie Hall") == (
+        "works/any(w: w/composerName eq 'Beethoven,  Ludwig  van') and concerts/any(c: c/Venue eq 'Carnegie Hall')"
+    )
+    assert analyzer.filter_for("strauss, richard in 1842-43") == (
+        "works/any(w: w/composerName eq 'Strauss, Richard') and season eq '1842-43'"
+    )
+
+
+def test_surnames_alone_are_not_filtered():
+    analyzer = QueryAnalyzer(VOCABULARY)
+    assert analyzer.filter_for("Strauss waltzes") is None
+    assert analyzer.filter_for("Beethoven conducted by Bernstein") is None
+    assert analyzer.filter_for("what did Leonard Bernstein conduct") == "works/any(w: w/conductorName eq 'Bernstein, Leonard')"
+
+
+def test_a_name_in_several_fields_requires_any_of_them():
+    analyzer = QueryAnalyzer({"works.composerName": ["Bernstein, Leonard"], "works.conductorName": ["Bernstein, Leonard"]})
+    assert analyzer.filter_for("Leonard Bernstein") == (
+        "(works/any(w: w/composerName eq 'Bernstein, Leonard') or works/any(w: w/conductorName eq 'Bernstein, Leonard'))"
+    )
+
+
+def test_local_facets_collects_distinct_values(local_search):
+    facets = local_facets(local_search().search_client)
+    assert facets["works.composerName"] == ["Beethoven,  Ludwig  van", "Weber,  Carl  Maria Von"]
+    assert facets["concerts.Venue"] == ["Apollo Rooms", "Broadway Tabernacle", "Carnegie Hall"]
+
+
+def test_vocabulary_is_cached_on_disk_and_refreshed_after_ttl(tmp_path, monkeypatch):
+    path = str(tmp_path / "facets.json")
+    fetches = []
+    vocabulary = FacetVocabulary(path, lambda: fetches.append(1) or {"season": [str(len(fetches))]}, ttl=60)
+    assert vocabulary.get() == {"season": ["1"]}
+    assert FacetVocabulary(path, lambda: {"season": ["never"]}, ttl=60).get() == {"season": ["1"]}
+    vocabulary.invalidate()
+    assert vocabulary.get() == {"season": ["2"]}
+    assert len(fetches) == 2
+
+
+def test_failed_refresh_keeps_the_previous_vocabulary(tmp_path):
+    def fail():
+        raise OSError("search service unavailable")
+    vocabulary = FacetVocabulary(str(tmp_path / "facets.json"), lambda: {"season": ["1842-43"]})
+    vocabulary.get()
+    vocabulary.fetch = fail
+    vocabulary.invalidate()
+    assert vocabulary.get() == {"season": ["1842-43"]}
+    assert FacetVocabulary(str(tmp_path / "missing" / "facets.json"), fail).get() == {}
+
+
+def test_stale_vocabulary_is_served_during_a_refresh(tmp_path):
+    started, release = threading.Event(), threading.Event()
+    versions = iter(["old", "new"])
+
+    def fetch():
+        version = next(versions)
+        if version == "new":
+            started.set()
+            release.wait(5)
+        return {"season": [version]}
+
+    vocabulary = FacetVocabulary(str(tmp_path / "facets.json"), fetch)
+    vocabulary.get()
+    vocabulary.invalidate()
+    refresher = threading.Thread(target=vocabulary.get)
+    refresher.start()
+    assert started.wait(5)
+    # Not blocked by the refresh in progress, and no second fetch
+    assert vocabulary.get() == {"season": ["old"]}
+    release.set()
+    refresher.join()
+    assert vocabulary.get() == {"season": ["new"]}
+
+
+def test_invalidation_during_a_refresh_is_not_lost(tmp_path):
+    vocabulary = FacetVocabulary(str(tmp_path / "facets.json"), None)
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        if len(fetches) == 1:
+            vocabulary.invalidate()
+        return {"season": [str(len(fetches))]}
+
+    vocabulary.fetch = fetch
+    assert vocabulary.get() == {"season": ["1"]}
+    assert vocabulary.get() == {"season": ["2"]}
@@ -0,0 +1,15 @@
+from search.fusion import reciprocal_rank_fusion
+
+
+def test_keys_ranked_high_in_several_lists_come_first():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "a", "d"], ["b"]])
+    assert [key for key, _ in fused] == ["b", "a", "c", "d"]
+
+
+def test_scores_sum_reciprocal_ranks():
+    fused = dict(reciprocal_rank_fusion([["a", "b"], ["b"]], k=1))
+    assert fused == {"a": 1 / 2, "b": 1 / 3 + 1 / 2}
+
+
+def test_empty_rankings():
+    assert reciprocal_rank_fusion([[], []]) == []
@@ -0,0 +1,106 @@
+import pytest
+
+from search import ingestion
+from search.bm25_index import BM25Index, IndexingResult
+from search.ingestion import iter_batches, push_documents
+from search.scheduler import Scheduler
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(ingestion, "_backoff", lambda attempt: None)
+
+
+class RequestError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FlakyClient:
+    """
+    A SearchClient stand-in that fails documents or requests according to `plan`,
+    a function of (documents, call number) returning an exception or per-key statuses.
+    """
+    def __init__(self, plan):
+        self.plan = plan
+        self.calls = []
+        self.indexed = {}
+
+    def upload_documents(self, documents):
+        self.calls.append([d["programID"] for d in documents])
+        outcome = self.plan(documents, len(self.calls))
+        if isinstance(outcome, Exception):
+            raise outcome
+        results = []
+        for document in documents:
+            status = (outcome or {}).get(document["programID"], 201)
+            if status == 201:
+                self.indexed[document["programID"]] = document
+            results.append(IndexingResult(document["programID"], status == 201, status, None if status == 201 else "rejected"))
+        return results
+
+
+def programs(count):
+    return [{"programID": str(n), "season": "1842-43"} for n in range(count)]
+
+
+def test_batches_are_bounded_by_count_and_size():
+    assert [len(b) for b in iter_batches(programs(5), max_documents=2)] == [2, 2, 1]
+    assert [len(b) for b in iter_batches(programs(3), max_bytes=60)] == [1, 1, 1]
+
+
+def test_valid_documents_are_indexed_and_invalid_ones_reported():
+    index = BM25Index()
+    documents = programs(3) + [{"programID": "bad", "season": 1842}, {"season": "no key"}]
+    report = push_documents(index, documents, max_documents=2)
+    assert (report.indexed, report.batches) == (3, 2)
+    assert set(report.invalid) == {"bad", "#4"}
+    assert len(index) == 3 and not report.ok
+
+
+def test_merge_uses_merge_or_upload():
+    index = BM25Index()
+    push_documents(index, [{"programID": "1", "season": "1842-43"}])
+    push_documents(index, [{"programID": "1", "orchestra": "New York Philharmonic"}], merge=True)
+    assert index.get_document("1") == {"programID": "1", "season": "1842-43", "orchestra": "New York Philharmonic"}
+
+
+def test_conflicting_documents_are_retried():
+    client = FlakyClient(lambda documents, call: {"1": 409, "2": 422} if call == 1 else None)
+    report = push_documents(client, programs(3))
+    assert client.calls == [["0", "1", "2"], ["1", "2"]]
+    assert (report.indexed, report.retries, report.failed) == (3, 1, {})
+
+
+def test_documents_failing_every_attempt_are_reported():
+    client = FlakyClient(lambda documents, call: {"1": 422, "2": 400})
+    report = push_documents(client, programs(3), max_retries=2)
+    assert report.indexed == 1
+    assert report.failed == {"1": "rejected", "2": "rejected"}
+    assert len(client.calls) == 3
+
+
+def test_requests_that_are_too_large_are_split():
+    client = FlakyClient(lambda documents, call: RequestError(413) if len(documents) > 2 else None)
+    report = push_documents(client, programs(5))
+    assert report.indexed == 5
+    assert client.calls[0] == ["0", "1", "2", "3", "4"]
+    assert [len(call) for call in client.calls[1:]] == [2, 3, 1, 2]
+
+
+def test_rejected_requests_fail_their_documents():
+    client = FlakyClient(lambda documents, call: RequestError(400))
+    report = push_documents(client, programs(2))
+    assert report.indexed == 0 and set(report.failed) == {"0", "1"}
+
+
+def test_throttled_requests_are_left_to_the_scheduler():
+    client = FlakyClient(lambda documents, call: RequestError(429) if call == 1 else None)
+    report = push_documents(client, programs(2))
+    assert len(client.calls) == 1 and set(report.failed) == {"0", "1"}
+
+    client = FlakyClient(lambda documents, call: RequestError(429) if call == 1 else None)
+    report = push_documents(client, programs(2), scheduler=Scheduler("search", base_delay=0.001))
+    assert len(client.calls) == 2
+    assert (report.indexed, report.retries, report.failed) == (2, 0, {})
@@ -0,0 +1,42 @@
+import pytest
+
+from search.odata import compile_filter, quote
+
+DOCUMENT = {
+    "programID": "1",
+    "season": "1842-43",
+    "orchestra": "New York Philharmonic",
+    "works": [
+        {"composerName": "Beethoven,  Ludwig  van", "conductorName": "Hill, Ureli Corelli"},
+        {"composerName": "Weber,  Carl  Maria Von", "conductorName": "Timm, Henry C."},
+    ],
+    "concerts": [{"Venue": "Apollo Rooms", "Location": "Manhattan, NY"}],
+}
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("season eq '1842-43'", True),
+    ("season ne '1842-43'", False),
+    ("missing eq null", True),
+    ("works/any(w: w/composerName eq 'Weber,  Carl  Maria Von')", True),
+    ("works/all(w: w/composerName eq 'Weber,  Carl  Maria Von')", False),
+    ("works/any(w: w/composerName eq 'Beethoven,  Ludwig  van') and concerts/any(c: c/Venue eq 'Apollo Rooms')", True),
+    ("season eq '1900-01' or orchestra eq 'New York Philharmonic'", True),
+    ("not (season eq '1842-43')", False),
+    ("search.in(season, '1842-43|1843-44', '|')", True),
+    ("search.in(season, '1843-44, 1844-45')", False),
+    ("empty/any(e: e/x eq 1)", False),
+])
+def test_compile_filter(expression, expected):
+    assert compile_filter(expression)(DOCUMENT) is expected
+
+
+def test_quote_escapes_single_quotes():
+    expression = "orchestra eq " + quote("O'Neil Band")
+    assert compile_filter(expression)({"orchestra": "O'Neil Band"})
+
+
+@pytest.mark.parametrize("expression", ["season gt '1842'", "season eq", "season eq 'x' ~"])
+def test_unsupported_syntax_raises(expression):
+    with pytest.raises(ValueError):
+        compile_filter(expression)
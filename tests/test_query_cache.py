@@ -0,0 +1,38 @@
+import time
+
+from search.query_cache import QueryCache, normalize_query
+
+
+def test_normalized_queries_share_an_entry():
+    cache = QueryCache()
+    cache.put(QueryCache.make_key("  Beethoven   Symphonies ", top=5), ["1"])
+    assert normalize_query("  Beethoven   Symphonies ") == "beethoven symphonies"
+    assert cache.get(QueryCache.make_key("beethoven symphonies", top=5)) == ["1"]
+    assert cache.get(QueryCache.make_key("beethoven symphonies", top=10)) is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_entries_expire_and_are_evicted():
+    cache = QueryCache(maxsize=2, ttl=0.05)
+    for query in ("a", "b", "c"):
+        cache.put(QueryCache.make_key(query), query)
+    assert cache.get(QueryCache.make_key("a")) is None
+    assert cache.get(QueryCache.make_key("c")) == "c"
+    time.sleep(0.1)
+    assert cache.get(QueryCache.make_key("c")) is None
+
+
+def test_clear():
+    cache = QueryCache()
+    cache.put(QueryCache.make_key("a"), "a")
+    cache.clear()
+    assert cache.get(QueryCache.make_key("a")) is None
+
+
+def test_search_wrapper_answers_repeated_queries_from_the_cache(local_search):
+    search = local_search()
+    first = search.search("Oberon", top=2)
+    assert search.search("  oberon ", top=2) == first
+    assert search.cache.stats()["hits"] == 1
+    search.search("Oberon", top=3)
+    assert search.cache.stats()["misses"] == 2
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from search.rerank import Reranker, parse_weights
+
+
+def program(program_id, score, composer="", title="", venue=""):
+    return {
+        "programID": program_id,
+        "@search.score": score,
+        "works": [{"composerName": composer, "workTitle": title}],
+        "concerts": [{"Venue": venue}],
+    }
+
+
+def test_parse_weights():
+    assert parse_weights("works.composerName:3, concerts.Venue:0.5,works.workTitle") == {
+        "works.composerName": 3.0,
+        "concerts.Venue": 0.5,
+        "works.workTitle": 1.0,
+    }
+    assert parse_weights("") == parse_weights(None) == {}
+
+
+def test_field_matches_outrank_retrieval_score():
+    documents = [
+        program("1", 9.0, composer="Mozart,  Wolfgang  Amadeus", venue="Beethoven Hall"),
+        program("2", 8.0, composer="Beethoven,  Ludwig  van", title="EGMONT OVERTURE"),
+        program("3", 7.0, composer="Weber,  Carl  Maria Von"),
+    ]
+    reranked = Reranker().rerank("Beethoven Egmont", documents, k=2)
+    assert [d["programID"] for d in reranked] == ["2", "1"]
+    assert reranked[0]["@search.reranker_score"] > reranked[1]["@search.reranker_score"]
+    assert "@search.reranker_score" not in documents[0]
+
+
+def test_field_weights_decide_between_fields():
+    documents = [program("1", 1.0, venue="Beethoven Hall"), program("2", 1.0, composer="Beethoven,  Ludwig  van")]
+    assert [d["programID"] for d in Reranker().rerank("Beethoven", documents, k=2)] == ["2", "1"]
+    by_venue = Reranker(fields={"works.composerName": 1.0, "concerts.Venue": 5.0})
+    assert [d["programID"] for d in by_venue.rerank("Beethoven", documents, k=2)] == ["1", "2"]
+    assert by_venue.top_level_fields == {"works", "concerts"}
+
+
+def test_ties_keep_the_retrieval_order():
+    documents = [program(str(n), 1.0, composer="Beethoven,  Ludwig  van") for n in range(4)]
+    assert [d["programID"] for d in Reranker().rerank("Beethoven", documents, k=4)] == ["0", "1", "2", "3"]
+
+
+def test_embedding_weight_adds_cosine_similarity():
+    vectors = {"query": [1.0, 0.0], "EGMONT OVERTURE": [1.0, 0.0], "SYMPHONY NO. 5": [0.0, 1.0]}
+
+    def embedder(texts):
+        return np.array([vectors["query"] if text == "query" else vectors[text.strip()] for text in texts])
+
+    documents = [program("1", 1.0, title="SYMPHONY NO. 5"), program("2", 1.0, title="EGMONT OVERTURE")]
+    reranker = Reranker(fields={"works.workTitle": 1.0}, embedding_weight=1.0, query_embedder=embedder)
+    reranked = reranker.rerank("query", documents, k=2)
+    assert [d["programID"] for d in reranked] == ["2", "1"]
+    assert reranked[0]["@search.reranker_score"] - reranked[1]["@search.reranker_score"] == pytest.approx(1.0)
+    assert [d["programID"] for d in Reranker(fields={"works.workTitle": 1.0}).rerank("query", documents, k=2)] == ["1", "2"]
@@ -0,0 +1,69 @@
+from search.embeddings import AzureOpenAIEmbedder, HashingEmbedder
+from search.response_cache import ResponseCache, question_key, replay, source_ids, sources_fingerprint
+
+SOURCES = [{"programID": "1", "season": "1842-43", "@search.score": 2.0}, {"season": "1843-44"}]
+
+
+def test_source_ids_use_key_or_content_hash():
+    ids = source_ids(SOURCES)
+    assert ids[0] == "1"
+    assert len(ids[1]) == 40
+    # Search scores do not change the identity of a source
+    assert source_ids([{"season": "1843-44", "@search.score": 1.0}]) == ids[1:]
+
+
+def test_fingerprint_changes_with_content():
+    edited = [{**SOURCES[0], "season": "1900-01"}, SOURCES[1]]
+    assert sources_fingerprint(SOURCES) != sources_fingerprint(edited)
+    assert source_ids(SOURCES) == source_ids(edited)
+
+
+def test_lookup_returns_answer_of_similar_question_on_same_sources():
+    cache = ResponseCache(threshold=0.9)
+    sources = sources_fingerprint(SOURCES)
+    cache.put([1.0, 0.0], sources, "answer")
+    assert cache.lookup([0.99, 0.1], sources) == "answer"
+    assert cache.lookup([0.0, 1.0], sources) is None
+    assert cache.lookup([1.0, 0.0], sources_fingerprint(SOURCES[:1])) is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
+
+
+def test_lru_eviction_and_version_change():
+    cache = ResponseCache(maxsize=2)
+    for answer in ("a", "b"):
+        cache.put([1.0, 0.0], (answer,), answer)
+    assert cache.lookup([1.0, 0.0], ("a",)) == "a"
+    cache.put([1.0, 0.0], ("c",), "c")
+    assert cache.lookup([1.0, 0.0], ("b",)) is None
+    assert cache.lookup([1.0, 0.0], ("a",)) == "a"
+    cache.check_version(1)
+    assert len(cache) == 0
+
+
+def test_replay_yields_the_answer_in_pieces():
+    assert "".join(replay("Two  words\n")) == "Two  words\n"
+    assert len(list(replay("Two words"))) == 2
+
+
+def test_bag_of_words_embedders_only_match_the_same_question():
+    cache = ResponseCache(threshold=0.5)
+    embedder = HashingEmbedder()
+    cache.put(question_key("Did Brahms influence Dvorak?", embedder), ("1",), "yes")
+    assert cache.lookup(question_key("did brahms  influence dvorak?", embedder), ("1",)) == "yes"
+    assert cache.lookup(question_key("Did Dvorak influence Brahms?", embedder), ("1",)) is None
+
+
+def test_semantic_embedders_match_similar_questions():
+    class Embedder(AzureOpenAIEmbedder):
+        def __init__(self):
+            pass
+
+        def __call__(self, texts, priority=None):
+            return [[1.0, 0.1] if "brahms" in text.lower() else [0.0, 1.0] for text in texts]
+
+    cache = ResponseCache()
+    cache.put(question_key("Did Brahms influence Dvorak?", Embedder()), ("1",), "yes")
+    assert cache.lookup(question_key("Was Brahms an influence on Dvorak?", Embedder()), ("1",)) == "yes"
+    assert cache.lookup(question_key("Who conducted?", Embedder()), ("1",)) is None
+    # Text keys never match embedding entries
+    assert cache.lookup("did brahms influence dvorak?", ("1",)) is None
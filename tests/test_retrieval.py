@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from search.retrieval import TARGET_FIELDS, query_variants, retrieve, rewrite_query
+
+
+class FakeSearchService:
+    def __init__(self, results, covered=True):
+        self.results = results
+        self.covered = covered
+        self.calls = []
+
+    def covers_fields(self, search_fields):
+        return self.covered
+
+    async def asearch(self, query, **kwargs):
+        self.calls.append((query, kwargs.get("search_fields")))
+        return self.results[(query, tuple(kwargs.get("search_fields") or ()))]
+
+
+class AsyncResults:
+    def __init__(self, results):
+        self.results = iter(results)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeAsyncSearchClient:
+    def __init__(self, results):
+        self.results = results
+        self.requests = []
+
+    async def search(self, **request):
+        self.requests.append(request)
+        return AsyncResults(self.results)
+
+
+class UnusedSearchClient:
+    def search(self, **request):
+        raise AssertionError("the sync client must not be used by asearch")
+
+
+def test_rewrite_query_keeps_keywords():
+    assert rewrite_query("Who conducted Tosca in 1950?") == "conducted tosca 1950"
+
+
+def test_query_variants():
+    assert query_variants("Who conducted Tosca?") == [
+        {"query": "Who conducted Tosca?"},
+        {"query": "conducted tosca"},
+        {"query": "conducted tosca", "search_fields": TARGET_FIELDS},
+    ]
+    assert query_variants("tosca") == [{"query": "tosca"}, {"query": "tosca", "search_fields": TARGET_FIELDS}]
+
+
+def test_retrieve_fuses_variants():
+    service = FakeSearchService({
+        ("Who wrote Oberon?", ()): [{"programID": "1"}, {"programID": "2"}],
+        ("wrote oberon", ()): [{"programID": "2"}, {"programID": "3"}],
+        ("wrote oberon", tuple(TARGET_FIELDS)): [{"programID": "2"}],
+    })
+    results = asyncio.run(retrieve(service, "Who wrote Oberon?", top=2))
+    assert [result["programID"] for result in results] == ["2", "1"]
+    assert len(service.calls) == 3
+
+
+def test_retrieve_skips_fields_the_backend_does_not_index():
+    service = FakeSearchService({
+        ("Who wrote Oberon?", ()): [{"programID": "1"}],
+        ("wrote oberon", ()): [{"programID": "1"}],
+    }, covered=False)
+    asyncio.run(retrieve(service, "Who wrote Oberon?"))
+    assert all(search_fields is None for _, search_fields in service.calls)
+
+
+def test_local_search_fields_restrict_matches(local_search):
+    search = local_search()
+    search.reranker = None
+    search.filter_pushdown = False
+    assert [r["programID"] for r in search.search("egmont", top=5, search_fields=["works/workTitle"])] == ["3"]
+    assert search.search("beethoven", top=5, search_fields=["works/workTitle"]) == []
+    assert {r["programID"] for r in search.search("beethoven", top=5, search_fields=TARGET_FIELDS)} == {"1", "3"}
+    assert search.covers_fields(TARGET_FIELDS)
+
+
+def test_local_search_rejects_fields_it_does_not_index(local_search, monkeypatch):
+    monkeypatch.setenv("LOCAL_SEARCH_FIELDS", "orchestra")
+    search = local_search()
+    assert not search.covers_fields(TARGET_FIELDS)
+    with pytest.raises(ValueError, match="works/composerName"):
+        search.search("beethoven", search_fields=TARGET_FIELDS)
+
+
+def test_asearch_uses_the_async_client(tmp_path, monkeypatch):
+    from search.search_wrapper import SearchWrapper
+
+    monkeypatch.setenv("LOCAL_DATA_DIRECTORY", str(tmp_path))
+    for name, value in {"SEARCH_RERANK": "false", "SEARCH_FILTER_PUSHDOWN": "false", "SEARCH_HYDRATE": "false"}.items():
+        monkeypatch.setenv(name, value)
+    client = FakeAsyncSearchClient([{"programID": "2", "@search.score": 1.5}])
+    search = SearchWrapper(search_client=UnusedSearchClient(), async_search_client=lambda: client)
+
+    async def run():
+        return await asyncio.gather(search.asearch("oberon", top=3), search.asearch("oberon", top=3))
+
+    first, second = asyncio.run(run())
+    assert first == second == [{"programID": "2", "@search.score": 1.5}]
+    assert len(client.requests) == 1
+    assert client.requests[0]["search_text"] == "oberon"
+    assert client.requests[0]["top"] == 3
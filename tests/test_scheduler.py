@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+import threading
+import time
+
+import pytest
+
+from search.scheduler import BULK, INTERACTIVE, Scheduler, TokenBucket, get_scheduler, retry_after
+
+
+class Throttled(Exception):
+    def __init__(self, headers=None):
+        super().__init__("429 Too Many Requests")
+        self.response = SimpleNamespace(status_code=429, headers=headers or {})
+
+
+def test_concurrent_calls_with_the_same_key_are_coalesced():
+    scheduler = Scheduler("test")
+    release = threading.Event()
+    calls = []
+
+    def search(query):
+        calls.append(query)
+        release.wait(5)
+        return [query]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(scheduler.call(search, "q", key="q"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == ["q"]
+    assert results == [["q"]] * 4
+    # Once the call finished, the same key calls upstream again
+    scheduler.call(search, "q", key="q")
+    assert calls == ["q", "q"]
+
+
+def test_concurrent_async_calls_with_the_same_key_are_coalesced():
+    scheduler = Scheduler("test")
+    calls = []
+
+    async def embed(text):
+        calls.append(text)
+        await asyncio.sleep(0.05)
+        return len(text)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.acall(embed, "text", key="text") for _ in range(3)))
+
+    assert asyncio.run(main()) == [4, 4, 4]
+    assert calls == ["text"]
+
+
+def test_waiting_interactive_calls_go_before_bulk_calls():
+    scheduler = Scheduler("test")
+    # One call per 50 ms, no burst
+    scheduler.requests = TokenBucket(1200, capacity=1)
+    scheduler.acquire()
+    order = []
+
+    def call(name, priority):
+        scheduler.call(order.append, name, priority=priority)
+
+    threads = [threading.Thread(target=call, args=("bulk", BULK))]
+    threads[0].start()
+    time.sleep(0.01)
+    threads.append(threading.Thread(target=call, args=("interactive", INTERACTIVE)))
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "bulk"]
+
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(60, capacity=2)
+    now = bucket.updated
+    assert bucket.wait_time(2, now) == 0
+    bucket.take(2)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert TokenBucket(0).wait_time(10 ** 6, now) == 0
+
+
+def test_throttled_calls_are_retried_after_the_requested_delay():
+    scheduler = Scheduler("test", max_retries=2)
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) < 2:
+            raise Throttled({"retry-after-ms": "50"})
+        return "ok"
+
+    assert scheduler.call(flaky) == "ok"
+    assert attempts[1] - attempts[0] >= 0.05
+
+
+def test_retries_give_up_after_max_retries_and_other_errors_are_raised():
+    scheduler = Scheduler("test", max_retries=1, base_delay=0.001)
+    attempts = []
+
+    def throttled():
+        attempts.append(1)
+        raise Throttled()
+
+    with pytest.raises(Throttled):
+        scheduler.call(throttled)
+    assert len(attempts) == 2
+    with pytest.raises(ZeroDivisionError):
+        scheduler.call(lambda: 1 / 0)
+
+
+def test_retry_after_headers():
+    assert retry_after(Throttled({"retry-after": "3"})) == 3.0
+    assert retry_after(Throttled({"x-ms-retry-after-ms": "250"})) == 0.25
+    assert retry_after(Throttled()) is None
+
+
+def test_get_scheduler_splits_limits_between_processes(monkeypatch):
+    monkeypatch.setenv("UPSTREAM_OPENAI_RPM", "600")
+    monkeypatch.setenv("UPSTREAM_PROCESSES", "4")
+    get_scheduler.cache_clear()
+    try:
+        assert get_scheduler("openai").requests.capacity == 150
+    finally:
+        get_scheduler.cache_clear()
+
+
+def test_local_searches_bypass_the_scheduler(local_search, monkeypatch):
+    from search import search_wrapper
+
+    search = local_search()
+    monkeypatch.setattr(search_wrapper, "get_scheduler", lambda name: pytest.fail(f"scheduled a local {name} call"))
+    assert search.search("egmont")[0]["programID"] == "3"
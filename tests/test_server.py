@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import pytest
+from tornado.testing import AsyncHTTPTestCase
+
+import server
+from server import ChatService, make_app, parse_turn
+
+
+class FakeChatService:
+    batch_concurrency = 2
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.turns = []
+
+    async def stream(self, question, history=None):
+        self.turns.append((question, history))
+        yield "sources", ["1", "2"]
+        if question == self.fail_on:
+            raise RuntimeError("upstream unavailable")
+        for word in ("Hello", " world"):
+            yield "delta", word
+
+    async def answer(self, question, history=None):
+        deltas = [data async for event, data in self.stream(question, history) if event == "delta"]
+        return {"answer": "".join(deltas), "sources": ["1", "2"]}
+
+
+def events(body):
+    parsed = []
+    for block in body.decode("utf-8").strip().split("\n\n"):
+        event, data = block.split("\n")
+        parsed.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+class ServerTest(AsyncHTTPTestCase):
+    def get_app(self):
+        self.service = FakeChatService(fail_on="fail")
+        return make_app(self.service)
+
+    def post(self, path, payload, **kwargs):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload)
+        return self.fetch(path, method="POST", body=body, **kwargs)
+
+    def test_chat_streams_server_sent_events(self):
+        history = [{"role": "user", "content": "hi", "name": "dropped"}]
+        response = self.post("/v1/chat", {"question": "Who?", "history": history}, headers={"X-Correlation-Id": "turn-1"})
+        assert response.code == 200
+        assert response.headers["Content-Type"] == "text/event-stream"
+        assert response.headers["X-Correlation-Id"] == "turn-1"
+        assert events(response.body) == [("sources", ["1", "2"]), ("delta", "Hello"), ("delta", " world"), ("done", {})]
+        assert self.service.turns == [("Who?", [{"role": "user", "content": "hi"}])]
+
+    def test_chat_reports_errors_as_an_event(self):
+        response = self.post("/v1/chat", {"question": "fail"})
+        assert response.code == 200
+        assert events(response.body) == [("sources", ["1", "2"]), ("error", {"error": "upstream unavailable"})]
+
+    def test_chat_rejects_invalid_requests(self):
+        response = self.post("/v1/chat", b"not json")
+        assert response.code == 400
+        assert json.loads(response.body) == {"error": "Request body is not valid JSON"}
+        response = self.post("/v1/chat", {"question": " "})
+        assert response.code == 400
+        assert json.loads(response.body) == {"error": "'question' must be a non-empty string"}
+        assert self.service.turns == []
+
+    def test_batch_answers_each_request(self):
+        response = self.post("/v1/chat/batch", {"requests": [{"question": "Who?"}, {"question": ""}, {"question": "fail"}]})
+        assert response.code == 200
+        assert json.loads(response.body)["responses"] == [
+            {"answer": "Hello world", "sources": ["1", "2"]},
+            {"error": "'question' must be a non-empty string"},
+            {"error": "upstream unavailable"},
+        ]
+
+    def test_batch_rejects_empty_and_oversized_batches(self):
+        assert self.post("/v1/chat/batch", {"requests": []}).code == 400
+        response = self.post("/v1/chat/batch", {"requests": [{"question": "q"}] * (server.MAX_BATCH_SIZE + 1)})
+        assert response.code == 400
+        assert self.service.turns == []
+
+    def test_healthz(self):
+        response = self.fetch("/healthz")
+        assert response.code == 200 and json.loads(response.body) == {"status": "ok"}
+
+
+def test_parse_turn_validates_history():
+    assert parse_turn({"question": "Who?"}) == ("Who?", [])
+    with pytest.raises(ValueError, match="history"):
+        parse_turn({"question": "Who?", "history": [{"role": "tool", "content": "x"}]})
+    with pytest.raises(ValueError, match="JSON object"):
+        parse_turn(["Who?"])
+
+
+def test_chat_service_replays_cached_answers(local_search, monkeypatch):
+    completions = []
+
+    async def fake_stream_completion(client, model, messages):
+        completions.append(messages)
+        for delta in ("Beethoven ", "wrote it."):
+            yield delta
+
+    monkeypatch.setattr(server, "get_async_openai_client", lambda *args: None)
+    monkeypatch.setattr(server, "stream_completion", fake_stream_completion)
+    monkeypatch.delenv("RESPONSE_CACHE_SIZE", raising=False)
+    service = ChatService(search_service=local_search())
+
+    async def turns():
+        first = await service.answer("Who wrote the Egmont overture?")
+        second = await service.answer("Who wrote the Egmont overture?")
+        follow_up = await service.answer("Who wrote the Egmont overture?", [{"role": "user", "content": "Hello"}])
+        return first, second, follow_up
+
+    first, second, follow_up = asyncio.run(turns())
+    assert first == second == follow_up
+    assert first["answer"] == "Beethoven wrote it." and "3" in first["sources"]
+    # The repeated question is replayed from the cache; the follow-up has its own history
+    assert len(completions) == 2
+    assert completions[1][0] == {"role": "user", "content": "Hello"}
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+
+import pytest
+
+from search import telemetry as telemetry_module
+from search.blob_wrapper import BlobWrapper
+from search.telemetry import HttpExporter, LogExporter, Telemetry, correlation, get_correlation_id, traced
+
+
+class ListExporter:
+    def __init__(self):
+        self.events = []
+
+    def export(self, event):
+        self.events.append(event)
+
+
+def test_events_carry_the_correlation_id():
+    exporter = ListExporter()
+    telemetry = Telemetry(exporter)
+    with correlation("turn-1"):
+        telemetry.increment("cache.hit")
+
+        async def in_task():
+            telemetry.observe("chat.ttft_ms", 12.0)
+        asyncio.run(in_task())
+    telemetry.increment("cache.miss")
+    assert [event["correlation_id"] for event in exporter.events] == ["turn-1", "turn-1", None]
+    assert get_correlation_id() is None
+
+
+def test_span_records_status_and_error():
+    exporter = ListExporter()
+    telemetry = Telemetry(exporter)
+    with telemetry.span("search.search", mode="text") as span:
+        span["results"] = 3
+    with pytest.raises(KeyError):
+        with telemetry.span("search.search"):
+            raise KeyError("index")
+    ok, failed = exporter.events
+    assert ok["status"] == "ok" and ok["attributes"] == {"mode": "text", "results": 3}
+    assert failed["status"] == "error" and "KeyError" in failed["attributes"]["error"]
+
+
+def test_snapshot_aggregates_counters_and_timings():
+    telemetry = Telemetry()
+    telemetry.increment("search.cache.hit")
+    telemetry.increment("search.cache.hit", 2)
+    telemetry.observe("chat.ttft_ms", 10.0)
+    telemetry.observe("chat.ttft_ms", 30.0)
+    snapshot = telemetry.snapshot()
+    assert snapshot["counters"] == {"search.cache.hit": 3}
+    assert snapshot["timings"]["chat.ttft_ms"] == {"count": 2, "mean_ms": 20.0, "max_ms": 30.0}
+
+
+def test_exporter_factory_runs_on_first_event():
+    created = []
+    telemetry = Telemetry(exporter_factory=lambda: created.append(ListExporter()) or created[-1])
+    assert created == []
+    telemetry.increment("a")
+    telemetry.increment("b")
+    assert len(created) == 1 and len(created[0].events) == 2
+
+
+def test_default_exporter_is_none(monkeypatch):
+    monkeypatch.delenv("TELEMETRY_EXPORTER", raising=False)
+    assert telemetry_module._default_exporter() is None
+    monkeypatch.setenv("TELEMETRY_EXPORTER", "statsd")
+    with pytest.raises(ValueError):
+        telemetry_module._default_exporter()
+
+
+def test_traced_times_each_call(monkeypatch):
+    telemetry = Telemetry()
+    monkeypatch.setattr(telemetry_module, "telemetry", telemetry)
+
+    @traced("work")
+    def work(value):
+        return value * 2
+
+    assert work(2) == 4 and work(3) == 6
+    assert telemetry.snapshot()["timings"]["work"]["count"] == 2
+
+
+def test_blob_list_span_covers_the_listing(monkeypatch):
+    telemetry = Telemetry()
+    monkeypatch.setattr(telemetry_module, "telemetry", telemetry)
+    pages = []
+
+    class Container:
+        def list_blobs(self):
+            for name in ("a.json", "b.json"):
+                pages.append(telemetry.snapshot()["timings"].get("blob.list"))
+                yield name
+
+    blobs = BlobWrapper(container_client=Container()).list()
+    assert blobs == ["a.json", "b.json"]
+    # The blobs were listed before the span ended
+    assert pages == [None, None]
+    assert telemetry.snapshot()["timings"]["blob.list"]["count"] == 1
+
+
+def test_log_exporter_writes_json_lines(caplog):
+    logger = logging.getLogger("telemetry")
+    exporter = LogExporter()
+    logger.propagate = True
+    try:
+        with caplog.at_level(logging.INFO, logger="telemetry"):
+            exporter.export({"type": "counter", "name": "a", "value": 1})
+    finally:
+        logger.propagate = False
+    assert json.loads(caplog.records[-1].getMessage()) == {"type": "counter", "name": "a", "value": 1}
+
+
+def test_http_exporter_drops_events_when_the_queue_is_full(monkeypatch):
+    exporter = HttpExporter("http://127.0.0.1:9/telemetry", max_queue=2)
+    monkeypatch.setattr(exporter, "_start", lambda: None)
+    for n in range(5):
+        exporter.export({"n": n})
+    assert exporter.queue.qsize() == 2
+    assert exporter.dropped == 3
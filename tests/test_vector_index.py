@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from search.embeddings import HashingEmbedder
+from search.vector_index import VectorIndex
+
+
+def random_vectors(count, dimensions=64, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dimensions)).astype(np.float32)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_nearest_neighbours_match_exact_search(tmp_path, quantization):
+    vectors = random_vectors(500)
+    keys = [f"doc-{n}" for n in range(len(vectors))]
+    index = VectorIndex.build(str(tmp_path / "vectors"), keys, vectors, quantization=quantization)
+    query = vectors[42] + 0.05 * random_vectors(1, seed=1)[0]
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+    hits = index.search(query, k=5, rescore_factor=20)
+    assert hits[0][0] == "doc-42"
+    assert [key for key, _ in hits] == [keys[n] for n in expected]
+    assert all(a[1] >= b[1] for a, b in zip(hits, hits[1:]))
+
+
+def test_open_maps_a_built_index(tmp_path):
+    directory = str(tmp_path / "vectors")
+    vectors = random_vectors(10)
+    VectorIndex.build(directory, list("abcdefghij"), vectors)
+    index = VectorIndex.open(directory)
+    assert (len(index), index.dimensions) == (10, 64)
+    assert index.search_batch(vectors[[3, 7]], k=1) == [[("d", pytest.approx(1.0))], [("h", pytest.approx(1.0))]]
+
+
+def test_empty_index_and_invalid_input(tmp_path):
+    index = VectorIndex.build(str(tmp_path / "empty"), [], np.empty((0, 8), dtype=np.float32))
+    assert index.search(np.ones(8), k=3) == []
+    with pytest.raises(ValueError):
+        VectorIndex.build(str(tmp_path / "bad"), ["a"], random_vectors(2))
+    with pytest.raises(ValueError):
+        VectorIndex.build(str(tmp_path / "bad"), ["a"], random_vectors(1), quantization="pq")
+
+
+def test_hybrid_search_fuses_text_and_vector_hits(local_search):
+    search = local_search(embedder=HashingEmbedder(dimensions=256))
+    search.reranker = None
+    search.filter_pushdown = False
+    search.build_local_vector_index()
+    vector_hits = search.search("Weber Oberon", mode="vector", top=3)
+    assert vector_hits[0]["programID"] == "2"
+    hybrid_hits = search.search("Beethoven Egmont", mode="hybrid", top=3)
+    assert hybrid_hits[0]["programID"] == "3"
+    assert {hit["programID"] for hit in hybrid_hits} == {"1", "2", "3"}
+
+
+def test_vector_queries_without_local_vector_index_fall_back_to_text(local_search, caplog):
+    search = local_search()
+    assert search.vector_index is None
+    with caplog.at_level("WARNING"):
+        results = search.search("Oberon", mode="vector", top=3)
+    assert [r["programID"] for r in results] == ["2"]
+    assert "running the vector query as a text query" in caplog.text